@@ -0,0 +1,138 @@
+"""
+Load test of the serving modes with an in-process client: Flask's WSGI app
+called sequentially (dev server), from a thread per request, and through the
+ASGI adapter (executor offload + single-flight + admission control).
+
+The workload is --requests forecast requests drawn from --distinct payloads,
+so popular payloads arrive concurrently the way dashboard refreshes do.
+Every run uses weights no earlier run used, so the forecast cache cannot
+serve it.
+
+Run from the project root:
+     python benchmarks/bench_asgi.py
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+import numpy as np
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+sys.path.append(str(PROJECT_ROOT / "src" / "api"))
+
+from app import app as flask_app
+from asgi import AsgiApp
+
+URL = '/api/mishaps/yearly-trend'
+
+_runs = itertools.count(1)
+
+def workload(n_requests, n_distinct, seed=0):
+     run = next(_runs)
+     payloads = [
+          {
+               "filters": {"MishapType": ["Aviation", "Ground"], "Source": ["Mishap Report"], "MishapClassification": ["A", "B", "C"]},
+               "n_quarters": 8,
+               "w_rf": 0.3 + (run * 1000 + i) * 1e-7,
+               "w_gb": 0.7
+          }
+          for i in range(n_distinct)
+     ]
+     rng = random.Random(seed)
+     return [rng.choice(payloads) for _ in range(n_requests)]
+
+def summarize(name, latencies, elapsed, extra=""):
+     latencies = np.array(latencies) * 1000
+     print(
+          f"{name:>18} {len(latencies) / elapsed:>8.1f} "
+          f"{np.percentile(latencies, 50):>8.1f} {np.percentile(latencies, 95):>8.1f}  {extra}"
+     )
+
+def timed_post(client, payload):
+     start = time.perf_counter()
+     response = client.post(URL, json=payload)
+     assert response.status_code == 200
+     return time.perf_counter() - start
+
+def run_sequential(payloads):
+     client = flask_app.test_client()
+     start = time.perf_counter()
+     latencies = [timed_post(client, p) for p in payloads]
+     summarize("wsgi sequential", latencies, time.perf_counter() - start)
+
+def run_threaded(payloads, concurrency):
+     client = flask_app.test_client()
+     start = time.perf_counter()
+     with ThreadPoolExecutor(max_workers=concurrency) as pool:
+          latencies = list(pool.map(lambda p: timed_post(client, p), payloads))
+     summarize("wsgi threaded", latencies, time.perf_counter() - start)
+
+async def asgi_post(asgi_app, payload):
+     messages = [{"type": "http.request", "body": json.dumps(payload).encode(), "more_body": False}]
+     sent = []
+
+     async def receive():
+          return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+     async def send(message):
+          sent.append(message)
+
+     scope = {"type": "http", "method": "POST", "path": URL, "query_string": b"", "headers": [(b"content-type", b"application/json")]}
+
+     start = time.perf_counter()
+     await asgi_app(scope, receive, send)
+     return sent[0]["status"], time.perf_counter() - start
+
+def run_asgi(payloads, concurrency, workers, max_pending):
+     asgi_app = AsgiApp(flask_app, workers=workers, max_pending=max_pending)
+
+     async def main():
+          # `concurrency` clients, each sending its requests back to back
+          queue = list(payloads)
+          results = []
+
+          async def client():
+               while queue:
+                    results.append(await asgi_post(asgi_app, queue.pop()))
+
+          await asyncio.gather(*[client() for _ in range(concurrency)])
+          return results
+
+     start = time.perf_counter()
+     results = asyncio.run(main())
+     elapsed = time.perf_counter() - start
+
+     ok = [latency for status, latency in results if status == 200]
+     summarize(
+          "asgi",
+          ok,
+          elapsed,
+          f"executed={asgi_app.stats['executed']} coalesced={asgi_app.stats['coalesced']} rejected={asgi_app.stats['rejected']}"
+     )
+     asgi_app.executor.shutdown()
+
+def main():
+     parser = argparse.ArgumentParser(description=__doc__)
+     parser.add_argument("--requests", type=int, default=200)
+     parser.add_argument("--distinct", type=int, default=20)
+     parser.add_argument("--concurrency", type=int, default=16)
+     parser.add_argument("--workers", type=int, default=8)
+     parser.add_argument("--max-pending", type=int, default=64)
+     args = parser.parse_args()
+
+     # Warm-up: first request pays for lazy imports and encoders
+     flask_app.test_client().post(URL, json=workload(1, 1)[0])
+
+     print(f"{'mode':>18} {'req/s':>8} {'p50_ms':>8} {'p95_ms':>8}")
+     run_sequential(workload(args.requests, args.distinct))
+     run_threaded(workload(args.requests, args.distinct), args.concurrency)
+     run_asgi(workload(args.requests, args.distinct), args.concurrency, args.workers, args.max_pending)
+
+if __name__ == "__main__":
+     main()
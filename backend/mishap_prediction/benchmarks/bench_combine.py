@@ -0,0 +1,80 @@
+"""
+Cost of building the combined actual + predicted frame as the number of
+filtered entities grows: the old per-entity pd.concat accumulation versus
+the single-pass CombinedFrameBuilder, fed from the history rollup
+(quarterly_volume_frame). Forecasts are faked and the rollup is built
+up front, so only the combine stage is timed.
+
+Run from the project root:
+     python benchmarks/bench_combine.py
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.config import PROCESSED_DATA_DIR
+from src.services.combine_actual_predicted import combine_actual_predicted
+from src.services.rollup import HistoryRollup, quarterly_volume_frame
+from synthetic import entity_list, replicate_entities
+
+COLUMNS = ['year', 'quarter', 'entity_type', 'entity_value', 'mishap_count']
+
+def fake_forecast(entities, n_quarters):
+     return pd.DataFrame({
+          "year": np.tile(2026 + np.arange(n_quarters) // 4, len(entities)),
+          "quarter": np.tile(np.arange(n_quarters) % 4 + 1, len(entities)),
+          "entity_type": np.repeat([e[0] for e in entities], n_quarters),
+          "entity_value": np.repeat([e[1] for e in entities], n_quarters),
+          "mishap_count": np.ones(len(entities) * n_quarters, dtype=np.int64)
+     })
+
+def concat_loop(actual_df, forecast_df, entities, n_quarters):
+     combined_df = pd.DataFrame()
+     for i, (etype, val) in enumerate(entities):
+          actual = actual_df[(actual_df['entity_type'] == etype) & (actual_df['entity_value'] == val)]
+          predicted = forecast_df.iloc[i * n_quarters:(i + 1) * n_quarters]
+          combined_df = pd.concat([combined_df, combine_actual_predicted(actual, predicted)], ignore_index=True)
+     return combined_df
+
+def best_of(fn, repeats):
+     timings = []
+     for _ in range(repeats):
+          start = time.perf_counter()
+          fn()
+          timings.append(time.perf_counter() - start)
+     return min(timings)
+
+def main():
+     parser = argparse.ArgumentParser(description=__doc__)
+     parser.add_argument("--entities", type=int, nargs="+", default=[15, 60, 240, 960])
+     parser.add_argument("--n-quarters", type=int, default=8)
+     parser.add_argument("--repeats", type=int, default=3)
+     args = parser.parse_args()
+
+     base_df = pd.read_csv(PROCESSED_DATA_DIR / "features.csv")
+     n_base = len(entity_list(base_df))
+
+     print(f"{'entities':>8} {'rows':>8} {'concat_ms':>10} {'builder_ms':>11} {'builder_us/row':>15}")
+
+     for n_entities in args.entities:
+          df = replicate_entities(base_df, -(-n_entities // n_base))
+          entities = entity_list(df)[:n_entities]
+
+          actual_df = df[df.set_index(['entity_type', 'entity_value']).index.isin(entities)][COLUMNS]
+          forecast_df = fake_forecast(entities, args.n_quarters)
+          rows = len(actual_df) + len(forecast_df)
+
+          loop = best_of(lambda: concat_loop(actual_df, forecast_df, entities, args.n_quarters), args.repeats)
+          rollup = HistoryRollup(df)
+          builder = best_of(lambda: quarterly_volume_frame(rollup, forecast_df, entities, args.n_quarters), args.repeats)
+
+          print(f"{n_entities:>8} {rows:>8} {loop * 1000:>10.1f} {builder * 1000:>11.1f} {builder / rows * 1e6:>15.2f}")
+
+if __name__ == "__main__":
+     main()
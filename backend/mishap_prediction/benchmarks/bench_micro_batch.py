@@ -0,0 +1,69 @@
+"""
+Throughput of concurrent single-entity forecasts with and without
+micro-batching of the ensemble calls.
+
+Run from the project root:
+     python benchmarks/bench_micro_batch.py
+"""
+import argparse
+import threading
+import time
+import pandas as pd
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.config import PROCESSED_DATA_DIR
+from src.models.micro_batch import InferenceBatcher
+from src.models.predict import predict_future_quarters_batch
+from src.models.registry import ModelRegistry
+from synthetic import entity_list, replicate_entities
+
+def run(df, entities, clients, n_quarters, requests_per_client):
+     """
+     `clients` threads, each forecasting one entity at a time.
+     """
+     barrier = threading.Barrier(clients)
+
+     def client(c):
+          barrier.wait()
+          for r in range(requests_per_client):
+               entity = entities[(c * requests_per_client + r) % len(entities)]
+               predict_future_quarters_batch(df, [entity], n_quarters, 0.3, 0.7, use_cache=False)
+
+     threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+     start = time.perf_counter()
+     for t in threads:
+          t.start()
+     for t in threads:
+          t.join()
+     return clients * requests_per_client / (time.perf_counter() - start)
+
+def main():
+     parser = argparse.ArgumentParser(description=__doc__)
+     parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16])
+     parser.add_argument("--n-quarters", type=int, default=8)
+     parser.add_argument("--requests", type=int, default=10, help="requests per client")
+     args = parser.parse_args()
+
+     ModelRegistry.warm_up()
+     df = replicate_entities(pd.read_csv(PROCESSED_DATA_DIR / "features.csv"), 4)
+     entities = entity_list(df)
+
+     print(f"{'clients':>7} {'batching':>8} {'req/s':>8} {'calls/batch':>11}")
+
+     for clients in args.clients:
+          for enabled in (False, True):
+               InferenceBatcher.enabled = enabled
+               InferenceBatcher.reset()
+
+               throughput = run(df, entities, clients, args.n_quarters, args.requests)
+
+               stats = InferenceBatcher.stats()
+               per_batch = stats["submissions"] / stats["batches"] if stats["batches"] else 1.0
+               print(f"{clients:>7} {str(enabled):>8} {throughput:>8.1f} {per_batch:>11.1f}")
+
+if __name__ == "__main__":
+     main()
@@ -0,0 +1,263 @@
+"""
+Benchmark suite: latency, throughput and peak memory of the forecast, the
+prediction and aggregation services and the HTTP routes (Flask test
+client), on synthetic feature data of a given scale (entities x quarters).
+
+Every timed call starts with an empty forecast cache, so forecasts are
+always computed. Results are written as JSON, so runs from different
+commits can be compared with --compare.
+
+Run from the project root:
+     python benchmarks/bench_suite.py --entities 60 --quarters 40 --output before.json
+     python benchmarks/bench_suite.py --compare before.json after.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import sklearn
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+sys.path.append(str(PROJECT_ROOT / "src" / "api"))
+
+from app import app as flask_app
+from data.data_context import DataContext, Generation
+from src.config import RF_PIPELINE_PATH, GB_PIPELINE_PATH
+from src.models.forecast_cache import ForecastCache
+from src.models.predict import predict_future_quarters, predict_future_quarters_batch
+from src.models.registry import ModelRegistry
+from src.services.aggregation_service import (
+     aggregate_volume_by_quarter,
+     aggregate_volume_by_year,
+     aggregate_volume_by_year_and_classification,
+     get_classification_insight,
+     get_insight_text
+)
+from src.services.prediction_service import forecast_entities, get_quarterly_prediction, get_yearwise_trend, iter_entity_trends
+from src.services.query_engine import default_filters, run_aggregate_query
+from src.utils.feature_store import FeatureStore
+from synthetic import entity_list, synthetic_features
+
+GROUPS = ["forecast", "service", "aggregation", "http"]
+
+class BenchCase:
+     def __init__(self, group, name, fn, items, unit):
+          self.group = group
+          self.name = name
+          self.fn = fn
+          self.items = items
+          self.unit = unit
+
+def measure(case, repeats):
+     """
+     Latency of `repeats` cold-cache calls after one warm-up call, then the
+     peak traced allocation of one more call.
+     """
+     case.fn()
+
+     timings = []
+     for _ in range(repeats):
+          ForecastCache.clear()
+          start = time.perf_counter()
+          case.fn()
+          timings.append(time.perf_counter() - start)
+
+     ForecastCache.clear()
+     tracemalloc.start()
+     try:
+          case.fn()
+          _, peak = tracemalloc.get_traced_memory()
+     finally:
+          tracemalloc.stop()
+
+     median = statistics.median(timings)
+     return {
+          "group": case.group,
+          "name": case.name,
+          "latency_ms": {
+               "min": min(timings) * 1000,
+               "median": median * 1000,
+               "p95": float(np.percentile(timings, 95)) * 1000,
+               "max": max(timings) * 1000
+          },
+          "throughput": {"per_s": case.items / median, "unit": case.unit},
+          "peak_memory_mb": peak / 2**20
+     }
+
+def post(client, url, payload):
+     """
+     One request through the test client, response body fully read.
+     """
+     def call():
+          response = client.post(url, json=payload)
+          response.get_data()
+          if response.status_code != 200:
+               raise RuntimeError(f"{url} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+     return call
+
+def build_cases(df, n_quarters):
+     entities = entity_list(df)
+     n = len(entities)
+
+     filters = {}
+     for entity_type, entity_value in entities:
+          filters.setdefault(entity_type, []).append(entity_value)
+
+     first = entities[0]
+     quarterly = get_quarterly_prediction(df, filters, n_quarters, 0.3, 0.7)
+     yearly = get_yearwise_trend(df, filters, n_quarters, 0.3, 0.7)
+     by_type = yearly[yearly['entity_type'] == 'MishapType']
+     by_class = yearly[yearly['entity_type'] == 'MishapClassification']
+
+     client = flask_app.test_client()
+     trend_payload = {"filters": filters, "n_quarters": n_quarters}
+
+     return [
+          BenchCase("forecast", "predict_future_quarters", lambda: predict_future_quarters(df, *first, n_quarters), 1, "entities"),
+          BenchCase("forecast", "predict_future_quarters_batch", lambda: predict_future_quarters_batch(df, entities, n_quarters, use_cache=False), n, "entities"),
+
+          BenchCase("service", "forecast_entities", lambda: forecast_entities(df, entities, n_quarters, 0.3, 0.7), n, "entities"),
+          BenchCase("service", "get_yearwise_trend", lambda: get_yearwise_trend(df, filters, n_quarters, 0.3, 0.7), n, "entities"),
+          BenchCase("service", "get_quarterly_prediction", lambda: get_quarterly_prediction(df, filters, n_quarters, 0.3, 0.7), n, "entities"),
+          BenchCase("service", "iter_entity_trends", lambda: list(iter_entity_trends(df, filters, n_quarters, 0.3, 0.7)), n, "entities"),
+
+          BenchCase("aggregation", "run_aggregate_query", lambda: run_aggregate_query(df, filters, n_quarters=n_quarters), n, "entities"),
+          BenchCase("aggregation", "run_aggregate_query_qoq_growth", lambda: run_aggregate_query(
+               df, filters, group_by=["year", "quarter"], drill_by=["data_type"],
+               metrics=["mishap_count", "mishap_count:qoq_growth"], n_quarters=n_quarters
+          ), n, "entities"),
+          BenchCase("aggregation", "aggregate_volume_by_year", lambda: aggregate_volume_by_year(quarterly), len(quarterly), "rows"),
+          BenchCase("aggregation", "aggregate_volume_by_quarter", lambda: aggregate_volume_by_quarter(quarterly), len(quarterly), "rows"),
+          BenchCase("aggregation", "aggregate_volume_by_year_and_classification", lambda: aggregate_volume_by_year_and_classification(quarterly), len(quarterly), "rows"),
+          BenchCase("aggregation", "get_insight_text", lambda: get_insight_text(by_type, 'mishap_by_type'), len(by_type), "rows"),
+          BenchCase("aggregation", "get_classification_insight", lambda: get_classification_insight(by_class), len(by_class), "rows"),
+
+          BenchCase("http", "POST /predict", post(client, "/predict", {
+               "entity_type": first[0], "entity_value": first[1], "n_quarters": n_quarters
+          }), 1, "requests"),
+          BenchCase("http", "POST /api/mishaps/yearly-trend", post(client, "/api/mishaps/yearly-trend", trend_payload), 1, "requests"),
+          BenchCase("http", "POST /api/mishaps/yearly-trend ndjson", post(client, "/api/mishaps/yearly-trend", {**trend_payload, "format": "ndjson"}), 1, "requests"),
+          BenchCase("http", "POST /api/mishaps/quarterly-prediction", post(client, "/api/mishaps/quarterly-prediction", trend_payload), 1, "requests"),
+          BenchCase("http", "POST /api/mishaps/aggregate", post(client, "/api/mishaps/aggregate", {
+               "filters": default_filters("MishapType"), "n_quarters": n_quarters
+          }), 1, "requests")
+     ]
+
+def serve(df):
+     """
+     Publish the synthetic features with the saved pipelines as the served
+     generation, so the routes run on them.
+     """
+     store = FeatureStore.build(df)
+     pipelines = {path: ModelRegistry.load(path) for path in (RF_PIPELINE_PATH, GB_PIPELINE_PATH)}
+     DataContext.publish(Generation(store, pipelines))
+     return store.frame
+
+def git_commit():
+     try:
+          commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+          dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True).stdout != ""
+     except (OSError, subprocess.CalledProcessError):
+          return None, None
+     return commit, dirty
+
+def environment():
+     commit, dirty = git_commit()
+     return {
+          "commit": commit,
+          "dirty": dirty,
+          "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+          "python": platform.python_version(),
+          "numpy": np.__version__,
+          "pandas": pd.__version__,
+          "sklearn": sklearn.__version__,
+          "platform": platform.platform(),
+          "cpus": os.cpu_count()
+     }
+
+def run_suite(args):
+     df = serve(synthetic_features(args.entities, args.quarters, seed=args.seed))
+
+     results = []
+     for case in build_cases(df, args.n_quarters):
+          if case.group not in args.groups:
+               continue
+          result = measure(case, args.repeats)
+          results.append(result)
+          print(
+               f"{case.group:<12} {case.name:<46} {result['latency_ms']['median']:>10.2f} ms "
+               f"{result['throughput']['per_s']:>12.1f} {case.unit}/s {result['peak_memory_mb']:>9.2f} MB"
+          )
+
+     report = {
+          "environment": environment(),
+          "scale": {"entities": args.entities, "quarters": args.quarters, "rows": len(df), "n_quarters": args.n_quarters, "seed": args.seed},
+          "repeats": args.repeats,
+          "results": results
+     }
+
+     args.output.write_text(json.dumps(report, indent=2))
+     print(f"Results saved to {args.output}")
+
+def compare(baseline_path, current_path, tolerance):
+     """
+     Median latency and peak memory of `current` relative to `baseline`.
+     Returns the names of the cases slower or bigger by more than tolerance.
+     """
+     baseline = json.loads(Path(baseline_path).read_text())
+     current = json.loads(Path(current_path).read_text())
+
+     if baseline["scale"] != current["scale"]:
+          print(f"Warning: scales differ ({baseline['scale']} vs {current['scale']})")
+
+     before = {r["name"]: r for r in baseline["results"]}
+     regressed = []
+
+     print(f"{'case':<46} {'latency':>10} {'memory':>10}")
+     for result in current["results"]:
+          old = before.get(result["name"])
+          if old is None:
+               continue
+
+          latency = result["latency_ms"]["median"] / old["latency_ms"]["median"]
+          memory = result["peak_memory_mb"] / old["peak_memory_mb"] if old["peak_memory_mb"] else 1.0
+
+          flag = ""
+          if latency > 1 + tolerance or memory > 1 + tolerance:
+               regressed.append(result["name"])
+               flag = "  REGRESSED"
+          print(f"{result['name']:<46} {latency:>9.2f}x {memory:>9.2f}x{flag}")
+
+     return regressed
+
+def main():
+     parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+     parser.add_argument("--entities", type=int, default=60)
+     parser.add_argument("--quarters", type=int, default=40, help="quarters of history per entity")
+     parser.add_argument("--n-quarters", type=int, default=8, help="forecast horizon of every case")
+     parser.add_argument("--repeats", type=int, default=5)
+     parser.add_argument("--seed", type=int, default=0)
+     parser.add_argument("--groups", nargs="+", choices=GROUPS, default=GROUPS)
+     parser.add_argument("--output", type=Path, default=Path("bench_results.json"))
+     parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="compare two result files instead of running")
+     parser.add_argument("--tolerance", type=float, default=0.1, help="relative slowdown / growth reported as a regression")
+     args = parser.parse_args()
+
+     if args.compare:
+          regressed = compare(*args.compare, args.tolerance)
+          sys.exit(1 if regressed else 0)
+
+     run_suite(args)
+
+if __name__ == "__main__":
+     main()
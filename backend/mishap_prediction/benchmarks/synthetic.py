@@ -0,0 +1,79 @@
+"""
+Synthetic data helpers shared by the benchmark scripts.
+"""
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.preprocessing.build_features import compute_feature_values
+
+# Entities of the real feature set; synthetic entities beyond these reuse
+# them as "<value>#<copy>" so every filter and insight path still applies
+BASE_ENTITIES = (
+     [("MishapType", v) for v in ["Aviation", "Ground"]] +
+     [("MishapClassification", v) for v in ["A", "B", "C", "D", "E", "F", "P", "R", "Unknown", "X"]] +
+     [("Source", v) for v in ["Initial Notification", "Mishap Report", "Near Miss"]]
+)
+
+FEATURE_COLUMNS = [
+     'year', 'quarter', 'entity_type', 'entity_value', 'mishap_count',
+     'prev_qtr_count', 'qoq_change', 'rolling_4q_avg'
+]
+
+def replicate_entities(df, copies):
+     """
+     Grow the entity count by cloning every entity's history under a new
+     entity_value (unseen categories are one-hot encoded as all zeros).
+     """
+     frames = [df]
+     for i in range(1, copies):
+          clone = df.copy()
+          clone['entity_value'] = clone['entity_value'] + f"#{i}"
+          frames.append(clone)
+     return pd.concat(frames, ignore_index=True)
+
+def entity_list(df):
+     return list(df[['entity_type', 'entity_value']].drop_duplicates().itertuples(index=False, name=None))
+
+def synthetic_entities(n_entities):
+     entities = []
+     for i in range(n_entities):
+          entity_type, value = BASE_ENTITIES[i % len(BASE_ENTITIES)]
+          copy = i // len(BASE_ENTITIES)
+          entities.append((entity_type, f"{value}#{copy}" if copy else value))
+     return entities
+
+def synthetic_features(n_entities, n_quarters, last_year=2025, gap_rate=0.1, seed=0):
+     """
+     Feature frame with the features.csv schema: n_entities entities with
+     n_quarters quarters each, ending at last_year Q4. Counts are Poisson
+     around a per-entity level with trend and seasonality; gap_rate of the
+     quarters (never an entity's last) have no row, as in the real data.
+     """
+     rng = np.random.default_rng(seed)
+     entities = synthetic_entities(n_entities)
+
+     period = np.arange(n_quarters) + (last_year + 1) * 4 - n_quarters
+     level = np.exp(rng.normal(3.5, 1.0, size=(n_entities, 1)))
+     trend = 1 + rng.normal(0, 0.01, size=(n_entities, 1)) * np.arange(n_quarters)
+     season = 1 + rng.uniform(0, 0.3, size=(n_entities, 1)) * np.sin(np.pi / 2 * period)
+     counts = rng.poisson(level * np.clip(trend, 0.1, None) * season)
+
+     keep = rng.random((n_entities, n_quarters)) >= gap_rate
+     keep[:, -1] = True
+     entity, step = np.nonzero(keep)
+
+     df = pd.DataFrame({
+          'year': period[step] // 4,
+          'quarter': period[step] % 4 + 1,
+          'entity_type': [entities[e][0] for e in entity],
+          'entity_value': [entities[e][1] for e in entity],
+          'mishap_count': counts[entity, step]
+     })
+
+     df = df.sort_values(by=['entity_type', 'entity_value', 'year', 'quarter'], ignore_index=True)
+     return compute_feature_values(df)[FEATURE_COLUMNS]
@@ -1,18 +1,153 @@
+import contextvars
+import itertools
+import os
+import threading
+import time
 import pandas as pd
-from pathlib import Path
-from src.config import PROCESSED_DATA_DIR
+from contextlib import contextmanager
+from src.config import FEATURES_CSV_PATH, FEATURES_SNAPSHOT_DIR, RF_PIPELINE_PATH, GB_PIPELINE_PATH
+from src.models.registry import ModelRegistry
+from src.preprocessing.feature_snapshot import SCHEMA_FILE, load_features
+from src.utils.feature_store import FeatureStore
+from src.utils.helpers import frame_fingerprint
+
+# Artifacts a generation is built from (see ArtifactReloader)
+WATCHED_PATHS = [
+     FEATURES_CSV_PATH,
+     FEATURES_SNAPSHOT_DIR / SCHEMA_FILE,
+     RF_PIPELINE_PATH,
+     GB_PIPELINE_PATH
+]
+
+def artifact_stamps(paths=WATCHED_PATHS):
+     """
+     (path, mtime_ns) of every watched artifact; None for missing files.
+     """
+     stamps = []
+     for path in paths:
+          try:
+               stamps.append((str(path), os.stat(path).st_mtime_ns))
+          except FileNotFoundError:
+               stamps.append((str(path), None))
+     return tuple(stamps)
+
+class Generation:
+     """
+     One consistent set of served artifacts: the feature store and the
+     ensemble pipelines, stamped with a generation number and their versions,
+     and with the artifact stamps they were loaded from (None when built
+     from frames in memory).
+     """
+     _numbers = itertools.count(1)
+
+     def __init__(self, store, pipelines, artifact_stamps=None):
+          self.number = next(self._numbers)
+          self.store = store
+          self.pipelines = pipelines
+          self.artifact_stamps = artifact_stamps
+          self.loaded_at = time.time()
+
+          self.data_version = frame_fingerprint(store.frame)
+
+          token = ModelRegistry.pin(pipelines)
+          try:
+               self.model_version = ModelRegistry.version()
+          finally:
+               ModelRegistry.unpin(token)
+
+     @property
+     def stamp(self):
+          return f"{self.number}-{self.data_version}-{self.model_version}"
+
+     def describe(self):
+          return {
+               "generation": self.number,
+               "stamp": self.stamp,
+               "data_version": self.data_version,
+               "model_version": self.model_version,
+               "rows": len(self.store.frame),
+               "loaded_at": self.loaded_at
+          }
 
 class DataContext:
-     _df_features: pd.DataFrame = None
+     """
+     Serving state of the API: the current Generation.
+     A reload builds a new Generation off to the side and publishes it in
+     one assignment. Requests pin the generation they started on, so they
+     finish on it even if a newer one is published meanwhile.
+     """
+     _generation: Generation = None
+     _pinned = contextvars.ContextVar("pinned_generation", default=None)
+     _lock = threading.Lock()
 
      @classmethod
      def load(cls):
-          if cls._df_features is None:
-               cls._df_features = pd.read_csv(PROCESSED_DATA_DIR / "features.csv")
+          if cls._generation is None:
+               with cls._lock:
+                    if cls._generation is None:
+                         cls.publish(cls.build())
 
+     @classmethod
+     def build(cls) -> Generation:
+          """
+          Load the feature set and the ensemble pipelines from disk, without
+          serving them yet. The artifacts are stamped before they are read,
+          so a change made while loading is picked up by the next reload.
+          """
+          stamps = artifact_stamps()
+          store = FeatureStore.build(load_features())
+          pipelines = {path: ModelRegistry.load(path) for path in (RF_PIPELINE_PATH, GB_PIPELINE_PATH)}
+          return Generation(store, pipelines, stamps)
 
      @classmethod
-     def features(cls) -> pd.DataFrame:
-          if cls._df_features is None:
+     def publish(cls, generation):
+          ModelRegistry.publish(generation.pipelines)
+          cls._generation = generation
+
+     @classmethod
+     def current(cls) -> Generation:
+          """
+          The latest published generation, regardless of any pin.
+          """
+          if cls._generation is None:
                raise RuntimeError("DataContext not initialized. Call DataContext.load() first.")
-          return cls._df_features
\ No newline at end of file
+          return cls._generation
+
+     @classmethod
+     def generation(cls) -> Generation:
+          """
+          The generation this context runs on: the pinned one, else the latest.
+          """
+          return cls._pinned.get() or cls.current()
+
+     @classmethod
+     def pin(cls, generation=None):
+          """
+          Pin a generation (default: the one in use) to this context, data
+          and pipelines together. Returns the generation and a token for unpin.
+          """
+          generation = generation or cls.generation()
+          return generation, (cls._pinned.set(generation), ModelRegistry.pin(generation.pipelines))
+
+     @classmethod
+     def unpin(cls, token):
+          generation_token, pipelines_token = token
+          ModelRegistry.unpin(pipelines_token)
+          cls._pinned.reset(generation_token)
+
+     @classmethod
+     @contextmanager
+     def pinned(cls, generation=None):
+          generation, token = cls.pin(generation)
+          try:
+               yield generation
+          finally:
+               cls.unpin(token)
+
+     @classmethod
+     def features(cls) -> pd.DataFrame:
+          return cls.generation().store.frame
+
+     @classmethod
+     def store(cls) -> FeatureStore:
+          return cls.generation().store
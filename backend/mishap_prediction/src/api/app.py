@@ -1,4 +1,5 @@
-from flask import Flask, app, request, jsonify
+from flask import Flask, Response, app, g, request, jsonify
+import time
 from flask_cors import CORS
 import pandas as pd
 import sys
@@ -9,16 +10,79 @@ sys.path.append(str(PROJECT_ROOT))
 
 from src.models.predict import get_feature_importance, predict_future_quarters
 from src.preprocessing.build_features import build_features
+from src.config import RELOAD_WATCH, PROFILING_ENABLED
+from src.services.reloader import ArtifactReloader
+from src.utils.metrics import Metrics, PROMETHEUS_MIMETYPE
 from data.data_context import DataContext
 from routes.aggregation_routes import aggregation_bp
+from routes.admin_routes import admin_bp
+from profiling import RequestProfiler
 
 def create_app():
      app = Flask(__name__)
-     CORS(app)
+     # The dashboard's API only; /admin/* is not exposed to browsers
+     CORS(app, resources=[r"/api/*", r"/predict"])
 
+     # Loads the features and the ensemble pipelines as generation 1
      DataContext.load()
 
+     if RELOAD_WATCH:
+          ArtifactReloader.watch()
+
+     # Opt-in: with profiling off no hook is installed at all
+     if PROFILING_ENABLED:
+          RequestProfiler().install(app)
+
+     # Every request runs on the generation it started on, even if a reload
+     # publishes a new one meanwhile
+     @app.before_request
+     def pin_generation():
+          g.generation, g.generation_token = DataContext.pin()
+
+     # Request counters and latency; with debug timing on, the stage
+     # breakdown of the request is sent back as a Server-Timing header
+     @app.before_request
+     def start_timing():
+          g.request_start = time.perf_counter()
+          if Metrics.debug_timing:
+               g.stage_timer, g.trace_token = Metrics.start_trace()
+
+     @app.after_request
+     def stamp_generation(response):
+          if 'generation' in g:
+               response.headers['X-Serving-Generation'] = g.generation.stamp
+          return response
+
+     @app.after_request
+     def record_timing(response):
+          route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+          if 'request_start' in g:
+               Metrics.observe("mishap_request_duration_seconds", time.perf_counter() - g.request_start, route=route)
+          Metrics.inc("mishap_requests_total", route=route, method=request.method, status=response.status_code)
+
+          if 'stage_timer' in g:
+               response.headers['Server-Timing'] = Metrics.server_timing(g.stage_timer)
+          return response
+
+     @app.teardown_request
+     def unpin_generation(exc):
+          token = g.pop('generation_token', None)
+          if token is not None:
+               DataContext.unpin(token)
+
+     @app.teardown_request
+     def end_timing(exc):
+          token = g.pop('trace_token', None)
+          if token is not None:
+               Metrics.end_trace(token)
+
+     @app.route('/metrics', methods=['GET'])
+     def metrics():
+          return Response(Metrics.render(), content_type=PROMETHEUS_MIMETYPE)
+
      app.register_blueprint(aggregation_bp, url_prefix='/api/mishaps')
+     app.register_blueprint(admin_bp, url_prefix='/admin')
      return app
 
 app = create_app()
@@ -46,9 +110,10 @@ def predict():
                                         w_gb=w_gb
                                    )
 
-          return jsonify({
-               "predictions": preds_df.to_dict(orient='records')
-          })
+          with Metrics.span("route.encode"):
+               return jsonify({
+                    "predictions": preds_df.to_dict(orient='records')
+               })
      
      except Exception as e:
           return jsonify({"error": str(e)}), 500
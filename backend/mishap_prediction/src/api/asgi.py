@@ -0,0 +1,308 @@
+"""
+Production serving entry point: the Flask app behind an ASGI adapter.
+
+Each request is read on the event loop and the Flask (WSGI) handler runs on
+a bounded thread pool, so slow CPU-bound forecasts never block the loop.
+On top of that:
+
+- single-flight: identical in-flight requests (same method, path, query,
+  body and Accept header) share one execution and one response;
+- admission control: once SERVING_MAX_PENDING requests are queued or
+  running, new ones get 503 with Retry-After instead of piling up;
+- NDJSON responses are streamed chunk by chunk as the handler yields them;
+  a handler failing mid-stream ends the body with an {"error": ...} record.
+
+Run with any ASGI server, e.g.:
+     uvicorn src.api.asgi:application --app-dir . --port 5000
+"""
+import asyncio
+import contextvars
+import io
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from src.config import SERVING_WORKERS, SERVING_MAX_PENDING, SERVING_RETRY_AFTER, SINGLE_FLIGHT_PREFIXES, PROFILE_HEADER
+from src.utils.encoding import NDJSON_MIMETYPE, ndjson_line
+
+def wsgi_environ(scope, body):
+     """
+     WSGI environ for an ASGI HTTP scope and its fully read body.
+     """
+     server = scope.get("server") or ("localhost", 80)
+     client = scope.get("client") or ("", 0)
+
+     environ = {
+          "REQUEST_METHOD": scope["method"],
+          "SCRIPT_NAME": scope.get("root_path", ""),
+          "PATH_INFO": scope["path"],
+          "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+          "SERVER_NAME": str(server[0]),
+          "SERVER_PORT": str(server[1]),
+          "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+          "REMOTE_ADDR": str(client[0]),
+          "CONTENT_LENGTH": str(len(body)),
+          "wsgi.version": (1, 0),
+          "wsgi.url_scheme": scope.get("scheme", "http"),
+          "wsgi.input": io.BytesIO(body),
+          "wsgi.errors": sys.stderr,
+          "wsgi.multithread": True,
+          "wsgi.multiprocess": False,
+          "wsgi.run_once": False
+     }
+
+     for name, value in scope.get("headers", []):
+          name = name.decode("latin-1").upper().replace("-", "_")
+          value = value.decode("latin-1")
+
+          if name == "CONTENT_TYPE":
+               environ["CONTENT_TYPE"] = value
+          elif name != "CONTENT_LENGTH":
+               key = f"HTTP_{name}"
+               environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+     return environ
+
+def _start_response(captured):
+     def start_response(status, headers, exc_info=None):
+          captured["status"] = int(status.split(" ", 1)[0])
+          captured["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+     return start_response
+
+def run_wsgi(wsgi_app, environ):
+     """
+     Run the WSGI app to completion: (status, headers, body).
+     """
+     captured = {}
+     result = wsgi_app(environ, _start_response(captured))
+     try:
+          body = b"".join(result)
+     finally:
+          if hasattr(result, "close"):
+               result.close()
+     return captured["status"], captured["headers"], body
+
+def header(scope, name):
+     for key, value in scope.get("headers", []):
+          if key == name:
+               return value.decode("latin-1")
+     return ""
+
+class AsgiApp:
+     """
+     ASGI adapter for a WSGI app with executor offload, single-flight
+     coalescing and admission control.
+     """
+
+     def __init__(
+               self,
+               wsgi_app,
+               workers=SERVING_WORKERS,
+               max_pending=SERVING_MAX_PENDING,
+               retry_after=SERVING_RETRY_AFTER,
+               single_flight_prefixes=SINGLE_FLIGHT_PREFIXES
+     ):
+          self.wsgi_app = wsgi_app
+          self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asgi")
+          self.max_pending = max_pending
+          self.retry_after = retry_after
+          self.single_flight_prefixes = tuple(single_flight_prefixes)
+
+          # Only touched from the event loop thread, no locking needed
+          self.pending = 0
+          self.in_flight = {}
+          self.stats = {"executed": 0, "coalesced": 0, "rejected": 0}
+
+     async def __call__(self, scope, receive, send):
+          if scope["type"] == "lifespan":
+               await self.lifespan(receive, send)
+               return
+
+          if scope["type"] != "http":
+               raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+          body = await self.read_body(receive)
+          streaming = self.is_streaming(scope, body)
+          key = None if streaming else self.single_flight_key(scope, body)
+
+          if key is not None and key in self.in_flight:
+               # Join the identical request already running
+               self.stats["coalesced"] += 1
+               response = await asyncio.shield(self.in_flight[key])
+               await self.send_response(send, *response)
+               return
+
+          if self.pending >= self.max_pending:
+               self.stats["rejected"] += 1
+               await self.send_response(
+                    send,
+                    503,
+                    [(b"content-type", b"application/json"), (b"retry-after", str(self.retry_after).encode())],
+                    json.dumps({"error": "Server busy, retry later"}).encode()
+               )
+               return
+
+          if streaming:
+               await self.stream(scope, body, send)
+               return
+
+          # The execution is a task of its own, so a client that disconnects
+          # does not cancel it for the requests coalesced onto it
+          task = self.submit(self.execute(scope, body))
+          if key is not None:
+               self.in_flight[key] = task
+               task.add_done_callback(lambda _: self.in_flight.pop(key, None) if self.in_flight.get(key) is task else None)
+
+          response = await asyncio.shield(task)
+          await self.send_response(send, *response)
+
+     def submit(self, coro):
+          """
+          Start a handler task, counted against max_pending until it finishes.
+          """
+          self.pending += 1
+          task = asyncio.ensure_future(coro)
+          task.add_done_callback(self._release)
+          return task
+
+     def _release(self, _):
+          self.pending -= 1
+
+     async def execute(self, scope, body):
+          loop = asyncio.get_running_loop()
+          self.stats["executed"] += 1
+
+          try:
+               return await loop.run_in_executor(
+                    self.executor,
+                    contextvars.copy_context().run,
+                    run_wsgi, self.wsgi_app, wsgi_environ(scope, body)
+               )
+          except Exception as e:
+               return (500, [(b"content-type", b"application/json")], json.dumps({"error": str(e)}).encode())
+
+     async def stream(self, scope, body, send):
+          """
+          Iterate the WSGI response on the executor and forward every chunk
+          as soon as it is produced.
+          """
+          loop = asyncio.get_running_loop()
+          queue = asyncio.Queue()
+          done = object()
+
+          def put(item):
+               loop.call_soon_threadsafe(queue.put_nowait, item)
+
+          def pump():
+               captured = {}
+               try:
+                    result = self.wsgi_app(wsgi_environ(scope, body), _start_response(captured))
+                    try:
+                         # Headers go out before the first chunk is computed
+                         if "status" in captured:
+                              put((captured.pop("status"), captured.pop("headers")))
+
+                         for chunk in result:
+                              if "status" in captured:
+                                   put((captured.pop("status"), captured.pop("headers")))
+                              if chunk:
+                                   put(chunk)
+                         if "status" in captured:
+                              put((captured.pop("status"), captured.pop("headers")))
+                    finally:
+                         if hasattr(result, "close"):
+                              result.close()
+               finally:
+                    put(done)
+
+          async def run_pump():
+               self.stats["executed"] += 1
+               await loop.run_in_executor(self.executor, contextvars.copy_context().run, pump)
+
+          task = self.submit(run_pump())
+
+          started = False
+          while True:
+               item = await queue.get()
+               if item is done:
+                    break
+               if isinstance(item, tuple):
+                    await send({"type": "http.response.start", "status": item[0], "headers": item[1]})
+                    started = True
+               else:
+                    await send({"type": "http.response.body", "body": item, "more_body": True})
+
+          try:
+               await task
+          except Exception as e:
+               if not started:
+                    await self.send_response(send, 500, [(b"content-type", b"application/json")], json.dumps({"error": str(e)}).encode())
+                    return
+
+               # The status is already out: end the body with an error
+               # record so clients can tell it was cut short
+               await send({"type": "http.response.body", "body": ndjson_line({"error": str(e)}).encode(), "more_body": False})
+               return
+
+          await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+     def single_flight_key(self, scope, body):
+          if not scope["path"].startswith(self.single_flight_prefixes):
+               return None
+          # A profiled request only shares an execution with requests asking for the same profile
+          return (
+               scope["method"], scope["path"], scope.get("query_string", b""), body,
+               header(scope, b"accept"), header(scope, PROFILE_HEADER.lower().encode())
+          )
+
+     def is_streaming(self, scope, body):
+          if NDJSON_MIMETYPE in header(scope, b"accept"):
+               return True
+          if b'"format"' not in body:
+               return False
+          try:
+               return json.loads(body).get("format") == "ndjson"
+          except (ValueError, AttributeError):
+               return False
+
+     @staticmethod
+     async def read_body(receive):
+          chunks = []
+          while True:
+               message = await receive()
+               if message["type"] == "http.disconnect":
+                    break
+               chunks.append(message.get("body", b""))
+               if not message.get("more_body", False):
+                    break
+          return b"".join(chunks)
+
+     @staticmethod
+     async def send_response(send, status, headers, body):
+          await send({"type": "http.response.start", "status": status, "headers": headers})
+          await send({"type": "http.response.body", "body": body, "more_body": False})
+
+     async def lifespan(self, receive, send):
+          while True:
+               message = await receive()
+               if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+               elif message["type"] == "lifespan.shutdown":
+                    self.executor.shutdown(wait=True)
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+def create_asgi_app(**kwargs):
+     from app import app as flask_app
+     return AsgiApp(flask_app, **kwargs)
+
+application = create_asgi_app()
+
+if __name__ == "__main__":
+     import uvicorn
+     uvicorn.run(application, host="0.0.0.0", port=5000)
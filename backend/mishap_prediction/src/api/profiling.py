@@ -0,0 +1,329 @@
+"""
+Opt-in request profiling for the Flask app (see PROFILING_ENABLED).
+
+A request is profiled when it carries the PROFILE_HEADER header (cProfile,
+or stack sampling with the value "sample"), or, with PROFILE_SLOW_MS set,
+stack-sampled and kept only if it turned out to be slow. Each kept profile
+is written with the request payload to a bounded ring in PROFILE_DIR. Only
+the handler is profiled, not the iteration of a streamed body.
+
+List and summarize the stored profiles from the project root:
+     python src/api/profiling.py list
+     python src/api/profiling.py show <profile id> [--limit 30] [--collapsed]
+"""
+import argparse
+import cProfile
+import datetime
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from flask import g, request
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.config import (
+     PROFILE_HEADER,
+     PROFILE_SLOW_MS,
+     PROFILE_SAMPLE_INTERVAL_MS,
+     PROFILE_DIR,
+     PROFILE_MAX_FILES,
+     PROFILE_MAX_PAYLOAD_BYTES
+)
+
+class StackSampler:
+     """
+     One background thread sampling the Python stacks of the registered
+     threads every interval. Each registration collects its own Counter of
+     stacks (root first, as "func (file:line)" frames).
+     """
+     _cond = threading.Condition()
+     _targets = {}
+     _thread = None
+     interval = PROFILE_SAMPLE_INTERVAL_MS / 1000
+
+     @classmethod
+     def register(cls, thread_id):
+          samples = Counter()
+          with cls._cond:
+               cls._targets[thread_id] = samples
+               if cls._thread is None or not cls._thread.is_alive():
+                    cls._thread = threading.Thread(target=cls._run, name="profile-sampler", daemon=True)
+                    cls._thread.start()
+               cls._cond.notify_all()
+          return samples
+
+     @classmethod
+     def unregister(cls, thread_id):
+          with cls._cond:
+               cls._targets.pop(thread_id, None)
+
+     @classmethod
+     def _run(cls):
+          while True:
+               # Sampled under the lock, so no sample lands after unregister
+               with cls._cond:
+                    while not cls._targets:
+                         cls._cond.wait()
+
+                    frames = sys._current_frames()
+                    for thread_id, samples in cls._targets.items():
+                         frame = frames.get(thread_id)
+                         if frame is not None:
+                              samples[stack_of(frame)] += 1
+
+               time.sleep(cls.interval)
+
+     @classmethod
+     def reset(cls):
+          cls._cond = threading.Condition()
+          cls._targets = {}
+          cls._thread = None
+
+# A forked forecast worker must not inherit the sampler's condition or thread
+os.register_at_fork(after_in_child=StackSampler.reset)
+
+def stack_of(frame):
+     stack = []
+     while frame is not None:
+          code = frame.f_code
+          stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+          frame = frame.f_back
+     return tuple(reversed(stack))
+
+class ActiveProfile:
+     """
+     Profiler attached to one in-flight request: cProfile or stack sampling.
+     """
+     def __init__(self, mode, trigger):
+          self.mode = mode
+          self.trigger = trigger
+          self.profiler = None
+          self.samples = None
+          self.thread_id = threading.get_ident()
+          self.started = time.perf_counter()
+          self.seconds = None
+
+          if mode == "cprofile":
+               self.profiler = cProfile.Profile()
+               try:
+                    self.profiler.enable()
+               except ValueError:
+                    # Another profiler is active (Python 3.12+ allows one)
+                    self.mode, self.profiler = "sampling", None
+
+          if self.mode == "sampling":
+               self.samples = StackSampler.register(self.thread_id)
+
+     def stop(self):
+          if self.profiler is not None:
+               self.profiler.disable()
+          if self.samples is not None:
+               StackSampler.unregister(self.thread_id)
+          self.seconds = time.perf_counter() - self.started
+
+class ProfileStore:
+     """
+     Ring of the last max_profiles profiles: <id>.json holds the request,
+     its latency and (sampling) the stack counts, <id>.prof the cProfile
+     stats. Ids sort by creation time.
+     """
+     def __init__(self, directory=PROFILE_DIR, max_profiles=PROFILE_MAX_FILES):
+          self.directory = Path(directory)
+          self.max_profiles = max_profiles
+          self._lock = threading.Lock()
+
+     def save(self, record, profile):
+          profile_id = f"{datetime.datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:6]}"
+          record = {"id": profile_id, "mode": profile.mode, **record}
+
+          if profile.samples is not None:
+               record["interval_ms"] = StackSampler.interval * 1000
+               record["stacks"] = [[";".join(stack), count] for stack, count in profile.samples.most_common()]
+
+          self.directory.mkdir(parents=True, exist_ok=True)
+
+          if profile.profiler is not None:
+               tmp = self.directory / f"{profile_id}.prof.tmp"
+               profile.profiler.dump_stats(tmp)
+               os.replace(tmp, self.directory / f"{profile_id}.prof")
+
+          tmp = self.directory / f"{profile_id}.json.tmp"
+          tmp.write_text(json.dumps(record, indent=2, default=str))
+          os.replace(tmp, self.directory / f"{profile_id}.json")
+
+          self.prune()
+          return profile_id
+
+     def ids(self):
+          if not self.directory.exists():
+               return []
+          return sorted(path.stem for path in self.directory.glob("*.json"))
+
+     def prune(self):
+          with self._lock:
+               ids = self.ids()
+               for profile_id in ids[:max(0, len(ids) - self.max_profiles)]:
+                    for suffix in (".json", ".prof"):
+                         (self.directory / f"{profile_id}{suffix}").unlink(missing_ok=True)
+
+     def load(self, profile_id):
+          path = self.directory / f"{profile_id}.json"
+          if not path.exists():
+               raise KeyError(f"No profile {profile_id} in {self.directory}")
+          return json.loads(path.read_text())
+
+     def stats_path(self, profile_id):
+          return self.directory / f"{profile_id}.prof"
+
+def request_payload():
+     """
+     The request body for the profile record: parsed JSON when it is JSON,
+     else the (truncated) text.
+     """
+     body = request.get_data(cache=True)[:PROFILE_MAX_PAYLOAD_BYTES]
+     try:
+          return json.loads(body) if body else None
+     except ValueError:
+          return body.decode("utf-8", errors="replace")
+
+class RequestProfiler:
+     """
+     Flask hooks profiling the requests asked for by header, or all of them
+     (kept only when slow) when slow_ms is set. Installed first, so it
+     covers the other hooks too.
+     """
+     def __init__(self, store=None, header=PROFILE_HEADER, slow_ms=PROFILE_SLOW_MS):
+          self.store = store or ProfileStore()
+          self.header = header
+          self.slow_ms = slow_ms
+
+     def install(self, app):
+          app.before_request(self.start)
+          app.after_request(self.finish)
+          app.teardown_request(self.abort)
+          return self
+
+     def start(self):
+          requested = request.headers.get(self.header)
+          if requested:
+               mode = "sampling" if requested.strip().lower() == "sample" else "cprofile"
+               g.profile = ActiveProfile(mode, "header")
+          elif self.slow_ms is not None:
+               g.profile = ActiveProfile("sampling", "threshold")
+
+     def finish(self, response):
+          profile = g.pop('profile', None)
+          if profile is not None:
+               profile_id = self.complete(profile, response.status_code)
+               if profile_id is not None:
+                    response.headers['X-Profile-Id'] = profile_id
+          return response
+
+     def abort(self, exc):
+          # Only still attached when the handler raised
+          profile = g.pop('profile', None)
+          if profile is not None:
+               self.complete(profile, 500, error=repr(exc))
+
+     def complete(self, profile, status, error=None):
+          profile.stop()
+          latency_ms = profile.seconds * 1000
+
+          if profile.trigger == "threshold" and latency_ms < self.slow_ms:
+               return None
+
+          record = {
+               "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+               "trigger": profile.trigger,
+               "method": request.method,
+               "path": request.path,
+               "query": request.query_string.decode("latin-1"),
+               "route": request.url_rule.rule if request.url_rule is not None else None,
+               "status": status,
+               "latency_ms": latency_ms,
+               "payload": request_payload()
+          }
+          if error is not None:
+               record["error"] = error
+          if 'stage_timer' in g:
+               record["stages_ms"] = {name: seconds * 1000 for name, seconds in g.stage_timer.stages.items()}
+
+          return self.store.save(record, profile)
+
+def summarize_samples(stacks, limit=25):
+     """
+     (frame, self samples, total samples) of the hottest frames of a
+     sampled profile, by self then total samples. Total counts a frame
+     once per stack.
+     """
+     self_counts, total_counts = Counter(), Counter()
+     for collapsed, count in stacks:
+          frames = collapsed.split(";")
+          self_counts[frames[-1]] += count
+          for frame in set(frames):
+               total_counts[frame] += count
+
+     hottest = sorted(total_counts, key=lambda frame: (self_counts[frame], total_counts[frame]), reverse=True)
+     return [(frame, self_counts[frame], total_counts[frame]) for frame in hottest[:limit]]
+
+def list_profiles(store):
+     print(f"{'id':<30} {'mode':<9} {'trigger':<9} {'status':>6} {'latency_ms':>11}  request")
+     for profile_id in reversed(store.ids()):
+          record = store.load(profile_id)
+          print(
+               f"{profile_id:<30} {record['mode']:<9} {record['trigger']:<9} {record['status']:>6} "
+               f"{record['latency_ms']:>11.1f}  {record['method']} {record['path']}"
+          )
+
+def show_profile(store, profile_id, limit, sort, collapsed):
+     record = store.load(profile_id)
+
+     if collapsed:
+          # flamegraph.pl / speedscope input
+          for stack, count in record.get("stacks", []):
+               print(f"{stack} {count}")
+          return
+
+     print(f"{record['method']} {record['path']} -> {record['status']} in {record['latency_ms']:.1f} ms ({record['mode']}, {record['trigger']})")
+     print(f"payload: {json.dumps(record['payload'])}")
+     for name, ms in record.get("stages_ms", {}).items():
+          print(f"  {name:<24} {ms:10.2f} ms")
+     print()
+
+     if record["mode"] == "cprofile":
+          pstats.Stats(str(store.stats_path(profile_id))).sort_stats(sort).print_stats(limit)
+          return
+
+     n_samples = sum(count for _, count in record["stacks"])
+     print(f"{n_samples} samples every {record['interval_ms']:g} ms")
+     print(f"{'self':>6} {'total':>6}  frame")
+     for frame, self_count, total_count in summarize_samples(record["stacks"], limit):
+          print(f"{self_count:>6} {total_count:>6}  {frame}")
+
+if __name__ == "__main__":
+     parser = argparse.ArgumentParser(description="List and summarize stored request profiles.")
+     parser.add_argument("--dir", type=Path, default=PROFILE_DIR)
+     commands = parser.add_subparsers(dest="command", required=True)
+
+     commands.add_parser("list", help="stored profiles, newest first")
+
+     show = commands.add_parser("show", help="summary of one profile")
+     show.add_argument("profile_id")
+     show.add_argument("--limit", type=int, default=25, help="functions / frames shown")
+     show.add_argument("--sort", default="cumulative", help="pstats sort key (cProfile profiles)")
+     show.add_argument("--collapsed", action="store_true", help="print the sampled stacks in collapsed (flame graph) format")
+
+     args = parser.parse_args()
+     store = ProfileStore(args.dir)
+
+     if args.command == "list":
+          list_profiles(store)
+     else:
+          show_profile(store, args.profile_id, args.limit, args.sort, args.collapsed)
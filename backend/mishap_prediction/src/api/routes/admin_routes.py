@@ -0,0 +1,39 @@
+import hmac
+from flask import Blueprint, request, jsonify
+from src.config import ADMIN_TOKEN
+from src.services.reloader import ArtifactReloader
+
+admin_bp = Blueprint('admin', __name__)
+
+LOOPBACK_ADDRESSES = {"127.0.0.1", "::1"}
+
+@admin_bp.before_request
+def require_admin():
+     if ADMIN_TOKEN:
+          supplied = request.headers.get('Authorization', '')
+          if not hmac.compare_digest(supplied.encode(), f"Bearer {ADMIN_TOKEN}".encode()):
+               return jsonify({"error": "Admin token required"}), 401
+     elif request.remote_addr not in LOOPBACK_ADDRESSES:
+          return jsonify({"error": "Admin endpoints are loopback-only when no ADMIN_TOKEN is set"}), 403
+
+@admin_bp.route('/reload', methods=['POST'])
+def reload_artifacts():
+     data = request.get_json(silent=True) or {}
+
+     force = bool(data.get('force', False))
+     wait = bool(data.get('wait', False))
+
+     if not wait:
+          started = ArtifactReloader.reload_async(force=force)
+          return jsonify({"started": started, **ArtifactReloader.status()}), 202
+
+     try:
+          reloaded = ArtifactReloader.reload(force=force)
+     except Exception as e:
+          return jsonify({"error": str(e), **ArtifactReloader.status()}), 500
+
+     return jsonify({"reloaded": reloaded, **ArtifactReloader.status()})
+
+@admin_bp.route('/generation', methods=['GET'])
+def generation():
+     return jsonify(ArtifactReloader.status())
@@ -1,51 +1,87 @@
-from flask import Blueprint, request, jsonify
-from src.config import PROCESSED_DATA_DIR
+from flask import Blueprint, Response, abort, make_response, request, jsonify, stream_with_context
+import pandas as pd
+from src.config import DRILLDOWN_ROUNDING, PROCESSED_DATA_DIR
 from data.data_context import DataContext
-from src.services.prediction_service import get_dynamic_aggregation, get_quarterly_prediction, get_yearwise_trend
-from src.services.aggregation_service import aggregate_volume_by_quarter, aggregate_volume_by_year_and_classification, get_classification_insight, get_insight_text 
+from src.services.prediction_service import get_quarterly_prediction, get_yearwise_trend, iter_entity_trends
+from src.services.query_engine import default_filters, run_aggregate_query
+from src.services.aggregation_service import get_classification_insight, get_insight_text
+from src.services.rollup import quarterly_volume_frame
+from src.utils.encoding import NDJSON_MIMETYPE, iter_ndjson, ndjson_line, response_format, to_columnar
+from src.utils.metrics import Metrics
 
 aggregation_bp = Blueprint('aggregation', __name__)
 
+def requested_format(payload):
+     try:
+          return response_format(payload, request.headers.get('Accept'))
+     except ValueError as e:
+          abort(make_response(jsonify({"error": str(e)}), 400))
+
+def stream_ndjson(lines):
+     """
+     Stream the NDJSON lines produced by lines() on the generation the
+     request started on.
+     """
+     generation = DataContext.generation()
+
+     def generate():
+          with DataContext.pinned(generation):
+               yield from lines()
+
+     return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+def trend_insight(result, filters):
+     if 'MishapType' in filters:
+          return get_insight_text(result, 'mishap_by_type')
+     return get_classification_insight(result)
+
 @aggregation_bp.route('/yearly-trend', methods=['POST'])
 def yearly_trend():
      data = request.get_json()
 
+     # The window is open-ended: end_year is not read, the dashboard sends
+     # the last historical year (e.g. 2025) and still expects the forecast
+     # years, which n_quarters bounds
      filters = data.get('filters', {})
      start_year = data.get('start_year')
-     end_year = data.get('end_year')
      n_quarters = data.get('n_quarters', 4)
      w_rf = float(data.get('w_rf', 0.3))
      w_gb = float(data.get('w_gb', 0.7))
+     fmt = requested_format(data)
     
      df_features = DataContext.features()
 
-     # Historical + Predicted Data
-     df = get_yearwise_trend(
+     if fmt == "ndjson":
+          # One line per row as each entity finishes, then the insight
+          def lines():
+               results = []
+               for result in iter_entity_trends(df_features, filters, n_quarters, w_rf, w_gb, start_year=start_year or None):
+                    results.append(result)
+                    yield from iter_ndjson(result)
+
+               if results:
+                    result = pd.concat(results, ignore_index=True)
+               else:
+                    result = pd.DataFrame(columns=['entity_type', 'entity_value', 'year', 'data_type', 'mishap_count'])
+               yield ndjson_line({"summary_insight": trend_insight(result, filters)})
+
+          return stream_ndjson(lines)
+
+     # Historical (rollup) + Predicted Data, already year-wise
+     result = get_yearwise_trend(
         df_features=df_features,
         filters=filters,
         n_quarters=n_quarters,
-         w_rf=w_rf,
-         w_gb=w_gb
+        w_rf=w_rf,
+        w_gb=w_gb,
+        start_year=start_year or None
      )
 
-     if start_year:
-         df = df[df['year'] >= start_year]
+     summary_insight = trend_insight(result, filters)
 
-     result = aggregate_volume_by_year_and_classification(df)
-
-     records = result.to_dict(orient='records')
-
-     if 'MishapType' in filters:
-         response = {
-               "data": records,
-               "summary_insight": get_insight_text(result, 'mishap_by_type')
-         }
-     else:
-            response = {
-                  "data": records,
-                  "summary_insight": get_classification_insight(result)
-            }
-     return jsonify(response)
+     with Metrics.span("route.encode"):
+          records = to_columnar(result) if fmt == "columnar" else result.to_dict(orient='records')
+          return jsonify({"data": records, "summary_insight": summary_insight})
 
 @aggregation_bp.route('/quarterly-prediction', methods=['POST'])
 def quarterly_prediction():
@@ -57,62 +93,82 @@ def quarterly_prediction():
      n_quarters = data.get('n_quarters', 4)
      w_rf = float(data.get('w_rf', 0.3))
      w_gb = float(data.get('w_gb', 0.7))
+     fmt = requested_format(data)
     
      df_features = DataContext.features()
 
-     # Historical + Predicted Data
-     df = get_quarterly_prediction(
+     if fmt == "ndjson":
+          def lines():
+               for result in iter_entity_trends(
+                    df_features, filters, n_quarters, w_rf, w_gb,
+                    volume_frame=quarterly_volume_frame,
+                    start_year=start_year or None,
+                    end_year=end_year or None
+               ):
+                    yield from iter_ndjson(result)
+
+          return stream_ndjson(lines)
+
+     # Historical (rollup) + Predicted Data, already quarter-wise
+     result = get_quarterly_prediction(
         df_features=df_features,
         filters=filters,
         n_quarters=n_quarters,
         w_rf=w_rf,
-        w_gb=w_gb
+        w_gb=w_gb,
+        start_year=start_year or None,
+        end_year=end_year or None
      )
 
-     if start_year:
-         df = df[df['year'] >= start_year]
-
-     if end_year:
-         df = df[df['year'] < end_year]
-     
-     result = aggregate_volume_by_quarter(df)
-     return jsonify(result.to_dict(orient='records'))
+     with Metrics.span("route.encode"):
+          if fmt == "columnar":
+               return jsonify(to_columnar(result))
+          return jsonify(result.to_dict(orient='records'))
 
 @aggregation_bp.route('/aggregate', methods=['POST'])
 def aggregate_dynamic():
     payload = request.get_json()
 
-    filters   = payload.get("filters", {})
+    filters   = payload.get("filters") or default_filters(payload.get("current_selection"))
     group_by  = payload.get("group_by", [])
     drill_by  = payload.get("drill_by", [])
     metrics   = payload.get("metrics", ["mishap_count"])
-    current_selection = payload.get("current_selection", {})
+    rounding  = payload.get("rounding", DRILLDOWN_ROUNDING)
     selected_year = payload.get("selected_year")
     n_quarters = payload.get("n_quarters", 8)
     w_rf = float(payload.get('w_rf', 0.3))
     w_gb = float(payload.get('w_gb', 0.7))
+    fmt = requested_format(payload)
 
-    df_features = DataContext.features()
-
-    if (current_selection == 'MishapType'):
-         filters = {'MishapClassification': ['A', 'B', 'C', 'D', 'E'], 'Source': ['Mishap Report']}
-    else:
-        filters = filters = {'MishapType': ['Aviation', 'Ground'], 'Source': ['Mishap Report']}
-
-
-    df = get_yearwise_trend(
-        df_features=df_features,
-        filters=filters,
-        n_quarters=n_quarters,
-        w_rf=w_rf,
-        w_gb=w_gb
-     )
-
-    if selected_year:
-         df = df[df['year'] == selected_year]
+    try:
+        selected_year = int(selected_year) if selected_year else None
+    except (TypeError, ValueError):
+        return jsonify({"error": f"Invalid selected_year: {selected_year!r}"}), 400
 
-    result = aggregate_volume_by_year_and_classification(df)
+    df_features = DataContext.features()
 
-    return jsonify({
-               "predictions": result.to_dict(orient='records')
-          })
\ No newline at end of file
+    # selected_year is the window selected_year <= year < selected_year + 1
+    try:
+        result = run_aggregate_query(
+            df_features=df_features,
+            filters=filters,
+            group_by=group_by,
+            drill_by=drill_by,
+            metrics=metrics,
+            n_quarters=n_quarters,
+            w_rf=w_rf,
+            w_gb=w_gb,
+            start_year=selected_year,
+            end_year=selected_year + 1 if selected_year else None,
+            rounding=rounding
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if fmt == "ndjson":
+        return stream_ndjson(lambda: iter_ndjson(result))
+
+    with Metrics.span("route.encode"):
+        return jsonify({
+                   "predictions": to_columnar(result) if fmt == "columnar" else result.to_dict(orient='records')
+              })
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # Base Project Directory
@@ -8,8 +9,126 @@ DATA_DIR = BASE_DIR / "data"
 RAW_DATA_DIR = DATA_DIR / "raw"
 PROCESSED_DATA_DIR = DATA_DIR / "processed"
 
+# Feature set: CSV plus a memory-mappable columnar snapshot of the same rows
+FEATURES_CSV_PATH = PROCESSED_DATA_DIR / "features.csv"
+FEATURES_SNAPSHOT_DIR = PROCESSED_DATA_DIR / "features_snapshot"
+# Per-entity tail of the processed features, used by incremental refreshes
+FEATURES_TAIL_PATH = PROCESSED_DATA_DIR / "features_tail.json"
+
 # Model Paths
 MODEL_DIR = BASE_DIR / "model_artifacts"
 
 RANDOM_FOREST_MODEL_PATH = MODEL_DIR / "random_forest_v1.joblib"
-XGBOOST_MODEL_PATH = MODEL_DIR / "xgboost_v1.joblib"
\ No newline at end of file
+XGBOOST_MODEL_PATH = MODEL_DIR / "xgboost_v1.joblib"
+
+# Ensemble Pipelines (served by the API)
+RF_PIPELINE_PATH = MODEL_DIR / "rf_pipeline.joblib"
+GB_PIPELINE_PATH = MODEL_DIR / "gb_pipeline.joblib"
+
+# Default ensemble weights (served when a request sends none, and scored
+# by training)
+ENSEMBLE_W_RF = 0.3
+ENSEMBLE_W_GB = 0.7
+
+# Forecast Cache (max number of cached entity forecasts)
+FORECAST_CACHE_SIZE = 4096
+
+# Weight Sweep (w_rf grid points, w_gb = 1 - w_rf)
+WEIGHT_GRID = [round(0.1 * i, 1) for i in range(11)]
+
+# Max interpolation spread (in mishaps) accepted for off-grid weights.
+# 0 (or None) disables interpolation and every weight pair is forecast
+# exactly. Opt-in: at 2 about 80% of off-grid forecast quarters are
+# interpolated, off by at most 3 mishaps (mean 0.3) from the exact forecast
+# on the shipped artifacts.
+WEIGHT_SWEEP_TOLERANCE = 0
+
+# Compiled (array-based) export of both ensemble pipelines
+COMPILED_ENSEMBLE_PATH = MODEL_DIR / "compiled_ensemble.npz"
+
+# Training (src/models/train_pipeline.py): cores shared by the concurrent
+# RF and GB fits (-1 = all) and where headless runs write SHAP values,
+# plots and the timing report
+TRAIN_N_JOBS = -1
+TRAINING_REPORTS_DIR = MODEL_DIR / "training_reports"
+
+# Materialized forecast table (src/models/forecast_table.py): every entity
+# forecast over FORECAST_TABLE_HORIZON quarters for each WEIGHT_GRID point.
+# Served only while its data and model versions match the live ones.
+FORECAST_TABLE_PATH = MODEL_DIR / "forecast_table.npz"
+FORECAST_TABLE_HORIZON = 12
+SERVE_FORECAST_TABLE = True
+
+# Inference backend used by MishapEnsembler: "sklearn" or "compiled"
+ENSEMBLE_BACKEND = "sklearn"
+
+# Forecast fan-out across entities: "serial", "thread" or "process"
+FORECAST_EXECUTOR = "serial"
+FORECAST_WORKERS = 4
+# Max chunks queued on the worker pool before submission blocks
+FORECAST_MAX_PENDING = 8
+
+# Classification drill-down rounding: "round" (per cell) or
+# "largest_remainder" (cells add up exactly to the parent forecast)
+DRILLDOWN_ROUNDING = "round"
+
+# Hot reload: poll features.* and *_pipeline.joblib for changes and swap in
+# a new generation in the background (also available via POST /admin/reload)
+RELOAD_WATCH = False
+RELOAD_POLL_SECONDS = 5
+
+# /admin/* access: with a token set, requests must send
+# "Authorization: Bearer <token>"; without one they are accepted from
+# loopback only (set a token when serving behind a proxy)
+ADMIN_TOKEN = os.environ.get("MISHAP_ADMIN_TOKEN") or None
+
+# Streaming responses: entities forecast per chunk before their rows are
+# sent. Smaller chunks give an earlier first byte, larger chunks batch the
+# forecast (one ensemble call per step for the whole chunk). At 8 any
+# dashboard filter is forecast in one or two batches.
+STREAM_CHUNK_ENTITIES = 8
+
+# ASGI serving (src/api/asgi.py): handler threads, max requests queued or
+# running before new ones get 503, and the Retry-After sent with it
+SERVING_WORKERS = 8
+SERVING_MAX_PENDING = 64
+SERVING_RETRY_AFTER = 1
+# Read-only routes whose identical in-flight requests share one execution
+SINGLE_FLIGHT_PREFIXES = ["/predict", "/api/mishaps/"]
+
+# Micro-batching of concurrent forecasts: encoded rows from concurrent
+# recursions are stacked into one RF + GB predict. A batch waits at most
+# MICRO_BATCH_MAX_WAIT_MS for the other running forecasts to submit, and
+# not at all when no other forecast is running. bench_micro_batch.py
+# (1 core): 1 client 5.9 req/s either way, 2 clients 6.4 -> 10.4,
+# 16 clients 5.5 -> 18.8.
+MICRO_BATCH_ENABLED = True
+MICRO_BATCH_MAX_ROWS = 256
+MICRO_BATCH_MAX_WAIT_MS = 2
+# Walk-forward backtest (src/models/backtest.py): every historical quarter
+# with at least BACKTEST_MIN_HISTORY rows before it (from BACKTEST_START_YEAR
+# on, None = all) is a forecast origin, scored BACKTEST_HORIZON quarters ahead
+BACKTEST_HORIZON = 8
+BACKTEST_MIN_HISTORY = 4
+BACKTEST_START_YEAR = None
+
+# Instrumentation (src/utils/metrics.py): stage timing spans, request and
+# model counters, served in the Prometheus text format at /metrics.
+# DEBUG_TIMING adds each request's stage breakdown as a Server-Timing header.
+METRICS_ENABLED = True
+METRICS_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+DEBUG_TIMING = False
+
+# Request profiling (src/api/profiling.py), off by default. When enabled,
+# any request sent with the PROFILE_HEADER header is profiled (value
+# "sample" = stack sampling, anything else = cProfile), and with
+# PROFILE_SLOW_MS set every request is stack-sampled and kept if it took
+# at least that long. Profiles and request payloads go to a ring of the
+# last PROFILE_MAX_FILES profiles in PROFILE_DIR.
+PROFILING_ENABLED = False
+PROFILE_HEADER = "X-Profile"
+PROFILE_SLOW_MS = None
+PROFILE_SAMPLE_INTERVAL_MS = 5
+PROFILE_DIR = BASE_DIR / "profiles"
+PROFILE_MAX_FILES = 50
+PROFILE_MAX_PAYLOAD_BYTES = 65536
@@ -0,0 +1,189 @@
+import argparse
+import json
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.config import BACKTEST_HORIZON, BACKTEST_MIN_HISTORY, BACKTEST_START_YEAR
+from src.models.forecast_state import EntityForecastState, ROLLING_WINDOW
+from src.models.predict import run_recursion
+from src.utils.feature_store import FeatureStore
+
+ERROR_COLUMNS = [
+     "entity_type", "entity_value", "origin_year", "origin_quarter",
+     "horizon", "year", "quarter", "predicted", "actual"
+]
+
+def quarter_index(year, quarter):
+     return np.asarray(year, dtype=np.int64) * 4 + np.asarray(quarter, dtype=np.int64) - 1
+
+def backtest_origins(store, min_history=BACKTEST_MIN_HISTORY, start_year=BACKTEST_START_YEAR):
+     """
+     Rows of store.frame used as forecast origins: every row with at least
+     min_history rows of its entity up to and including it and at least one
+     observed row after it. Returns (origin rows, entity start row of each).
+     """
+     years = store.frame['year'].to_numpy()
+
+     rows, starts = [], []
+     for start, stop in store.offsets.values():
+          entity_rows = np.arange(start + max(min_history, 1) - 1, stop - 1)
+          rows.append(entity_rows)
+          starts.append(np.full(len(entity_rows), start))
+
+     rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+     starts = np.concatenate(starts) if starts else np.empty(0, dtype=np.int64)
+
+     if start_year is not None:
+          keep = years[rows] >= start_year
+          rows, starts = rows[keep], starts[keep]
+
+     return rows, starts
+
+def seed_origins(store, rows, starts):
+     """
+     One forecast state row per origin, as if the history ended there.
+     """
+     frame = store.frame
+     counts = frame['mishap_count'].to_numpy(dtype=np.float64)
+
+     # Last (up to) 4 counts of each origin, oldest first
+     window_len = np.minimum(rows - starts + 1, ROLLING_WINDOW)
+     window_rows = rows[:, None] - window_len[:, None] + 1 + np.arange(ROLLING_WINDOW)
+     windows = counts[np.minimum(window_rows, len(counts) - 1)]
+
+     return EntityForecastState.from_windows(
+          frame['entity_type'].to_numpy()[rows].astype(str),
+          frame['entity_value'].to_numpy()[rows].astype(str),
+          frame['year'].to_numpy()[rows],
+          frame['quarter'].to_numpy()[rows],
+          windows,
+          window_len
+     )
+
+def actual_counts(store, starts, years, quarters):
+     """
+     Observed counts at (years, quarters) for the entity starting at each
+     row of `starts`, with a validity mask. Quarters missing inside an
+     entity's history count as 0 mishaps; quarters after it are not valid.
+     """
+     frame = store.frame
+     period = quarter_index(frame['year'].to_numpy(), frame['quarter'].to_numpy())
+     counts = frame['mishap_count'].to_numpy(dtype=np.float64)
+
+     # Dense per-entity series over [first, last] quarter, concatenated
+     bounds = list(store.offsets.values())
+     first = np.array([period[start] for start, _ in bounds], dtype=np.int64)
+     last = np.array([period[stop - 1] for _, stop in bounds], dtype=np.int64)
+     dense_start = np.r_[0, np.cumsum(last - first + 1)[:-1]].astype(np.int64)
+
+     entity_of_row = np.repeat(np.arange(len(bounds)), [stop - start for start, stop in bounds])
+     dense = np.zeros(int((last - first + 1).sum()), dtype=np.float64)
+     dense[dense_start[entity_of_row] + period - first[entity_of_row]] = counts
+
+     entity = np.searchsorted([start for start, _ in bounds], starts)[:, None]
+     target = quarter_index(years, quarters)
+     valid = target <= last[entity]
+
+     offset = np.where(valid, target - first[entity], 0)
+     return np.where(valid, dense[dense_start[entity] + offset], np.nan), valid
+
+def run_backtest(df_features, horizon=BACKTEST_HORIZON, w_rf=0.3, w_gb=0.7,
+                 min_history=BACKTEST_MIN_HISTORY, start_year=BACKTEST_START_YEAR):
+     """
+     Walk-forward backtest of the recursive forecaster. Every origin of every
+     entity is forecast horizon quarters ahead in one batched recursion
+     (one ensemble predict per step over all origins x entities) and scored
+     against the observed history. One row per scored (origin, horizon).
+     """
+     store = FeatureStore.of(df_features) or FeatureStore(df_features)
+
+     rows, starts = backtest_origins(store, min_history, start_year)
+     if len(rows) == 0:
+          return pd.DataFrame(columns=ERROR_COLUMNS)
+
+     state = seed_origins(store, rows, starts)
+     years, quarters, predicted = run_recursion(state, horizon, w_rf, w_gb)
+
+     actual, valid = actual_counts(store, starts, years, quarters)
+     origin, step = np.nonzero(valid)
+
+     frame = store.frame
+     return pd.DataFrame({
+          "entity_type": frame['entity_type'].to_numpy()[rows][origin].astype(str),
+          "entity_value": frame['entity_value'].to_numpy()[rows][origin].astype(str),
+          "origin_year": frame['year'].to_numpy()[rows][origin],
+          "origin_quarter": frame['quarter'].to_numpy()[rows][origin],
+          "horizon": step + 1,
+          "year": years[origin, step],
+          "quarter": quarters[origin, step],
+          "predicted": predicted[origin, step],
+          "actual": actual[origin, step].astype(np.int64)
+     }, columns=ERROR_COLUMNS)
+
+def summarize_backtest(errors, by):
+     """
+     MAE and MAPE (in %) of a backtest, grouped by `by` (e.g. ["horizon"]).
+     MAPE is taken over rows with a non-zero actual only.
+     """
+     abs_error = (errors["predicted"] - errors["actual"]).abs()
+     nonzero = errors["actual"] > 0
+     pct_error = (abs_error / errors["actual"].where(nonzero)) * 100
+
+     scored = errors[by].assign(abs_error=abs_error, pct_error=pct_error)
+
+     return (
+          scored.groupby(by, sort=True)
+          .agg(n=("abs_error", "size"), mae=("abs_error", "mean"), mape=("pct_error", "mean"))
+          .reset_index()
+     )
+
+def backtest_report(errors):
+     """
+     JSON-ready summary: overall, by horizon and by entity.
+     """
+     def records(summary):
+          return json.loads(summary.to_json(orient="records"))
+
+     overall = summarize_backtest(errors.assign(all=0), ["all"]).drop(columns="all")
+
+     return {
+          "origins": int(len(errors[["entity_type", "entity_value", "origin_year", "origin_quarter"]].drop_duplicates())),
+          "overall": records(overall)[0] if len(overall) else None,
+          "by_horizon": records(summarize_backtest(errors, ["horizon"])),
+          "by_entity": records(summarize_backtest(errors, ["entity_type", "entity_value"]))
+     }
+
+if __name__ == "__main__":
+     # Imported here: only the CLI reads the served feature set
+     from src.preprocessing.feature_snapshot import load_features
+     from src.utils.timing import StageTimer
+
+     parser = argparse.ArgumentParser(description="Walk-forward backtest of the recursive forecaster.")
+     parser.add_argument("--horizon", type=int, default=BACKTEST_HORIZON, help="quarters forecast from every origin")
+     parser.add_argument("--w-rf", type=float, default=0.3)
+     parser.add_argument("--w-gb", type=float, default=0.7)
+     parser.add_argument("--min-history", type=int, default=BACKTEST_MIN_HISTORY, help="rows of history required at an origin")
+     parser.add_argument("--start-year", type=int, default=BACKTEST_START_YEAR, help="first origin year (default: all)")
+     parser.add_argument("--output", type=Path, help="write the JSON report here")
+     args = parser.parse_args()
+
+     timer = StageTimer()
+     with timer.stage("backtest"):
+          errors = run_backtest(load_features(), args.horizon, args.w_rf, args.w_gb, args.min_history, args.start_year)
+          report = backtest_report(errors)
+
+     pd.set_option("display.width", 160)
+     print(summarize_backtest(errors, ["horizon"]).to_string(index=False))
+     print()
+     print(summarize_backtest(errors, ["entity_type", "entity_value"]).to_string(index=False))
+     print()
+     print(f"{report['origins']} origins, {len(errors)} forecasts scored in {timer.stages['backtest']:.3f}s")
+
+     if args.output:
+          args.output.write_text(json.dumps(report, indent=2))
+          print(f"Backtest report saved to {args.output}")
@@ -0,0 +1,280 @@
+import threading
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.config import RF_PIPELINE_PATH, GB_PIPELINE_PATH, COMPILED_ENSEMBLE_PATH
+from src.models.registry import ModelRegistry, file_digest
+
+class CompiledForest:
+     """
+     A fitted tree ensemble flattened into contiguous node arrays.
+     All trees share one node table; leaves point back to themselves so a
+     fixed number of vectorized steps walks every (row, tree) pair at once.
+     Prediction is the mean of the leaf values (forest) or base + scale * sum
+     of the leaf values (boosting), accumulated tree by tree in the same order
+     sklearn uses.
+     """
+
+     def __init__(self, feature, threshold, left, right, value, roots, depth, base, scale, average):
+          self.feature = feature
+          self.threshold = threshold
+          self.left = left
+          self.right = right
+          self.value = value
+          self.roots = roots
+          self.depth = int(depth)
+          self.base = float(base)
+          self.scale = float(scale)
+          self.average = bool(average)
+
+     @classmethod
+     def from_model(cls, model):
+          if hasattr(model, "init_"):
+               # GradientBoostingRegressor: init constant + learning_rate * stages
+               trees = [est.tree_ for est in model.estimators_[:, 0]]
+               base = 0.0 if model.init_ == "zero" else np.ravel(model.init_.constant_)[0]
+               scale = model.learning_rate
+               average = False
+          else:
+               # RandomForestRegressor: mean of the trees
+               trees = [est.tree_ for est in model.estimators_]
+               base = 0.0
+               scale = 1.0
+               average = True
+
+          sizes = np.array([t.node_count for t in trees], dtype=np.int64)
+          roots = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+
+          feature, threshold, left, right, value = [], [], [], [], []
+
+          for tree, offset in zip(trees, roots):
+               nodes = np.arange(tree.node_count, dtype=np.int64) + offset
+               is_leaf = tree.children_left == -1
+
+               feature.append(np.where(is_leaf, 0, tree.feature))
+               threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+               left.append(np.where(is_leaf, nodes, tree.children_left + offset))
+               right.append(np.where(is_leaf, nodes, tree.children_right + offset))
+               value.append(tree.value[:, 0, 0])
+
+          return cls(
+               feature=np.concatenate(feature).astype(np.int32),
+               threshold=np.concatenate(threshold).astype(np.float64),
+               left=np.concatenate(left).astype(np.int64),
+               right=np.concatenate(right).astype(np.int64),
+               value=np.concatenate(value).astype(np.float64),
+               roots=roots,
+               depth=max(t.max_depth for t in trees),
+               base=base,
+               scale=scale,
+               average=average
+          )
+
+     def leaves(self, X):
+          """
+          Leaf node of every tree for every row (rows x trees).
+          """
+          # sklearn compares float32 features against float64 thresholds
+          X = np.asarray(X, dtype=np.float32).astype(np.float64)
+          rows = np.arange(X.shape[0])[:, None]
+
+          node = np.broadcast_to(self.roots, (X.shape[0], len(self.roots))).copy()
+
+          for _ in range(self.depth):
+               go_left = X[rows, self.feature[node]] <= self.threshold[node]
+               node = np.where(go_left, self.left[node], self.right[node])
+
+          return node
+
+     def predict(self, X):
+          leaf_values = self.value[self.leaves(X)]
+
+          if self.average:
+               # Forest: sum tree by tree, then average
+               out = np.zeros(leaf_values.shape[0])
+               for t in range(leaf_values.shape[1]):
+                    out += leaf_values[:, t]
+               return out / leaf_values.shape[1]
+
+          out = np.full(leaf_values.shape[0], self.base)
+          for t in range(leaf_values.shape[1]):
+               out += self.scale * leaf_values[:, t]
+          return out
+
+     def to_arrays(self, prefix):
+          return {
+               f"{prefix}_feature": self.feature,
+               f"{prefix}_threshold": self.threshold,
+               f"{prefix}_left": self.left,
+               f"{prefix}_right": self.right,
+               f"{prefix}_value": self.value,
+               f"{prefix}_roots": self.roots,
+               f"{prefix}_params": np.array([self.depth, self.base, self.scale, self.average], dtype=np.float64)
+          }
+
+     @classmethod
+     def from_arrays(cls, arrays, prefix):
+          depth, base, scale, average = arrays[f"{prefix}_params"]
+          return cls(
+               feature=arrays[f"{prefix}_feature"],
+               threshold=arrays[f"{prefix}_threshold"],
+               left=arrays[f"{prefix}_left"],
+               right=arrays[f"{prefix}_right"],
+               value=arrays[f"{prefix}_value"],
+               roots=arrays[f"{prefix}_roots"],
+               depth=depth,
+               base=base,
+               scale=scale,
+               average=average
+          )
+
+class CompiledEnsemble:
+     """
+     Array-based replacement for the RF + GB sklearn pipelines.
+     Holds the one-hot mapping of the shared ColumnTransformer and both
+     compiled forests, and predicts without any sklearn dispatch.
+     `source` records the content hashes of the pipelines it was built from.
+     """
+     _lock = threading.Lock()
+     _current = None
+
+     def __init__(self, cat_cols, categories, num_cols, rf, gb, source):
+          self.cat_cols = list(cat_cols)
+          self.categories = [list(c) for c in categories]
+          self.num_cols = list(num_cols)
+          self.rf = rf
+          self.gb = gb
+          self.source = tuple(source)
+
+          self.offsets = np.concatenate([[0], np.cumsum([len(c) for c in self.categories])]).astype(np.int64)
+          self.n_features = int(self.offsets[-1]) + len(self.num_cols)
+
+     @classmethod
+     def from_pipelines(cls, rf_pipeline, gb_pipeline, source=("", "")):
+          cat_cols, categories, num_cols = None, None, None
+
+          for name, transformer, cols in rf_pipeline.named_steps['preprocess'].transformers_:
+               if name == "cat":
+                    if getattr(transformer, "drop", None) is not None:
+                         raise ValueError("Compiled ensemble does not support OneHotEncoder(drop=...)")
+                    cat_cols, categories = cols, transformer.categories_
+               elif name == "num":
+                    num_cols = cols
+               elif transformer != "drop":
+                    raise ValueError(f"Unsupported preprocessing step: {name}")
+
+          return cls(
+               cat_cols=cat_cols,
+               categories=categories,
+               num_cols=num_cols,
+               rf=CompiledForest.from_model(rf_pipeline.named_steps['model']),
+               gb=CompiledForest.from_model(gb_pipeline.named_steps['model']),
+               source=source
+          )
+
+     @classmethod
+     def current(cls):
+          """
+          Compiled ensemble for the pipelines ModelRegistry currently serves.
+          Uses the exported artifact when it was built from the same pipelines,
+          otherwise compiles them in memory.
+          """
+          source = (ModelRegistry.digest(RF_PIPELINE_PATH), ModelRegistry.digest(GB_PIPELINE_PATH))
+
+          compiled = cls._current
+          if compiled is not None and compiled.source == source:
+               return compiled
+
+          with cls._lock:
+               compiled = cls._current
+               if compiled is not None and compiled.source == source:
+                    return compiled
+
+               compiled = None
+               if COMPILED_ENSEMBLE_PATH.exists():
+                    compiled = cls.load(COMPILED_ENSEMBLE_PATH)
+                    if compiled.source != source:
+                         compiled = None
+
+               if compiled is None:
+                    compiled = cls.from_pipelines(
+                         ModelRegistry.get(RF_PIPELINE_PATH),
+                         ModelRegistry.get(GB_PIPELINE_PATH),
+                         source=source
+                    )
+
+               cls._current = compiled
+               return compiled
+
+     def save(self, path=COMPILED_ENSEMBLE_PATH):
+          arrays = {
+               "cat_cols": np.array(self.cat_cols, dtype=str),
+               "num_cols": np.array(self.num_cols, dtype=str),
+               "source": np.array(self.source, dtype=str),
+               **{f"categories_{i}": np.array(c, dtype=str) for i, c in enumerate(self.categories)},
+               **self.rf.to_arrays("rf"),
+               **self.gb.to_arrays("gb")
+          }
+          np.savez(path, **arrays)
+
+     @classmethod
+     def load(cls, path=COMPILED_ENSEMBLE_PATH):
+          with np.load(path) as data:
+               arrays = {key: data[key] for key in data.files}
+
+          cat_cols = arrays["cat_cols"].tolist()
+
+          return cls(
+               cat_cols=cat_cols,
+               categories=[arrays[f"categories_{i}"].tolist() for i in range(len(cat_cols))],
+               num_cols=arrays["num_cols"].tolist(),
+               rf=CompiledForest.from_arrays(arrays, "rf"),
+               gb=CompiledForest.from_arrays(arrays, "gb"),
+               source=arrays["source"].tolist()
+          )
+
+     def encode(self, input_df):
+          """
+          One-hot + passthrough encoding, same column layout as the pipelines.
+          Unknown categories encode as all zeros (handle_unknown="ignore").
+          """
+          X = np.zeros((len(input_df), self.n_features), dtype=np.float64)
+          rows = np.arange(len(input_df))
+
+          for col, cats, offset in zip(self.cat_cols, self.categories, self.offsets):
+               codes = pd.Categorical(input_df[col], categories=cats).codes
+               known = codes >= 0
+               X[rows[known], offset + codes[known]] = 1.0
+
+          X[:, self.offsets[-1]:] = input_df[self.num_cols].to_numpy(dtype=np.float64)
+          return X
+
+     def feature_positions(self, columns):
+          return {col: int(self.offsets[-1]) + self.num_cols.index(col) for col in columns}
+
+     def predict_encoded(self, X, w_rf, w_gb):
+          return w_rf * self.rf.predict(X) + w_gb * self.gb.predict(X)
+
+     def predict(self, input_df, w_rf, w_gb):
+          return self.predict_encoded(self.encode(input_df), w_rf, w_gb)
+
+def export_compiled_ensemble(rf_pipeline, gb_pipeline, path=COMPILED_ENSEMBLE_PATH):
+     """
+     Flatten the saved pipelines into the compiled artifact served by the API.
+     """
+     compiled = CompiledEnsemble.from_pipelines(
+          rf_pipeline,
+          gb_pipeline,
+          source=(file_digest(RF_PIPELINE_PATH), file_digest(GB_PIPELINE_PATH))
+     )
+     compiled.save(path)
+     return compiled
+
+if __name__ == "__main__":
+     export_compiled_ensemble(ModelRegistry.get(RF_PIPELINE_PATH), ModelRegistry.get(GB_PIPELINE_PATH))
+     print(f"Compiled ensemble saved to {COMPILED_ENSEMBLE_PATH}")
@@ -1,4 +1,3 @@
-import joblib
 import numpy as np
 import sys
 from pathlib import Path
@@ -6,18 +5,89 @@ from pathlib import Path
 PROJECT_ROOT = Path().resolve()
 sys.path.append(str(PROJECT_ROOT))
 
-from src.config import MODEL_DIR
+from src.config import RF_PIPELINE_PATH, GB_PIPELINE_PATH, ENSEMBLE_BACKEND
+from src.models.compiled_ensemble import CompiledEnsemble
+from src.models.registry import ModelRegistry
+from src.utils.metrics import Metrics
+
+BACKENDS = ("sklearn", "compiled")
 
 class MishapEnsembler:
-     def __init__(self, w_rf=0.0, w_gb=1.0):
-          self.rf_pipeline = joblib.load(MODEL_DIR / "rf_pipeline.joblib")
-          self.gb_pipeline = joblib.load(MODEL_DIR / "gb_pipeline.joblib")
+     def __init__(self, w_rf=0.0, w_gb=1.0, backend=ENSEMBLE_BACKEND):
+          if backend not in BACKENDS:
+               raise ValueError(f"Unknown ensemble backend: {backend}. Expected one of {BACKENDS}")
+
+          # Pipelines are shared process-wide, constructing an ensembler is cheap
+          self.rf_pipeline = ModelRegistry.get(RF_PIPELINE_PATH)
+          self.gb_pipeline = ModelRegistry.get(GB_PIPELINE_PATH)
+          self.compiled = CompiledEnsemble.current() if backend == "compiled" else None
+          self.backend = backend
           self.w_rf = w_rf
           self.w_gb = w_gb
+
+     @staticmethod
+     def version(backend=ENSEMBLE_BACKEND):
+          """
+          Version stamp for forecasts produced by this ensemble configuration.
+          """
+          return f"{ModelRegistry.version()}-{backend}"
           
-     def predict(self, input_df):
+     @Metrics.timed("model.predict")
+     def predict(self, input_df, w_rf=None, w_gb=None):
+          w_rf = self.w_rf if w_rf is None else w_rf
+          w_gb = self.w_gb if w_gb is None else w_gb
+
+          Metrics.inc("mishap_model_calls_total", backend=self.backend)
+          Metrics.inc("mishap_model_rows_total", len(input_df), backend=self.backend)
+
+          if self.compiled is not None:
+               return self.compiled.predict(input_df, w_rf, w_gb)
+
+          return (
+               w_rf * self.rf_pipeline.predict(input_df) + 
+               w_gb * self.gb_pipeline.predict(input_df)
+          )
+
+     def encode(self, input_df):
+          """
+          Run the preprocessing step on raw feature rows.
+          Both pipelines are trained with the same ColumnTransformer, so the
+          encoded matrix can be fed to either model.
+          """
+          if self.compiled is not None:
+               return self.compiled.encode(input_df)
+
+          encoded = self.rf_pipeline.named_steps['preprocess'].transform(input_df)
+          if hasattr(encoded, "toarray"):
+               encoded = encoded.toarray()
+          return np.ascontiguousarray(encoded, dtype=np.float64)
+
+     def feature_positions(self, columns):
+          """
+          Column index of each passthrough numeric feature in the encoded matrix.
+          """
+          if self.compiled is not None:
+               return self.compiled.feature_positions(columns)
+
+          names = list(self.rf_pipeline.named_steps['preprocess'].get_feature_names_out())
+          return {col: names.index(f"num__{col}") for col in columns}
+
+     @Metrics.timed("model.predict")
+     def predict_encoded(self, X, w_rf=None, w_gb=None):
+          """
+          Same as predict(), for a matrix already produced by encode().
+          """
+          w_rf = self.w_rf if w_rf is None else w_rf
+          w_gb = self.w_gb if w_gb is None else w_gb
+
+          Metrics.inc("mishap_model_calls_total", backend=self.backend)
+          Metrics.inc("mishap_model_rows_total", len(X), backend=self.backend)
+
+          if self.compiled is not None:
+               return self.compiled.predict_encoded(X, w_rf, w_gb)
+
           return (
-               self.w_rf * self.rf_pipeline.predict(input_df) + 
-               self.w_gb * self.gb_pipeline.predict(input_df)
+               w_rf * self.rf_pipeline.named_steps['model'].predict(X) +
+               w_gb * self.gb_pipeline.named_steps['model'].predict(X)
           )
 
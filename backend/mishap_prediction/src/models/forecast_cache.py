@@ -0,0 +1,73 @@
+import threading
+from collections import OrderedDict
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.config import FORECAST_CACHE_SIZE
+
+class ForecastCache:
+     """
+     Process-wide LRU cache of per-entity recursive forecasts.
+     Keys carry the data version (features fingerprint) and model version
+     (artifact hash), so a rebuilt feature set or retrained pipeline simply
+     stops matching old entries, which then age out.
+     """
+     _lock = threading.Lock()
+     _entries: OrderedDict = OrderedDict()
+     max_entries = FORECAST_CACHE_SIZE
+     hits = 0
+     misses = 0
+
+     @staticmethod
+     def make_key(entity_type, entity_value, n_quarters, w_rf, w_gb, data_version, model_version):
+          return (
+               entity_type,
+               entity_value,
+               int(n_quarters),
+               float(w_rf),
+               float(w_gb),
+               data_version,
+               model_version
+          )
+
+     @classmethod
+     def get(cls, key):
+          with cls._lock:
+               value = cls._entries.get(key)
+
+               if value is None:
+                    cls.misses += 1
+                    return None
+
+               cls._entries.move_to_end(key)
+               cls.hits += 1
+               return value
+
+     @classmethod
+     def put(cls, key, value):
+          with cls._lock:
+               cls._entries[key] = value
+               cls._entries.move_to_end(key)
+
+               while len(cls._entries) > cls.max_entries:
+                    cls._entries.popitem(last=False)
+
+     @classmethod
+     def stats(cls):
+          with cls._lock:
+               return {
+                    "hits": cls.hits,
+                    "misses": cls.misses,
+                    "size": len(cls._entries),
+                    "max_size": cls.max_entries
+               }
+
+     @classmethod
+     def clear(cls):
+          with cls._lock:
+               cls._entries.clear()
+               cls.hits = 0
+               cls.misses = 0
@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+
+from src.utils.feature_store import FeatureStore
+
+ROLLING_WINDOW = 4
+
+NUMERIC_FEATURES = ['year', 'quarter', 'prev_qtr_count', 'qoq_change', 'rolling_4q_avg']
+
+def next_quarter_of(year, quarter):
+     """
+     Vectorized (year, quarter) + 1 quarter.
+     """
+     rollover = quarter == 4
+     return np.where(rollover, year + 1, year), np.where(rollover, 1, quarter + 1)
+
+class EntityForecastState:
+     """
+     Recursion state for a batch of entities.
+     Keeps the last count, a fixed ring of the last 4 counts and the next
+     (year, quarter) to forecast, so each horizon step is O(1) per entity
+     instead of re-deriving features from the whole history.
+     """
+
+     def __init__(self, entity_types, entity_values, last_year, last_quarter, recent_counts):
+          n = len(entity_types)
+
+          self.entity_types = list(entity_types)
+          self.entity_values = list(entity_values)
+
+          self.last_count = np.zeros(n, dtype=np.float64)
+          self.window = np.zeros((n, ROLLING_WINDOW), dtype=np.float64)
+          self.window_len = np.zeros(n, dtype=np.int64)
+          self.window_pos = np.zeros(n, dtype=np.int64)
+
+          for i, counts in enumerate(recent_counts):
+               counts = list(counts)[-ROLLING_WINDOW:]
+               self.window[i, :len(counts)] = counts
+               self.window_len[i] = len(counts)
+               self.window_pos[i] = len(counts) % ROLLING_WINDOW
+               self.last_count[i] = counts[-1]
+
+          self.next_year, self.next_quarter = next_quarter_of(
+               np.asarray(last_year, dtype=np.int64),
+               np.asarray(last_quarter, dtype=np.int64)
+          )
+
+     @classmethod
+     def from_history(cls, df_features, entities):
+          """
+          Seed the state from each entity's last rows in the feature frame.
+          Frames backed by a FeatureStore are read through its entity slices.
+          """
+          store = FeatureStore.of(df_features)
+
+          last_year = []
+          last_quarter = []
+          recent_counts = []
+
+          for entity_type, entity_value in entities:
+               if store is not None:
+                    entity_df = store.slice(entity_type, entity_value)
+               else:
+                    entity_df = df_features[
+                         (df_features['entity_type'] == entity_type) &
+                         (df_features['entity_value'] == entity_value)
+                    ].sort_values(by=['year', 'quarter'])
+
+               if entity_df is None or entity_df.empty:
+                    raise ValueError(f"No data found for entity_type: {entity_type}, entity_value: {entity_value}")
+
+               last_year.append(entity_df['year'].iloc[-1])
+               last_quarter.append(entity_df['quarter'].iloc[-1])
+               recent_counts.append(entity_df['mishap_count'].tail(ROLLING_WINDOW).tolist())
+
+          return cls(
+               [e[0] for e in entities],
+               [e[1] for e in entities],
+               last_year,
+               last_quarter,
+               recent_counts
+          )
+
+     @classmethod
+     def from_windows(cls, entity_types, entity_values, last_year, last_quarter, windows, window_len):
+          """
+          Seed many rows at once from (n, 4) arrays of recent counts, oldest
+          first, of which the first window_len[i] entries of row i are set.
+          Same state as the constructor, without a per-row loop.
+          """
+          state = object.__new__(cls)
+
+          windows = np.asarray(windows, dtype=np.float64)
+          window_len = np.asarray(window_len, dtype=np.int64)
+
+          state.entity_types = list(entity_types)
+          state.entity_values = list(entity_values)
+
+          state.window = np.where(np.arange(ROLLING_WINDOW) < window_len[:, None], windows, 0.0)
+          state.window_len = window_len
+          state.window_pos = window_len % ROLLING_WINDOW
+          state.last_count = state.window[np.arange(len(window_len)), window_len - 1]
+
+          state.next_year, state.next_quarter = next_quarter_of(
+               np.asarray(last_year, dtype=np.int64),
+               np.asarray(last_quarter, dtype=np.int64)
+          )
+
+          return state
+
+     def repeat(self, times):
+          """
+          Copy of the state with every entity row repeated `times` times
+          (rows for one entity stay adjacent).
+          """
+          repeated = object.__new__(EntityForecastState)
+
+          repeated.entity_types = [e for e in self.entity_types for _ in range(times)]
+          repeated.entity_values = [e for e in self.entity_values for _ in range(times)]
+
+          for attr in ['last_count', 'window', 'window_len', 'window_pos', 'next_year', 'next_quarter']:
+               setattr(repeated, attr, np.repeat(getattr(self, attr), times, axis=0))
+
+          return repeated
+
+     def __len__(self):
+          return len(self.entity_types)
+
+     def rolling_avg(self):
+          # Empty ring slots hold 0, so the sum only covers observed counts
+          return self.window.sum(axis=1) / self.window_len
+
+     def input_frame(self):
+          """
+          Raw feature rows for the next quarter (one per entity).
+          """
+          return pd.DataFrame({
+               "entity_type": self.entity_types,
+               "entity_value": self.entity_values,
+               "year": self.next_year,
+               "quarter": self.next_quarter,
+               "prev_qtr_count": self.last_count,
+               "qoq_change": 0,
+               "rolling_4q_avg": self.rolling_avg()
+          })
+
+     def write_features(self, X, positions):
+          """
+          Refresh the numeric columns of a preallocated encoded matrix in place.
+          """
+          X[:, positions['year']] = self.next_year
+          X[:, positions['quarter']] = self.next_quarter
+          X[:, positions['prev_qtr_count']] = self.last_count
+          X[:, positions['qoq_change']] = 0
+          X[:, positions['rolling_4q_avg']] = self.rolling_avg()
+
+     def advance(self, counts):
+          """
+          Fold the counts predicted for the current quarter into the state.
+          """
+          rows = np.arange(len(self))
+
+          self.window[rows, self.window_pos] = counts
+          self.window_pos = (self.window_pos + 1) % ROLLING_WINDOW
+          self.window_len = np.minimum(self.window_len + 1, ROLLING_WINDOW)
+          self.last_count = np.asarray(counts, dtype=np.float64)
+
+          self.next_year, self.next_quarter = next_quarter_of(self.next_year, self.next_quarter)
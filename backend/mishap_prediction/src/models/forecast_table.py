@@ -0,0 +1,190 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import numpy as np
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.config import FORECAST_TABLE_PATH, FORECAST_TABLE_HORIZON, WEIGHT_GRID
+from src.models.ensemble import MishapEnsembler
+from src.utils.helpers import frame_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the stored arrays or metadata change
+TABLE_SCHEMA_VERSION = 1
+
+class ForecastTable:
+     """
+     Precomputed forecasts for every entity of a feature set, over a horizon
+     and a grid of (w_rf, w_gb) weights, stamped with the data and model
+     versions they were computed from.
+     A recursive forecast of n quarters is the first n quarters of any
+     longer one, so every horizon up to the materialized one is served by
+     slicing. Lookups go through an entity index and a weight index.
+     """
+     _lock = threading.Lock()
+     _loaded = None
+
+     def __init__(self, entities, w_rf, w_gb, years, quarters, counts, data_version, model_version):
+          self.entities = [tuple(e) for e in entities]
+          self.w_rf = np.asarray(w_rf, dtype=np.float64)
+          self.w_gb = np.asarray(w_gb, dtype=np.float64)
+          self.years = years
+          self.quarters = quarters
+          self.counts = counts
+          self.data_version = data_version
+          self.model_version = model_version
+
+          self.entity_index = {entity: i for i, entity in enumerate(self.entities)}
+          self.weight_index = {(float(a), float(b)): j for j, (a, b) in enumerate(zip(self.w_rf, self.w_gb))}
+
+     @property
+     def horizon(self):
+          return self.counts.shape[2]
+
+     @classmethod
+     def materialize(cls, df_features, entities, horizon=FORECAST_TABLE_HORIZON, grid=WEIGHT_GRID):
+          """
+          Forecast every entity for every grid weight in one batched pass.
+          """
+          # Imported here: weight_sweep builds on predict, which serves from this table
+          from src.models.weight_sweep import forecast_weight_grid, grid_weights
+
+          w_rf, w_gb = grid_weights(grid)
+          years, quarters, counts = forecast_weight_grid(df_features, entities, horizon, grid)
+
+          return cls(
+               entities=entities,
+               w_rf=w_rf,
+               w_gb=w_gb,
+               years=years,
+               quarters=quarters,
+               counts=counts,
+               data_version=frame_fingerprint(df_features),
+               model_version=MishapEnsembler.version()
+          )
+
+     def matches(self, data_version, model_version):
+          return self.data_version == data_version and self.model_version == model_version
+
+     def lookup(self, entity, n_quarters, w_rf, w_gb):
+          """
+          (years, quarters, counts) block of one entity, or None when the
+          entity, weights or horizon are not in the table.
+          """
+          i = self.entity_index.get(entity)
+          j = self.weight_index.get((float(w_rf), float(w_gb)))
+
+          if i is None or j is None or n_quarters > self.horizon:
+               return None
+
+          return self.years[i, :n_quarters], self.quarters[i, :n_quarters], self.counts[i, j, :n_quarters]
+
+     def save(self, path=FORECAST_TABLE_PATH):
+          path = Path(path)
+          metadata = {
+               "schema_version": TABLE_SCHEMA_VERSION,
+               "data_version": self.data_version,
+               "model_version": self.model_version,
+               "entities": [list(e) for e in self.entities]
+          }
+
+          tmp = path.with_name(path.name + ".tmp.npz")
+          np.savez(
+               tmp,
+               metadata=np.array(json.dumps(metadata)),
+               w_rf=self.w_rf,
+               w_gb=self.w_gb,
+               years=self.years,
+               quarters=self.quarters,
+               counts=self.counts
+          )
+          os.replace(tmp, path)
+
+     @classmethod
+     def load(cls, path=FORECAST_TABLE_PATH):
+          with np.load(path) as data:
+               metadata = json.loads(str(data["metadata"]))
+
+               if metadata["schema_version"] != TABLE_SCHEMA_VERSION:
+                    raise ValueError(f"Unsupported forecast table schema: {metadata['schema_version']}")
+
+               table = cls(
+                    entities=metadata["entities"],
+                    w_rf=data["w_rf"],
+                    w_gb=data["w_gb"],
+                    years=data["years"],
+                    quarters=data["quarters"],
+                    counts=data["counts"],
+                    data_version=metadata["data_version"],
+                    model_version=metadata["model_version"]
+               )
+
+          for arr in (table.years, table.quarters, table.counts):
+               arr.flags.writeable = False
+          return table
+
+     @classmethod
+     def current(cls, path=FORECAST_TABLE_PATH):
+          """
+          The materialized table on disk (reloaded when the file changes),
+          or None when there is none or it cannot be read.
+          """
+          try:
+               mtime = os.stat(path).st_mtime_ns
+          except FileNotFoundError:
+               return None
+
+          loaded = cls._loaded
+          if loaded is not None and loaded[0] == (str(path), mtime):
+               return loaded[1]
+
+          with cls._lock:
+               loaded = cls._loaded
+               if loaded is not None and loaded[0] == (str(path), mtime):
+                    return loaded[1]
+
+               try:
+                    table = cls.load(path)
+               except (ValueError, OSError, KeyError) as e:
+                    logger.warning("Ignoring forecast table %s: %s", path, e)
+                    table = None
+
+               cls._loaded = ((str(path), mtime), table)
+               return table
+
+def materialize_forecasts(horizon=FORECAST_TABLE_HORIZON, grid=WEIGHT_GRID, path=FORECAST_TABLE_PATH):
+     """
+     Forecast every entity of the served feature store and save the table.
+     """
+     # Imported here: only the CLI job needs the serving data context
+     from data.data_context import DataContext
+
+     DataContext.load()
+     store = DataContext.store()
+
+     with DataContext.pinned():
+          table = ForecastTable.materialize(store.frame, store.entities(), horizon, grid)
+
+     table.save(path)
+     return table
+
+if __name__ == "__main__":
+     parser = argparse.ArgumentParser(description="Precompute forecasts for every entity into the forecast table served by the API.")
+     parser.add_argument("--horizon", type=int, default=FORECAST_TABLE_HORIZON, help="quarters to forecast")
+     parser.add_argument("--grid", type=float, nargs="+", default=WEIGHT_GRID, help="w_rf grid points (w_gb = 1 - w_rf)")
+     parser.add_argument("--output", type=Path, default=FORECAST_TABLE_PATH)
+     args = parser.parse_args()
+
+     table = materialize_forecasts(args.horizon, args.grid, args.output)
+     print(
+          f"Forecast table saved to {args.output}: {len(table.entities)} entities, "
+          f"{len(table.w_rf)} weights, {table.horizon} quarters "
+          f"(data {table.data_version}, model {table.model_version})"
+     )
@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.config import MICRO_BATCH_ENABLED, MICRO_BATCH_MAX_ROWS, MICRO_BATCH_MAX_WAIT_MS
+
+class _Submission:
+     __slots__ = ("key", "ensembler", "X", "w_rf", "w_gb", "done", "result", "error")
+
+     def __init__(self, ensembler, X, w_rf, w_gb):
+          self.key = (id(ensembler.rf_pipeline), id(ensembler.gb_pipeline), id(ensembler.compiled))
+          self.ensembler = ensembler
+          self.X = X
+          self.w_rf = np.broadcast_to(np.asarray(w_rf, dtype=np.float64), (len(X),))
+          self.w_gb = np.broadcast_to(np.asarray(w_gb, dtype=np.float64), (len(X),))
+          self.done = threading.Event()
+          self.result = None
+          self.error = None
+
+class InferenceBatcher:
+     """
+     Micro-batching in front of the ensemble.
+     Concurrent forecasts submit their encoded rows; the first submitter of
+     a batch becomes its leader, waits until every other running forecast
+     has submitted too (or max_rows / max_wait is reached), then runs one
+     stacked RF + GB predict per model generation and hands every caller
+     its slice. A forecast running alone never waits.
+     Rows are predicted independently, so results are identical to
+     unbatched calls.
+     """
+     _cond = threading.Condition()
+     _pending = []
+     _pending_rows = 0
+     _collecting = False
+     active = 0
+     enabled = MICRO_BATCH_ENABLED
+     max_rows = MICRO_BATCH_MAX_ROWS
+     max_wait = MICRO_BATCH_MAX_WAIT_MS / 1000
+     batches = 0
+     submissions = 0
+
+     @classmethod
+     @contextmanager
+     def session(cls):
+          """
+          Mark a forecast as running, so leaders wait for its rows.
+          """
+          if not cls.enabled:
+               yield
+               return
+
+          with cls._cond:
+               cls.active += 1
+          try:
+               yield
+          finally:
+               with cls._cond:
+                    cls.active -= 1
+                    cls._cond.notify_all()
+
+     @classmethod
+     def predict(cls, ensembler, X, w_rf, w_gb):
+          if not cls.enabled:
+               return ensembler.predict_encoded(X, w_rf=w_rf, w_gb=w_gb)
+
+          submission = _Submission(ensembler, X, w_rf, w_gb)
+
+          with cls._cond:
+               cls._pending.append(submission)
+               cls._pending_rows += len(X)
+               leader = not cls._collecting
+               cls._collecting = True
+               cls._cond.notify_all()
+
+          if leader:
+               cls._lead()
+
+          submission.done.wait()
+          if submission.error is not None:
+               raise submission.error
+          return submission.result
+
+     @classmethod
+     def _lead(cls):
+          deadline = time.monotonic() + cls.max_wait
+
+          with cls._cond:
+               # Nothing to wait for once every running forecast has
+               # submitted, so a lone forecast runs at once
+               while (
+                    len(cls._pending) < cls.active and
+                    cls._pending_rows < cls.max_rows
+               ):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                         break
+                    cls._cond.wait(remaining)
+
+               batch = cls._pending
+               cls._pending = []
+               cls._pending_rows = 0
+               cls._collecting = False
+               cls.batches += 1
+               cls.submissions += len(batch)
+
+          cls._run(batch)
+
+     @staticmethod
+     def _run(batch):
+          groups = {}
+          for submission in batch:
+               groups.setdefault(submission.key, []).append(submission)
+
+          for group in groups.values():
+               try:
+                    if len(group) == 1:
+                         s = group[0]
+                         predictions = [s.ensembler.predict_encoded(s.X, w_rf=s.w_rf, w_gb=s.w_gb)]
+                    else:
+                         stacked = group[0].ensembler.predict_encoded(
+                              np.vstack([s.X for s in group]),
+                              w_rf=np.concatenate([s.w_rf for s in group]),
+                              w_gb=np.concatenate([s.w_gb for s in group])
+                         )
+                         predictions = np.split(stacked, np.cumsum([len(s.X) for s in group])[:-1])
+
+                    for s, prediction in zip(group, predictions):
+                         s.result = prediction
+               except Exception as e:
+                    for s in group:
+                         s.error = e
+               finally:
+                    for s in group:
+                         s.done.set()
+
+     @classmethod
+     def stats(cls):
+          with cls._cond:
+               return {
+                    "batches": cls.batches,
+                    "submissions": cls.submissions,
+                    "active": cls.active
+               }
+
+     @classmethod
+     def reset(cls):
+          cls._cond = threading.Condition()
+          cls._pending = []
+          cls._pending_rows = 0
+          cls._collecting = False
+          cls.active = 0
+          cls.batches = 0
+          cls.submissions = 0
+
+# A forked forecast worker must not inherit a lock held by another thread
+os.register_at_fork(after_in_child=InferenceBatcher.reset)
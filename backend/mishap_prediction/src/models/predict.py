@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import sys
@@ -6,11 +7,18 @@ PROJECT_ROOT = Path().resolve()
 sys.path.append(str(PROJECT_ROOT))
 
 from src.models.ensemble import MishapEnsembler
-from src.preprocessing.build_features import compute_feature_values
-from src.config import MODEL_DIR
+from src.models.forecast_cache import ForecastCache
+from src.models.forecast_table import ForecastTable
+from src.models.micro_batch import InferenceBatcher
+from src.models.forecast_state import EntityForecastState, NUMERIC_FEATURES
+from src.utils.helpers import frame_fingerprint
+from src.utils.metrics import Metrics
+from src.config import MODEL_DIR, SERVE_FORECAST_TABLE
 
 MODEL_FEATURES_FILE = MODEL_DIR / "model_features.pkl"
 
+FORECAST_COLUMNS = ["year", "quarter", "entity_type", "entity_value", "mishap_count"]
+
 def predict_future_quarters(
           df_features,
           entity_type,
@@ -22,70 +30,141 @@ def predict_future_quarters(
      """
      Predict future quarterly mishap counts using recursive logic. 
      """
-     ensembler = MishapEnsembler(w_rf, w_gb)
+     return predict_future_quarters_batch(
+          df_features=df_features,
+          entities=[(entity_type, entity_value)],
+          n_quarters=n_quarters,
+          w_rf=w_rf,
+          w_gb=w_gb
+     )
+
+def predict_future_quarters_batch(
+          df_features,
+          entities,
+          n_quarters=4,
+          w_rf=0.3,
+          w_gb=0.7,
+          use_cache=True,
+          use_table=SERVE_FORECAST_TABLE
+):
+     """
+     Recursive forecast for several entities at once.
+     Entities found in the materialized ForecastTable (when it matches the
+     current data and model versions) or in the ForecastCache are served
+     from there, the rest are forecast together in one batch.
+     use_cache=False forecasts every entity live.
+     Returns one block of n_quarters rows per entity, in the order given.
+     """
+     entities = list(entities)
+
+     if not entities:
+          return pd.DataFrame(columns=FORECAST_COLUMNS)
+
+     blocks = [None] * len(entities)
+     keys = [None] * len(entities)
+
+     with Metrics.span("forecast.lookup"):
+          table = ForecastTable.current() if use_cache and use_table else None
+
+          if use_cache:
+               data_version = frame_fingerprint(df_features)
+               model_version = MishapEnsembler.version()
+
+          if table is not None and table.matches(data_version, model_version):
+               for i, entity in enumerate(entities):
+                    blocks[i] = table.lookup(entity, n_quarters, w_rf, w_gb)
+
+          from_table = sum(block is not None for block in blocks)
+
+          if use_cache:
+               for i, (entity_type, entity_value) in enumerate(entities):
+                    if blocks[i] is not None:
+                         continue
+                    keys[i] = ForecastCache.make_key(
+                         entity_type, entity_value, n_quarters, w_rf, w_gb, data_version, model_version
+                    )
+                    blocks[i] = ForecastCache.get(keys[i])
+
+     missing = [i for i, block in enumerate(blocks) if block is None]
+
+     Metrics.inc("mishap_forecast_lookups_total", from_table, source="table")
+     Metrics.inc("mishap_forecast_lookups_total", len(entities) - from_table - len(missing), source="cache")
+     Metrics.inc("mishap_forecast_lookups_total", len(missing), source="live")
+
+     if missing:
+          with Metrics.span("forecast.recursion"):
+               years, quarters, counts = recursive_forecast(
+                    df_features, [entities[i] for i in missing], n_quarters, w_rf, w_gb
+               )
+
+          for row, i in enumerate(missing):
+               block = (years[row], quarters[row], counts[row])
+               for arr in block:
+                    arr.flags.writeable = False
+
+               blocks[i] = block
+               if use_cache:
+                    ForecastCache.put(keys[i], block)
+
+     # Lay the results out entity by entity
+     with Metrics.span("forecast.frame"):
+          return pd.DataFrame({
+               "year": np.concatenate([b[0] for b in blocks]),
+               "quarter": np.concatenate([b[1] for b in blocks]),
+               "entity_type": np.repeat([e[0] for e in entities], n_quarters),
+               "entity_value": np.repeat([e[1] for e in entities], n_quarters),
+               "mishap_count": np.concatenate([b[2] for b in blocks])
+          })
+
+def recursive_forecast(df_features, entities, n_quarters, w_rf, w_gb):
+     """
+     Batched recursion: all entities advance one quarter per step, so each
+     step fills a single feature matrix (one row per entity) and calls the
+     ensemble once. Returns (years, quarters, counts), each entities x n_quarters.
+     """
+     # Seed the recursion state (last count, last 4 counts, next quarter)
+     with Metrics.span("forecast.seed"):
+          state = EntityForecastState.from_history(df_features, entities)
 
-     # Step 1: Filter historical data for the given entity
-     base_df = df_features.copy()
+     return run_recursion(state, n_quarters, w_rf, w_gb)
 
-     entity_df = base_df[
-          (df_features['entity_type'] == entity_type) & 
-          (df_features['entity_value'] == entity_value)
-     ].sort_values(by=['year', 'quarter']).copy()
+def run_recursion(state, n_quarters, w_rf, w_gb):
+     """
+     Advance a seeded EntityForecastState n_quarters steps.
+     w_rf / w_gb may be scalars or arrays with one weight per state row.
+     """
+     ensembler = MishapEnsembler()
 
-     if entity_df.empty:
-          raise ValueError(f"No data found for entity_type: {entity_type}, entity_value: {entity_value}")
-     
-     # Step 2: Initialize recursion state
-     current_df = entity_df.copy()
-     future_predictions = []
-
-     # Step 3: Recursive forecasting loop
-     for _ in range(n_quarters):
-          # Get the last known (predicted) row
-          last_row = current_df.iloc[-1]
-
-          # Step 4: Determine next year and quarter
-          if last_row["quarter"] == 4:
-            next_year = last_row["year"] + 1
-            next_quarter = 1
-          else:
-            next_year = last_row["year"]
-            next_quarter = last_row["quarter"] + 1
-
-          # Step 5: Compute feature values
-          input_row = {
-               "entity_type": entity_type,
-               "entity_value": entity_value,
-               "year": next_year,
-               "quarter": next_quarter,
-               "prev_qtr_count": last_row["mishap_count"],
-               "qoq_change": 0, # This is what will be predicted by our model
-               "rolling_4q_avg": current_df["mishap_count"].tail(4).mean()
-          }
-
-          input_df = pd.DataFrame([input_row])
-
-          # Predict qoq change (Pipeline predicts the delta in mishap count)
-
-          qoq_change = ensembler.predict(input_df)[0]
-
-          # Convert back to absolute mishap count
-          predicted_mishap_count = last_row["mishap_count"] + qoq_change
-          predicted_mishap_count = max(0, round(predicted_mishap_count))
-
-          next_row = {
-              "year": next_year,
-              "quarter": next_quarter,
-              "entity_type": entity_type,
-              "entity_value": entity_value,
-              "mishap_count": predicted_mishap_count
-          }
-
-          current_df = pd.concat([current_df, pd.DataFrame([next_row])], ignore_index=True)
-          current_df = compute_feature_values(current_df)
-          future_predictions.append(next_row)
-
-     return pd.DataFrame(future_predictions)
+     # Step 1: Encode the entity rows once, only numeric columns change per step
+     with Metrics.span("forecast.encode"):
+          X = ensembler.encode(state.input_frame())
+          positions = ensembler.feature_positions(NUMERIC_FEATURES)
+
+     Metrics.inc("mishap_forecast_rows_total", len(state) * n_quarters)
+
+     years = np.empty((len(state), n_quarters), dtype=np.int64)
+     quarters = np.empty((len(state), n_quarters), dtype=np.int64)
+     counts = np.empty((len(state), n_quarters), dtype=np.int64)
+
+     # Step 2: Recursive forecasting loop
+     with InferenceBatcher.session():
+          for step in range(n_quarters):
+               state.write_features(X, positions)
+
+               # Pipeline predicts the delta in mishap count (batched with
+               # any concurrent forecasts)
+               qoq_change = InferenceBatcher.predict(ensembler, X, w_rf, w_gb)
+
+               # Convert back to absolute mishap count
+               predicted_mishap_count = np.maximum(0, np.round(state.last_count + qoq_change))
+
+               years[:, step] = state.next_year
+               quarters[:, step] = state.next_quarter
+               counts[:, step] = predicted_mishap_count
+
+               state.advance(predicted_mishap_count)
+
+     return years, quarters, counts
 
 def get_feature_importance(pipeline, feature_names):
      model = pipeline.named_steps['model']
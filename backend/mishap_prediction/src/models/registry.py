@@ -0,0 +1,129 @@
+import contextvars
+import hashlib
+import os
+import threading
+import joblib
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.config import RF_PIPELINE_PATH, GB_PIPELINE_PATH
+from src.utils.metrics import Metrics
+
+def file_digest(path):
+     return hashlib.sha1(Path(path).read_bytes()).hexdigest()
+
+# Pipelines pinned for the current request (see ModelRegistry.pin)
+_pinned_pipelines = contextvars.ContextVar("pinned_pipelines", default=None)
+
+class ModelRegistry:
+     """
+     Process-wide cache of fitted pipelines.
+     Each artifact is deserialized once and shared by every caller until the
+     file on disk changes (keyed by resolved path and mtime).
+
+     Paths that have been published (see publish) are served from the
+     published entries instead and only change on the next publish, so a
+     reload can load and warm new artifacts off to the side and swap them in
+     at once. A request can pin a set of entries for its whole lifetime.
+     """
+     _lock = threading.Lock()
+     _pipelines: dict = {}
+     _published: dict = {}
+
+     @classmethod
+     def load(cls, path):
+          """
+          Fresh (mtime, pipeline, digest) entry read from disk, not cached.
+          """
+          path = Path(path).resolve()
+          with Metrics.span("model.load"):
+               mtime = os.stat(path).st_mtime_ns
+               digest = file_digest(path)
+               pipeline = joblib.load(path)
+
+          Metrics.inc("mishap_model_loads_total")
+          return (mtime, pipeline, digest)
+
+     @classmethod
+     def publish(cls, entries):
+          """
+          Serve these {path: entry} pipelines from now on.
+          """
+          cls._published = {Path(path).resolve(): entry for path, entry in entries.items()}
+
+     @classmethod
+     def pin(cls, entries):
+          """
+          Serve these {path: entry} pipelines to the current context only;
+          returns a token for unpin.
+          """
+          return _pinned_pipelines.set({Path(path).resolve(): entry for path, entry in entries.items()})
+
+     @classmethod
+     def unpin(cls, token):
+          _pinned_pipelines.reset(token)
+
+     @classmethod
+     def _entry(cls, path):
+          path = Path(path).resolve()
+
+          pinned = _pinned_pipelines.get()
+          if pinned is not None and path in pinned:
+               return pinned[path]
+
+          published = cls._published
+          if path in published:
+               return published[path]
+
+          mtime = os.stat(path).st_mtime_ns
+
+          entry = cls._pipelines.get(path)
+          if entry is not None and entry[0] == mtime:
+               return entry
+
+          with cls._lock:
+               # Another thread may have loaded it while we waited
+               entry = cls._pipelines.get(path)
+               if entry is not None and entry[0] == mtime:
+                    return entry
+
+               entry = cls.load(path)
+               cls._pipelines[path] = entry
+               return entry
+
+     @classmethod
+     def get(cls, path):
+          return cls._entry(path)[1]
+
+     @classmethod
+     def digest(cls, path):
+          """
+          Content hash of the artifact currently served for this path.
+          """
+          return cls._entry(path)[2]
+
+     @classmethod
+     def version(cls):
+          """
+          Combined content hash of the ensemble pipelines.
+          Changes whenever either artifact is replaced on disk.
+          """
+          combined = cls.digest(RF_PIPELINE_PATH) + cls.digest(GB_PIPELINE_PATH)
+          return hashlib.sha1(combined.encode()).hexdigest()[:16]
+
+     @classmethod
+     def warm_up(cls):
+          """
+          Load the ensemble pipelines up front so no request pays for it.
+          """
+          cls.get(RF_PIPELINE_PATH)
+          cls.get(GB_PIPELINE_PATH)
+
+     @classmethod
+     def clear(cls):
+          with cls._lock:
+               cls._pipelines = {}
+               cls._published = {}
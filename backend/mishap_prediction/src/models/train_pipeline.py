@@ -1,37 +1,56 @@
+import argparse
+import json
 import pandas as pd
 import joblib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
-from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from sklearn.preprocessing import OneHotEncoder
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.metrics import mean_absolute_error, r2_score
 
-import matplotlib.pyplot as plt
 import numpy as np
 
 import sys
-import shap
 
 PROJECT_ROOT = Path().resolve()
 sys.path.append(str(PROJECT_ROOT))
 
-from src.config import PROCESSED_DATA_DIR, MODEL_DIR
+from src.config import MODEL_DIR, RF_PIPELINE_PATH, GB_PIPELINE_PATH, COMPILED_ENSEMBLE_PATH, ENSEMBLE_W_GB, ENSEMBLE_W_RF, TRAIN_N_JOBS, TRAINING_REPORTS_DIR
+from src.models.backtest import backtest_report, run_backtest
+from src.models.compiled_ensemble import export_compiled_ensemble
+from src.preprocessing.feature_snapshot import load_features
+from src.utils.timing import StageTimer
+RF_PIPELINE_FILE = RF_PIPELINE_PATH
+GB_PIPELINE_FILE = GB_PIPELINE_PATH
 
-FEATURES_FILE = PROCESSED_DATA_DIR / "features.csv"
-RF_PIPELINE_FILE = MODEL_DIR / "rf_pipeline.joblib"
-GB_PIPELINE_FILE = MODEL_DIR / "gb_pipeline.joblib"
+CAT_COLS = ['entity_type', 'entity_value']
 
-def train_model():
-     # 1. Load feature-engineered data
-     df = pd.read_csv(FEATURES_FILE)
+NUM_COLS = [
+     'year',
+     'quarter',
+     'prev_qtr_count',
+     'qoq_change',
+     'rolling_4q_avg'
+]
+
+TARGET = 'target_qoq_change'
+
+TRAIN_FRACTION = 0.8
+
+# Test rows explained by SHAP
+SHAP_SAMPLE_SIZE = 50
 
+def add_target(df):
+     """
+     Sort by entity and time and add the clipped next-quarter delta target.
+     """
      df = df.sort_values(by=["entity_type", "entity_value", "year", "quarter"])
 
-     # 2. Create target (Delta mishap count next quarter)
+     # Create target (Delta mishap count next quarter)
      df['target_qoq_change'] = (
           df.groupby(['entity_type', 'entity_value'])['mishap_count'].shift(-1) - df['mishap_count']
      )
@@ -39,107 +58,92 @@ def train_model():
      # Eliminate Outliers
      df['target_qoq_change'] = df['target_qoq_change'].clip(-50, 50)
 
-     df = df.dropna(subset=['target_qoq_change'])
-
-     # 3. Define feature groups
-
-     cat_cols = ['entity_type', 'entity_value']
-
-     num_cols = [
-          'year',
-          'quarter',
-          'prev_qtr_count',
-          'qoq_change',
-          'rolling_4q_avg'
-     ]
-
-     target = 'target_qoq_change'
-
-     X = df[cat_cols + num_cols]
-     y = df[target]
-
-     # 4. Train-test split
-
-     train_idx = []
-     test_idx = []
-
-     for _, group in df.groupby(['entity_type', 'entity_value']):
-          split_point = int(len(group) * 0.8)
-          train_idx.extend(group.index[:split_point])
-          test_idx.extend(group.index[split_point:])
-
-     X_train = X.loc[train_idx]
-     X_test  = X.loc[test_idx]
-     y_train = y.loc[train_idx]
-     y_test  = y.loc[test_idx]
-
-     # 5. Preprocessing + Model Pipeline
-
-     preprocess = ColumnTransformer(
-                    transformers=[
-                         ("cat", OneHotEncoder(handle_unknown="ignore"), cat_cols),
-                         ("num", "passthrough", num_cols)
-                    ]
-     )
-
-     rf_pipeline = Pipeline([
-          ("preprocess", preprocess),
-          ("model", RandomForestRegressor(n_estimators=200, max_depth=10, random_state=42))
-     ])
-
-     gb_pipeline = Pipeline([
-          ("preprocess", preprocess),
-          ("model", GradientBoostingRegressor(n_estimators=200, learning_rate=0.05, max_depth=3, random_state=42))
-     ])
-
-     # 6. Train model
-
-     rf_pipeline.fit(X_train, y_train)
-     gb_pipeline.fit(X_train, y_train)
-
-     # 7. Evaluation
-
-     rf_preds = rf_pipeline.predict(X_test)
-
-     print("Random Forest Results")
-     print(f"Mean Absolute Error: {mean_absolute_error(y_test, rf_preds)}")
-     print(f"R^2 Score: {r2_score(y_test, rf_preds)}")
-
-     gb_preds = gb_pipeline.predict(X_test)
-
-     print("Gradient Boosting Results")
-     print("MAE:", mean_absolute_error(y_test, gb_preds))
-     print("R2 :", r2_score(y_test, gb_preds))
-
-     ensemble_preds = 0.6 * gb_preds + 0.4 * rf_preds
-
-     print("Ensembled Results")
-     print("MAE:", mean_absolute_error(y_test, ensemble_preds))
-     print("R2 :", r2_score(y_test, ensemble_preds))
-
-     # 8. Shap Explainability
-
-     model = rf_pipeline.named_steps['model']
-     preprocess_step = rf_pipeline.named_steps['preprocess']
-
-     # 8.1 Transform data for SHAP
-
-     X_test_transformed = preprocess_step.transform(X_test)
-
-     explainer = shap.TreeExplainer(model)
-     X_test_sample = X_test_transformed[:50]
-
-     shap_values = explainer.shap_values(X_test_sample)
-     shap.summary_plot(shap_values, X_test_sample)
-
-     # 9. Save pipeline
-
-     MODEL_DIR.mkdir(parents=True, exist_ok=True)
-     joblib.dump(rf_pipeline, RF_PIPELINE_FILE)
-     joblib.dump(gb_pipeline, GB_PIPELINE_FILE)
-
-     print(f"RF Pipeline saved to {RF_PIPELINE_FILE}")
-     print(f"GB Pipeline saved to {GB_PIPELINE_FILE}")
+     return df.dropna(subset=['target_qoq_change'])
+
+def train_test_mask(df, train_fraction=TRAIN_FRACTION):
+     """
+     Boolean mask of training rows: the first int(len * train_fraction)
+     rows of each entity, the rest are test rows. df must be sorted by
+     entity and time.
+     """
+     groups = df.groupby(['entity_type', 'entity_value'], sort=False)
+
+     position = groups.cumcount().to_numpy()
+     size = groups['year'].transform('size').to_numpy()
+
+     return position < (size * train_fraction).astype(np.int64)
+
+def fit_models(X_train, y_train, n_jobs=TRAIN_N_JOBS):
+     """
+     Fit RF and GB on the same encoded design matrix, concurrently when
+     there are cores to spare: GB is single-threaded, so RF gets the
+     remaining n_jobs - 1 cores. With one core they are fit one after the
+     other.
+     """
+     cores = joblib.effective_n_jobs(n_jobs)
+
+     rf_model = RandomForestRegressor(n_estimators=200, max_depth=10, random_state=42, n_jobs=max(1, cores - 1))
+     gb_model = GradientBoostingRegressor(n_estimators=200, learning_rate=0.05, max_depth=3, random_state=42)
+
+     if cores <= 1:
+          rf_model.fit(X_train, y_train)
+          gb_model.fit(X_train, y_train)
+          return rf_model, gb_model
+
+     with ThreadPoolExecutor(max_workers=2, thread_name_prefix="train") as pool:
+          rf_fit = pool.submit(rf_model.fit, X_train, y_train)
+          gb_fit = pool.submit(gb_model.fit, X_train, y_train)
+          rf_fit.result()
+          gb_fit.result()
+
+     return rf_model, gb_model
+
+def evaluate(y_test, rf_preds, gb_preds, w_rf=ENSEMBLE_W_RF, w_gb=ENSEMBLE_W_GB):
+     ensemble_preds = w_rf * rf_preds + w_gb * gb_preds
+
+     return {
+          name: {"mae": float(mean_absolute_error(y_test, preds)), "r2": float(r2_score(y_test, preds))}
+          for name, preds in [("random_forest", rf_preds), ("gradient_boosting", gb_preds), ("ensemble", ensemble_preds)]
+     }
+
+def explain(rf_model, X_test_transformed, feature_names, headless, reports_dir):
+     """
+     SHAP values of the RF on a test sample: shown interactively, or saved
+     to reports_dir (values always, summary plot when matplotlib is there).
+     """
+     import shap
+
+     X_test_sample = X_test_transformed[:SHAP_SAMPLE_SIZE]
+     shap_values = shap.TreeExplainer(rf_model).shap_values(X_test_sample)
+
+     if not headless:
+          shap.summary_plot(shap_values, X_test_sample)
+          return
+
+     np.save(reports_dir / "shap_values.npy", shap_values)
+     (reports_dir / "shap_features.json").write_text(json.dumps(list(feature_names)))
+
+     try:
+          import matplotlib
+          matplotlib.use("Agg")
+          import matplotlib.pyplot as plt
+     except ImportError:
+          print("matplotlib not installed, skipping the SHAP summary plot")
+          return
+
+     shap.summary_plot(shap_values, X_test_sample, feature_names=list(feature_names), show=False)
+     plt.savefig(reports_dir / "shap_summary.png", bbox_inches="tight")
+     plt.close("all")
+
+def plot_actual_vs_predicted(X_test, y_test, gb_pipeline, headless, reports_dir):
+     try:
+          import matplotlib
+          if headless:
+               matplotlib.use("Agg")
+          import matplotlib.pyplot as plt
+     except ImportError:
+          print("matplotlib not installed, skipping the actual vs predicted plot")
+          return
 
      # Take last N points for clarity
      mask = (
@@ -161,7 +165,135 @@ def train_model():
      plt.legend()
      plt.grid(True)
 
-     plt.show()
+     if headless:
+          plt.savefig(reports_dir / "actual_vs_predicted.png", bbox_inches="tight")
+          plt.close("all")
+     else:
+          plt.show()
+
+def train_model(headless=False, n_jobs=TRAIN_N_JOBS, shap_values=None, plots=None, backtest=None, reports_dir=TRAINING_REPORTS_DIR):
+     """
+     Train and save the RF and GB pipelines and the compiled ensemble.
+
+     Interactive (default): SHAP summary and the actual vs predicted plot
+     are shown. headless=True never blocks: SHAP values and plots are only
+     computed when shap_values / plots are set, and written to reports_dir
+     together with a training_report.json of metrics and stage timings.
+     backtest (default: headless only) walk-forward backtests the saved
+     pipelines and adds the MAE/MAPE summary under "backtest".
+     Returns {"metrics": ..., "timings": ..., "backtest": ...}.
+     """
+     shap_values = not headless if shap_values is None else shap_values
+     backtest = headless if backtest is None else backtest
+     plots = not headless if plots is None else plots
+     reports_dir = Path(reports_dir)
+
+     if headless:
+          reports_dir.mkdir(parents=True, exist_ok=True)
+
+     timer = StageTimer()
+
+     # 1. Load feature-engineered data
+     with timer.stage("load"):
+          features = load_features(categorical=False)
+
+     # 2. Create target (Delta mishap count next quarter)
+     with timer.stage("target"):
+          df = add_target(features)
+
+     X = df[CAT_COLS + NUM_COLS]
+     y = df[TARGET]
+
+     # 3. Train-test split (first 80% of every entity's quarters)
+     with timer.stage("split"):
+          train = train_test_mask(df)
+
+          X_train, X_test = X[train], X[~train]
+          y_train, y_test = y[train], y[~train]
+
+     # 4. Preprocess once, shared by both pipelines
+     with timer.stage("preprocess"):
+          preprocess = ColumnTransformer(
+                         transformers=[
+                              ("cat", OneHotEncoder(handle_unknown="ignore"), CAT_COLS),
+                              ("num", "passthrough", NUM_COLS)
+                         ]
+          )
+          X_train_transformed = preprocess.fit_transform(X_train)
+          X_test_transformed = preprocess.transform(X_test)
+
+     # 5. Train both models concurrently
+     with timer.stage("fit"):
+          rf_model, gb_model = fit_models(X_train_transformed, y_train, n_jobs)
+
+     rf_pipeline = Pipeline([("preprocess", preprocess), ("model", rf_model)])
+     gb_pipeline = Pipeline([("preprocess", preprocess), ("model", gb_model)])
+
+     # 6. Evaluation
+     with timer.stage("evaluate"):
+          metrics = evaluate(y_test, rf_model.predict(X_test_transformed), gb_model.predict(X_test_transformed))
+
+     for name, scores in metrics.items():
+          print(f"{name}: MAE {scores['mae']:.4f}, R2 {scores['r2']:.4f}")
+
+     # 7. Shap Explainability
+     if shap_values:
+          with timer.stage("shap"):
+               explain(rf_model, X_test_transformed, preprocess.get_feature_names_out(), headless, reports_dir)
+
+     # 8. Save pipeline
+     with timer.stage("save"):
+          MODEL_DIR.mkdir(parents=True, exist_ok=True)
+          joblib.dump(rf_pipeline, RF_PIPELINE_FILE)
+          joblib.dump(gb_pipeline, GB_PIPELINE_FILE)
+
+     print(f"RF Pipeline saved to {RF_PIPELINE_FILE}")
+     print(f"GB Pipeline saved to {GB_PIPELINE_FILE}")
+
+     # 9. Export compiled (array-based) ensemble for fast inference
+     with timer.stage("export"):
+          export_compiled_ensemble(rf_pipeline, gb_pipeline)
+     print(f"Compiled ensemble saved to {COMPILED_ENSEMBLE_PATH}")
+
+     if plots:
+          with timer.stage("plots"):
+               plot_actual_vs_predicted(X_test, y_test, gb_pipeline, headless, reports_dir)
+
+     # 10. Walk-forward backtest of the pipelines just saved
+     backtest_summary = None
+     if backtest:
+          with timer.stage("backtest"):
+               backtest_summary = backtest_report(run_backtest(features))
+
+          overall = backtest_summary["overall"]
+          if overall is not None:
+               print(f"backtest: MAE {overall['mae']:.4f}, MAPE {overall['mape']:.2f}% over {overall['n']} forecasts")
+
+     print(timer.report())
+
+     report = {"metrics": metrics, "timings": timer.stages, "backtest": backtest_summary}
+
+     if headless:
+          (reports_dir / "training_report.json").write_text(json.dumps(report, indent=2))
+          print(f"Training report saved to {reports_dir}")
+
+     return report
 
 if __name__ == "__main__":
-     train_model()
\ No newline at end of file
+     parser = argparse.ArgumentParser(description="Train the RF and GB pipelines.")
+     parser.add_argument("--headless", action="store_true", help="never block on plots, write artifacts to --reports-dir")
+     parser.add_argument("--n-jobs", type=int, default=TRAIN_N_JOBS, help="cores shared by the RF and GB fits (-1 = all)")
+     parser.add_argument("--shap", action=argparse.BooleanOptionalAction, default=None, help="compute SHAP values (default: interactive only)")
+     parser.add_argument("--plots", action=argparse.BooleanOptionalAction, default=None, help="draw plots (default: interactive only)")
+     parser.add_argument("--backtest", action=argparse.BooleanOptionalAction, default=None, help="walk-forward backtest after saving (default: headless only)")
+     parser.add_argument("--reports-dir", type=Path, default=TRAINING_REPORTS_DIR)
+     args = parser.parse_args()
+
+     train_model(
+          headless=args.headless,
+          n_jobs=args.n_jobs,
+          shap_values=args.shap,
+          plots=args.plots,
+          backtest=args.backtest,
+          reports_dir=args.reports_dir
+     )
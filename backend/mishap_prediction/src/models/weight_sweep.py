@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.models.ensemble import MishapEnsembler
+from src.models.forecast_cache import ForecastCache
+from src.models.forecast_state import EntityForecastState
+from src.models.forecast_table import ForecastTable
+from src.models.predict import FORECAST_COLUMNS, predict_future_quarters_batch, run_recursion
+from src.utils.helpers import frame_fingerprint
+from src.config import SERVE_FORECAST_TABLE, WEIGHT_GRID, WEIGHT_SWEEP_TOLERANCE
+
+def grid_weights(grid=WEIGHT_GRID):
+     """
+     (w_rf, w_gb) pairs on the slider line w_rf + w_gb = 1.
+     w_gb is rounded so grid points match the decimals the UI sends.
+     """
+     w_rf = np.asarray(grid, dtype=np.float64)
+     return w_rf, np.round(1.0 - w_rf, 10)
+
+def forecast_weight_grid(df_features, entities, n_quarters, grid=WEIGHT_GRID):
+     """
+     Forecast every entity for every grid weight in one batched pass.
+     The weight variants are stacked as extra rows of the recursion batch
+     (entities x grid rows), so the RF and GB models are still called once
+     per horizon step. Each (entity, weight) forecast is also stored in the
+     ForecastCache, so exact requests on a grid point become cache hits.
+
+     Returns (years, quarters, counts): years/quarters are entities x n_quarters,
+     counts is entities x grid x n_quarters.
+     """
+     entities = list(entities)
+     w_rf, w_gb = grid_weights(grid)
+
+     data_version = frame_fingerprint(df_features)
+     model_version = MishapEnsembler.version()
+
+     def key(entity, j):
+          return ForecastCache.make_key(
+               entity[0], entity[1], n_quarters, w_rf[j], w_gb[j], data_version, model_version
+          )
+
+     years = np.empty((len(entities), n_quarters), dtype=np.int64)
+     quarters = np.empty((len(entities), n_quarters), dtype=np.int64)
+     counts = np.empty((len(entities), len(w_rf), n_quarters), dtype=np.int64)
+
+     missing = []
+
+     for i, entity in enumerate(entities):
+          blocks = [ForecastCache.get(key(entity, j)) for j in range(len(w_rf))]
+
+          if any(block is None for block in blocks):
+               missing.append(i)
+               continue
+
+          years[i], quarters[i] = blocks[0][0], blocks[0][1]
+          for j, block in enumerate(blocks):
+               counts[i, j] = block[2]
+
+     if missing:
+          state = EntityForecastState.from_history(
+               df_features, [entities[i] for i in missing]
+          ).repeat(len(w_rf))
+
+          y, q, c = run_recursion(
+               state,
+               n_quarters,
+               np.tile(w_rf, len(missing)),
+               np.tile(w_gb, len(missing))
+          )
+
+          for row, i in enumerate(missing):
+               years[i], quarters[i] = y[row * len(w_rf)], q[row * len(w_rf)]
+
+               for j in range(len(w_rf)):
+                    r = row * len(w_rf) + j
+                    counts[i, j] = c[r]
+
+                    block = (y[r].copy(), q[r].copy(), c[r].copy())
+                    for arr in block:
+                         arr.flags.writeable = False
+                    ForecastCache.put(key(entities[i], j), block)
+
+     return years, quarters, counts
+
+def bracket_forecasts(df_features, entities, n_quarters, lo, hi, grid=WEIGHT_GRID):
+     """
+     Grid forecasts at grid indices lo and hi: from the ForecastTable where
+     it holds them, the rest from one forecast_weight_grid pass (cache hits
+     or a single recursion for the whole grid).
+
+     Returns (years, quarters, lower, upper), each entities x n_quarters.
+     """
+     grid_rf, grid_gb = grid_weights(grid)
+
+     years = np.empty((len(entities), n_quarters), dtype=np.int64)
+     quarters = np.empty((len(entities), n_quarters), dtype=np.int64)
+     counts = np.empty((len(entities), 2, n_quarters), dtype=np.int64)
+
+     table = ForecastTable.current() if SERVE_FORECAST_TABLE else None
+     if table is not None and not table.matches(frame_fingerprint(df_features), MishapEnsembler.version()):
+          table = None
+
+     missing = []
+
+     for i, entity in enumerate(entities):
+          blocks = [table.lookup(entity, n_quarters, grid_rf[j], grid_gb[j]) for j in (lo, hi)] if table else [None]
+
+          if any(block is None for block in blocks):
+               missing.append(i)
+               continue
+
+          years[i], quarters[i] = blocks[0][0], blocks[0][1]
+          counts[i] = blocks[0][2], blocks[1][2]
+
+     if missing:
+          y, q, c = forecast_weight_grid(df_features, [entities[i] for i in missing], n_quarters, grid)
+          years[missing], quarters[missing], counts[missing] = y, q, c[:, [lo, hi]]
+
+     return years, quarters, counts[:, 0], counts[:, 1]
+
+def predict_with_weight_sweep(
+          df_features,
+          entities,
+          n_quarters=4,
+          w_rf=0.3,
+          w_gb=0.7,
+          tolerance=WEIGHT_SWEEP_TOLERANCE,
+          grid=WEIGHT_GRID
+):
+     """
+     Drop-in for predict_future_quarters_batch that serves slider weights
+     from the weight grid.
+
+     Weights on the grid are exact. For weights between two grid points the
+     forecast is linearly interpolated between the bracketing grid forecasts
+     (bracket_forecasts: table, cache or one grid pass) and rounded.
+
+     Error bound: the blend is linear in the weights, so the first horizon
+     step is exact up to rounding (off by at most 1). Later steps feed back
+     different counts through piecewise-constant trees, so no hard bound
+     exists; instead a quarter is interpolated only while the two bracketing
+     forecasts differ by at most `tolerance` mishaps at it and every quarter
+     before it, and comes from the exact forecast from the first wider
+     bracket on. A quarter therefore never depends on later ones, so a
+     shorter horizon serves the same leading quarters. tolerance=0 (or None)
+     disables interpolation: every weight pair is forecast exactly.
+     """
+     entities = list(entities)
+     grid_rf, grid_gb = grid_weights(grid)
+
+     on_slider = abs(w_rf + w_gb - 1.0) < 1e-9 and grid_rf[0] <= w_rf <= grid_rf[-1]
+
+     if not tolerance or not entities or not on_slider:
+          return predict_future_quarters_batch(df_features, entities, n_quarters, w_rf, w_gb)
+
+     hi = min(int(np.searchsorted(grid_rf, w_rf)), len(grid_rf) - 1)
+     lo = max(hi - 1, 0)
+
+     if np.isclose(grid_rf[hi], w_rf, rtol=0, atol=1e-9):
+          # On a grid point, the grid forecast is the exact forecast
+          return predict_future_quarters_batch(df_features, entities, n_quarters, grid_rf[hi], grid_gb[hi])
+
+     years, quarters, lower, upper = bracket_forecasts(df_features, entities, n_quarters, lo, hi, grid)
+
+     t = (w_rf - grid_rf[lo]) / (grid_rf[hi] - grid_rf[lo])
+     blended = np.round(lower + t * (upper - lower)).astype(np.int64)
+
+     # Exact from the first quarter with a bracket wider than tolerance on
+     exact_cells = np.maximum.accumulate(np.abs(upper - lower) > tolerance, axis=1)
+     exact_rows = np.flatnonzero(exact_cells.any(axis=1))
+
+     if len(exact_rows):
+          exact_df = predict_future_quarters_batch(
+               df_features, [entities[i] for i in exact_rows], n_quarters, w_rf, w_gb
+          )
+          exact = exact_df['mishap_count'].to_numpy().reshape(len(exact_rows), n_quarters)
+          blended[exact_rows] = np.where(exact_cells[exact_rows], exact, blended[exact_rows])
+
+     return pd.DataFrame({
+          "year": years.ravel(),
+          "quarter": quarters.ravel(),
+          "entity_type": np.repeat([e[0] for e in entities], n_quarters),
+          "entity_value": np.repeat([e[1] for e in entities], n_quarters),
+          "mishap_count": blended.ravel()
+     }, columns=FORECAST_COLUMNS)
@@ -5,11 +5,15 @@ from pathlib import Path
 PROJECT_ROOT = Path().resolve()
 sys.path.append(str(PROJECT_ROOT))
 
-from src.config import RAW_DATA_DIR, PROCESSED_DATA_DIR
+from src.config import RAW_DATA_DIR, FEATURES_CSV_PATH, FEATURES_SNAPSHOT_DIR, FEATURES_TAIL_PATH
+from src.preprocessing.feature_snapshot import write_snapshot
+from src.preprocessing.incremental_features import FeatureTailState
 
 # File Paths
 INPUT_FILE = RAW_DATA_DIR / "mishap_aggregated_data.csv"
-OUTPUT_FILE = PROCESSED_DATA_DIR / "features.csv"
+OUTPUT_FILE = FEATURES_CSV_PATH
+SNAPSHOT_DIR = FEATURES_SNAPSHOT_DIR
+TAIL_FILE = FEATURES_TAIL_PATH
 
 def build_features():
      # Load Data
@@ -25,6 +29,12 @@ def build_features():
      df.to_csv(OUTPUT_FILE, index=False)
      print(f"Feature file saved to {OUTPUT_FILE}")
 
+     write_snapshot(df, SNAPSHOT_DIR, source=OUTPUT_FILE)
+     print(f"Feature snapshot saved to {SNAPSHOT_DIR}")
+
+     # Tail state for incremental refreshes (src/preprocessing/incremental_features.py)
+     FeatureTailState.from_features(df).save(TAIL_FILE)
+
 def compute_feature_values(df):
      # Previous Quarter Mishap Count
      df['prev_qtr_count'] = df.groupby(['entity_type', 'entity_value'])['mishap_count'].shift(1).fillna(0)
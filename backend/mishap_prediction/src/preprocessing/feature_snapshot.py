@@ -0,0 +1,252 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.config import FEATURES_CSV_PATH, FEATURES_SNAPSHOT_DIR
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the on-disk layout or the column set changes
+SNAPSHOT_SCHEMA_VERSION = 2
+
+SCHEMA_FILE = "schema.json"
+
+CATEGORICAL_COLUMNS = ['entity_type', 'entity_value']
+
+def file_digest(path):
+     digest = hashlib.sha256()
+     with open(path, "rb") as f:
+          for chunk in iter(lambda: f.read(1 << 20), b""):
+               digest.update(chunk)
+     return digest.hexdigest()
+
+def source_stamp(csv_path):
+     """
+     Size, mtime and SHA-256 of the CSV a snapshot is built from.
+     """
+     stat = os.stat(csv_path)
+     return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_digest(csv_path)}
+
+def matches_source(stamp, csv_path):
+     """
+     Whether csv_path is still the CSV the stamp was taken from. Size and
+     mtime settle it when they match; a new mtime with the same size (e.g.
+     a fresh checkout) is decided by the digest.
+     """
+     if not stamp:
+          return False
+
+     stat = os.stat(csv_path)
+     if stat.st_size != stamp["size"]:
+          return False
+     return stat.st_mtime_ns == stamp["mtime_ns"] or file_digest(csv_path) == stamp["sha256"]
+
+def read_schema(path):
+     with open(Path(path) / SCHEMA_FILE) as f:
+          schema = json.load(f)
+
+     if schema.get("schema_version") != SNAPSHOT_SCHEMA_VERSION:
+          raise ValueError(
+               f"Unsupported feature snapshot schema: {schema.get('schema_version')} "
+               f"(expected {SNAPSHOT_SCHEMA_VERSION})"
+          )
+     return schema
+
+def write_snapshot(df, path=FEATURES_SNAPSHOT_DIR, source=None):
+     """
+     Write the feature frame as a typed columnar snapshot: one .npy file per
+     column (category codes for the entity columns) plus schema.json, which
+     stamps the source CSV (when given) so stale snapshots are detected.
+     The directory is written next to the target and swapped in by rename,
+     so readers never see a half-written snapshot.
+     """
+     path = Path(path)
+     tmp = path.with_name(path.name + ".tmp")
+     shutil.rmtree(tmp, ignore_errors=True)
+     tmp.mkdir(parents=True)
+
+     columns = []
+
+     for col in df.columns:
+          if col in CATEGORICAL_COLUMNS:
+               values = pd.Categorical(df[col].astype(str))
+               np.save(tmp / f"{col}.npy", np.asarray(values.codes))
+               columns.append({"name": col, "kind": "categorical", "categories": values.categories.tolist()})
+          else:
+               values = df[col].to_numpy()
+               if values.dtype == object:
+                    raise ValueError(f"Column {col} has no fixed-width dtype and cannot be snapshotted")
+               np.save(tmp / f"{col}.npy", values)
+               columns.append({"name": col, "kind": "numeric", "dtype": values.dtype.str})
+
+     schema = {
+          "schema_version": SNAPSHOT_SCHEMA_VERSION,
+          "rows": len(df),
+          "source": source_stamp(source) if source is not None else None,
+          "columns": columns
+     }
+     with open(tmp / SCHEMA_FILE, "w") as f:
+          json.dump(schema, f, indent=2)
+
+     old = path.with_name(path.name + ".old")
+     shutil.rmtree(old, ignore_errors=True)
+     if path.exists():
+          os.rename(path, old)
+     os.rename(tmp, path)
+     shutil.rmtree(old, ignore_errors=True)
+
+def read_snapshot(path=FEATURES_SNAPSHOT_DIR, mmap=True, categorical=True):
+     """
+     Load a snapshot written by write_snapshot.
+     Numeric columns (and category codes) are memory-mapped read-only when
+     mmap is True, so processes loading the same snapshot share its pages.
+     With categorical=False the entity columns are decoded to plain strings.
+     """
+     path = Path(path)
+     schema = read_schema(path)
+
+     data = {}
+
+     for col in schema["columns"]:
+          # Plain ndarray view; the pages stay backed by the mapped file
+          values = np.asarray(np.load(path / f"{col['name']}.npy", mmap_mode="r" if mmap else None))
+
+          if len(values) != schema["rows"]:
+               raise ValueError(f"Feature snapshot column {col['name']} has {len(values)} rows, expected {schema['rows']}")
+
+          if col["kind"] == "categorical":
+               values = pd.Categorical.from_codes(values, categories=col["categories"])
+               if not categorical:
+                    values = np.asarray(values, dtype=object)
+          elif values.dtype.str != col["dtype"]:
+               raise ValueError(f"Feature snapshot column {col['name']} has dtype {values.dtype.str}, expected {col['dtype']}")
+
+          data[col["name"]] = values
+
+     return pd.DataFrame(data, copy=False)
+
+def _grown_header(file, values):
+     """
+     Header of a 1-d .npy file grown by len(values) rows, plus the offset the
+     new rows go to. The .npy header reserves room for the row count to grow,
+     so appending only rewrites the header and writes the new bytes.
+     Returns None when the file cannot be extended in place.
+     """
+     with open(file, "rb") as f:
+          version = np.lib.format.read_magic(f)
+          if version == (1, 0):
+               shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+          else:
+               shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+          data_offset = f.tell()
+
+     if len(shape) != 1 or fortran_order or dtype != values.dtype:
+          return None
+
+     header = io.BytesIO()
+     d = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (shape[0] + len(values),)}
+     if version == (1, 0):
+          np.lib.format.write_array_header_1_0(header, d)
+     else:
+          np.lib.format.write_array_header_2_0(header, d)
+
+     if len(header.getvalue()) != data_offset:
+          return None
+
+     return header.getvalue(), data_offset + shape[0] * dtype.itemsize
+
+def append_snapshot(df_new, path=FEATURES_SNAPSHOT_DIR, source=None):
+     """
+     Append rows to an existing snapshot without rewriting the stored columns.
+     New entity values extend the category lists, so existing codes stay
+     valid. Falls back to rewriting the whole snapshot when a column cannot
+     be extended in place (e.g. the category codes outgrow their dtype).
+     source is the CSV the rows were appended to, stamped anew.
+     """
+     path = Path(path)
+     schema = read_schema(path)
+
+     names = [col["name"] for col in schema["columns"]]
+     if list(df_new.columns) != names:
+          raise ValueError(f"Snapshot columns {names} do not match new rows {list(df_new.columns)}")
+
+     columns = []
+     in_place = True
+
+     for col in schema["columns"]:
+          col = dict(col)
+          if col["kind"] == "categorical":
+               categories = col["categories"] + sorted(set(df_new[col["name"]].astype(str)) - set(col["categories"]))
+               codes = pd.Categorical(df_new[col["name"]].astype(str), categories=categories).codes
+               code_dtype = np.load(path / f"{col['name']}.npy", mmap_mode="r").dtype
+
+               in_place &= len(categories) <= np.iinfo(code_dtype).max
+               col["categories"] = categories
+               values = codes.astype(code_dtype)
+          else:
+               values = df_new[col["name"]].to_numpy().astype(np.dtype(col["dtype"]), casting="same_kind")
+
+          grown = _grown_header(path / f"{col['name']}.npy", values) if in_place else None
+          in_place &= grown is not None
+          columns.append((col, values, grown))
+
+     if not in_place:
+          full = pd.concat([read_snapshot(path, mmap=False, categorical=False), df_new], ignore_index=True)
+          write_snapshot(full, path, source)
+          return
+
+     # Column files first, schema last: until the schema is swapped the
+     # snapshot fails its row-count check and readers fall back to the CSV.
+     # On failure the grown columns are cut back to their original rows.
+     grown = []
+     try:
+          for col, values, (header, data_end) in columns:
+               with open(path / f"{col['name']}.npy", "r+b") as f:
+                    grown.append((col["name"], f.read(len(header)), data_end))
+                    f.seek(data_end)
+                    f.write(np.ascontiguousarray(values).tobytes())
+                    f.truncate()
+                    f.seek(0)
+                    f.write(header)
+
+          schema["rows"] += len(df_new)
+          schema["source"] = source_stamp(source) if source is not None else None
+          schema["columns"] = [col for col, _, _ in columns]
+          write_schema(path, schema)
+     except BaseException:
+          for name, original_header, data_end in grown:
+               with open(path / f"{name}.npy", "r+b") as f:
+                    f.truncate(data_end)
+                    f.write(original_header)
+          raise
+
+def write_schema(path, schema):
+     tmp = Path(path) / (SCHEMA_FILE + ".tmp")
+     with open(tmp, "w") as f:
+          json.dump(schema, f, indent=2)
+     os.replace(tmp, Path(path) / SCHEMA_FILE)
+
+def load_features(csv_path=FEATURES_CSV_PATH, snapshot_dir=FEATURES_SNAPSHOT_DIR, categorical=True):
+     """
+     Feature frame from the binary snapshot when one is present, readable
+     and built from the current CSV, otherwise from the CSV.
+     """
+     if (Path(snapshot_dir) / SCHEMA_FILE).exists():
+          try:
+               if not Path(csv_path).exists() or matches_source(read_schema(snapshot_dir).get("source"), csv_path):
+                    return read_snapshot(snapshot_dir, categorical=categorical)
+               logger.warning("Ignoring feature snapshot %s: not built from the current %s", snapshot_dir, csv_path)
+          except (ValueError, OSError, KeyError) as e:
+               logger.warning("Ignoring feature snapshot %s: %s", snapshot_dir, e)
+
+     return pd.read_csv(csv_path)
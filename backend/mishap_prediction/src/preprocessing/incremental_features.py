@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import pandas as pd
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.config import FEATURES_CSV_PATH, FEATURES_SNAPSHOT_DIR, FEATURES_TAIL_PATH
+from src.preprocessing.feature_snapshot import SCHEMA_FILE, append_snapshot, load_features
+
+# rolling_4q_avg needs the previous 3 counts next to the new one
+TAIL_WINDOW = 3
+
+RAW_COLUMNS = ['year', 'quarter', 'entity_type', 'entity_value', 'mishap_count']
+FEATURE_COLUMNS = RAW_COLUMNS + ['prev_qtr_count', 'qoq_change', 'rolling_4q_avg']
+
+def period_of(year, quarter):
+     return int(year) * 4 + int(quarter) - 1
+
+class FeatureTailState:
+     """
+     Per-entity tail of the processed feature history: the last
+     (year, quarter) and the last 3 counts (the last of which is the
+     previous-quarter count). This is all compute_feature_values needs to
+     extend an entity's features by new rows.
+     """
+
+     def __init__(self, entities, last_period, rows):
+          self.entities = entities
+          self.last_period = last_period
+          self.rows = rows
+
+     @classmethod
+     def from_features(cls, df_features):
+          """
+          Derive the tail from a full processed feature frame.
+          """
+          entities = {}
+
+          ordered = df_features.sort_values(by=['entity_type', 'entity_value', 'year', 'quarter'])
+          for (etype, evalue), entity_df in ordered.groupby(['entity_type', 'entity_value'], observed=True, sort=False):
+               entities[(str(etype), str(evalue))] = {
+                    "last_period": period_of(entity_df['year'].iloc[-1], entity_df['quarter'].iloc[-1]),
+                    "recent_counts": [int(c) for c in entity_df['mishap_count'].tail(TAIL_WINDOW)]
+               }
+
+          last_period = max((e["last_period"] for e in entities.values()), default=None)
+          return cls(entities, last_period, len(df_features))
+
+     @classmethod
+     def load(cls, path=FEATURES_TAIL_PATH):
+          with open(path) as f:
+               data = json.load(f)
+
+          entities = {
+               (e["entity_type"], e["entity_value"]): {
+                    "last_period": e["last_period"],
+                    "recent_counts": e["recent_counts"]
+               }
+               for e in data["entities"]
+          }
+          return cls(entities, data["last_period"], data["rows"])
+
+     def save(self, path=FEATURES_TAIL_PATH):
+          data = {
+               "last_period": self.last_period,
+               "rows": self.rows,
+               "entities": [
+                    {"entity_type": etype, "entity_value": evalue, **state}
+                    for (etype, evalue), state in self.entities.items()
+               ]
+          }
+
+          tmp = Path(str(path) + ".tmp")
+          with open(tmp, "w") as f:
+               json.dump(data, f)
+          os.replace(tmp, path)
+
+     def validate(self, new_rows):
+          """
+          Reject new raw rows that do not extend the history cleanly:
+          duplicate (entity, quarter) rows, rows at or before an entity's last
+          processed quarter, and refreshes that skip a quarter. Entities with
+          no mishaps in a quarter have no row, so contiguity is checked on the
+          quarters of the refresh as a whole, not per entity.
+          """
+          missing = set(RAW_COLUMNS) - set(new_rows.columns)
+          if missing:
+               raise ValueError(f"New rows are missing columns: {sorted(missing)}")
+
+          periods = new_rows['year'].astype(int) * 4 + new_rows['quarter'].astype(int) - 1
+
+          if not new_rows['quarter'].between(1, 4).all():
+               raise ValueError("New rows contain quarters outside 1-4")
+
+          keys = new_rows[['entity_type', 'entity_value']].astype(str).assign(period=periods)
+          if keys.duplicated().any():
+               raise ValueError(f"New rows contain duplicate quarters:\n{keys[keys.duplicated(keep=False)]}")
+
+          for etype, evalue, period in keys.itertuples(index=False):
+               state = self.entities.get((etype, evalue))
+               if state is not None and period <= state["last_period"]:
+                    raise ValueError(
+                         f"{etype}/{evalue}: quarter {period // 4}Q{period % 4 + 1} is not after "
+                         f"the last processed quarter {state['last_period'] // 4}Q{state['last_period'] % 4 + 1}"
+                    )
+
+          expected = sorted(set(periods))
+          if self.last_period is not None:
+               expected = [self.last_period] + expected
+          gaps = [(a, b) for a, b in zip(expected, expected[1:]) if b != a + 1]
+          if gaps:
+               a, b = gaps[0]
+               raise ValueError(f"Quarters are not contiguous: {a // 4}Q{a % 4 + 1} is followed by {b // 4}Q{b % 4 + 1}")
+
+     def fold(self, new_rows):
+          """
+          Feature rows for the new raw rows, computed from the tail only.
+          Updates the tail in place. Values match compute_feature_values on
+          the full history.
+          """
+          new_rows = new_rows[RAW_COLUMNS].sort_values(by=['entity_type', 'entity_value', 'year', 'quarter'])
+          out = []
+
+          for row in new_rows.itertuples(index=False):
+               key = (str(row.entity_type), str(row.entity_value))
+               state = self.entities.setdefault(key, {"last_period": None, "recent_counts": []})
+
+               recent = state["recent_counts"]
+               count = int(row.mishap_count)
+               prev = float(recent[-1]) if recent else 0.0
+               window = recent + [count]
+
+               out.append((
+                    int(row.year),
+                    int(row.quarter),
+                    key[0],
+                    key[1],
+                    count,
+                    prev,
+                    count - prev,
+                    sum(window) / len(window)
+               ))
+
+               state["recent_counts"] = window[-TAIL_WINDOW:]
+               state["last_period"] = period_of(row.year, row.quarter)
+
+          if out:
+               self.last_period = max(self.last_period or 0, max(s["last_period"] for s in self.entities.values()))
+          self.rows += len(out)
+
+          return pd.DataFrame(out, columns=FEATURE_COLUMNS)
+
+def load_tail_state(tail_path=FEATURES_TAIL_PATH, csv_path=FEATURES_CSV_PATH, snapshot_dir=FEATURES_SNAPSHOT_DIR):
+     """
+     Saved tail state, or a tail rebuilt from the processed features when
+     there is none or it does not match the processed row count.
+     """
+     rows = None
+     schema_path = Path(snapshot_dir) / SCHEMA_FILE
+     if schema_path.exists():
+          with open(schema_path) as f:
+               rows = json.load(f)["rows"]
+
+     if Path(tail_path).exists():
+          tail = FeatureTailState.load(tail_path)
+          if rows is None or tail.rows == rows:
+               return tail
+
+     return FeatureTailState.from_features(load_features(csv_path, snapshot_dir, categorical=False))
+
+def append_features(
+          new_rows,
+          csv_path=FEATURES_CSV_PATH,
+          snapshot_dir=FEATURES_SNAPSHOT_DIR,
+          tail_path=FEATURES_TAIL_PATH
+):
+     """
+     Fold new raw rows into the processed feature store: validate them
+     against the tail, compute their features, append them to features.csv
+     and the snapshot, and save the new tail. Cost is proportional to the
+     new rows. Appended rows come after the existing ones; consumers sort by
+     entity and quarter (FeatureStore, train_model).
+     """
+     tail = load_tail_state(tail_path, csv_path, snapshot_dir)
+     tail.validate(new_rows)
+
+     features = tail.fold(new_rows)
+
+     if features.empty:
+          return features
+
+     # The CSV append is undone if the snapshot append fails, so the two
+     # never disagree; the tail goes last and is rebuilt when its row count
+     # does not match the snapshot
+     csv_size = os.path.getsize(csv_path)
+     try:
+          features.to_csv(csv_path, mode="a", header=False, index=False)
+
+          if (Path(snapshot_dir) / SCHEMA_FILE).exists():
+               append_snapshot(features, snapshot_dir, source=csv_path)
+     except BaseException:
+          with open(csv_path, "r+b") as f:
+               f.truncate(csv_size)
+          raise
+
+     tail.save(tail_path)
+     return features
+
+if __name__ == "__main__":
+     parser = argparse.ArgumentParser(description="Append new quarters of raw mishap counts to the processed features.")
+     parser.add_argument("new_rows", help="CSV of new raw rows (year, quarter, entity_type, entity_value, mishap_count)")
+     args = parser.parse_args()
+
+     appended = append_features(pd.read_csv(args.new_rows))
+     print(f"Appended {len(appended)} feature rows to {FEATURES_CSV_PATH}")
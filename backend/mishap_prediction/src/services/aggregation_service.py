@@ -1,5 +1,8 @@
 import pandas as pd
 
+from src.utils.metrics import Metrics
+
+@Metrics.timed("aggregation.by_year")
 def aggregate_volume_by_year(df: pd.DataFrame) -> pd.DataFrame:
      """
      Aggregates mishap volume by year.
@@ -13,13 +16,14 @@ def aggregate_volume_by_year(df: pd.DataFrame) -> pd.DataFrame:
      
      agg_df = (
           df.groupby(
-                ['year', 'entity_type', 'entity_value', 'data_type'], as_index=False
+                ['year', 'entity_type', 'entity_value', 'data_type'], as_index=False, observed=True
                )
            ['mishap_count'].sum().sort_values(by=['year', 'entity_type', 'entity_value'])
      )
 
      return agg_df
 
+@Metrics.timed("aggregation.by_quarter")
 def aggregate_volume_by_quarter(df: pd.DataFrame) -> pd.DataFrame:
     """
     Aggregates mishap volume by quarter (seasonality view).
@@ -34,7 +38,8 @@ def aggregate_volume_by_quarter(df: pd.DataFrame) -> pd.DataFrame:
         df
         .groupby(
             ['year', 'quarter', 'entity_type', 'entity_value', 'data_type'],
-            as_index=False
+            as_index=False,
+            observed=True
         )["mishap_count"]
         .sum()
         .sort_values(by=['year', 'quarter', 'entity_type', 'entity_value'])
@@ -42,6 +47,7 @@ def aggregate_volume_by_quarter(df: pd.DataFrame) -> pd.DataFrame:
 
     return agg_df
 
+@Metrics.timed("aggregation.by_year_and_classification")
 def aggregate_volume_by_year_and_classification(df):
      """
      Year wise Mishap volume grouped by classification. 
@@ -51,7 +57,8 @@ def aggregate_volume_by_year_and_classification(df):
      agg_df = (
           df.groupby(
                ['entity_type', 'entity_value', 'year', 'data_type'],
-               as_index=False
+               as_index=False,
+               observed=True
           )['mishap_count']
           .sum()
           .sort_values(by=['entity_type', 'entity_value', 'year', 'data_type'])
@@ -59,6 +66,7 @@ def aggregate_volume_by_year_and_classification(df):
 
      return agg_df
 
+@Metrics.timed("insight.text")
 def get_insight_text(df, report_type='mishap_by_type'):
     df = df[df["data_type"] == "actual"]
 
@@ -128,6 +136,7 @@ from collections import defaultdict
 import pandas as pd
 from collections import defaultdict
 
+@Metrics.timed("insight.classification")
 def get_classification_insight(df: pd.DataFrame) -> str:
     """
     Generates classification-based insight text.
@@ -147,7 +156,7 @@ def get_classification_insight(df: pd.DataFrame) -> str:
 
     # Find peak year for each classification
     peak_info = (
-        df.loc[df.groupby("entity_value")["mishap_count"].idxmax()]
+        df.loc[df.groupby("entity_value", observed=True)["mishap_count"].idxmax()]
         [["entity_value", "year"]]
     )
 
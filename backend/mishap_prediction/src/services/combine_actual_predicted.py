@@ -1,5 +1,8 @@
+import numpy as np
 import pandas as pd
 
+DATA_TYPES = ['actual', 'predicted']
+
 def combine_actual_predicted(
      actual_df: pd.DataFrame,
      predicted_df: pd.DataFrame
@@ -14,4 +17,67 @@ def combine_actual_predicted(
 
      combined = combined.sort_values(by=['year', 'quarter', 'entity_type', 'entity_value'])
 
-     return combined
\ No newline at end of file
+     return combined
+
+class CombinedFrameBuilder:
+     """
+     Collects per-entity actual/predicted blocks as NumPy column arrays and
+     builds the combined frame once: categorical entity/data_type columns,
+     sorted by year, quarter, entity_type, entity_value.
+     """
+
+     def __init__(self):
+          self._years = []
+          self._quarters = []
+          self._counts = []
+          self._entity_keys = []
+          self._data_types = []
+          self._lengths = []
+
+     def add(self, entity_type, entity_value, years, quarters, counts, data_type):
+          if len(years) == 0:
+               return
+
+          self._years.append(np.asarray(years, dtype=np.int64))
+          self._quarters.append(np.asarray(quarters, dtype=np.int64))
+          self._counts.append(np.asarray(counts, dtype=np.int64))
+          self._entity_keys.append((entity_type, entity_value))
+          self._data_types.append(DATA_TYPES.index(data_type))
+          self._lengths.append(len(years))
+
+     def build(self) -> pd.DataFrame:
+          if not self._lengths:
+               return pd.DataFrame({
+                    "year": np.empty(0, dtype=np.int64),
+                    "quarter": np.empty(0, dtype=np.int64),
+                    "entity_type": pd.Categorical([]),
+                    "entity_value": pd.Categorical([]),
+                    "mishap_count": np.empty(0, dtype=np.int64),
+                    "data_type": pd.Categorical([], categories=DATA_TYPES)
+               })
+
+          lengths = np.array(self._lengths)
+
+          # Sorted categories keep code order == string order
+          type_cats = sorted({k[0] for k in self._entity_keys})
+          value_cats = sorted({k[1] for k in self._entity_keys})
+          type_index = {c: i for i, c in enumerate(type_cats)}
+          value_index = {c: i for i, c in enumerate(value_cats)}
+          type_codes = np.repeat([type_index[k[0]] for k in self._entity_keys], lengths)
+          value_codes = np.repeat([value_index[k[1]] for k in self._entity_keys], lengths)
+          data_type_codes = np.repeat(self._data_types, lengths)
+
+          years = np.concatenate(self._years)
+          quarters = np.concatenate(self._quarters)
+          counts = np.concatenate(self._counts)
+
+          order = np.lexsort((value_codes, type_codes, quarters, years))
+
+          return pd.DataFrame({
+               "year": years[order],
+               "quarter": quarters[order],
+               "entity_type": pd.Categorical.from_codes(type_codes[order], categories=type_cats),
+               "entity_value": pd.Categorical.from_codes(value_codes[order], categories=value_cats),
+               "mishap_count": counts[order],
+               "data_type": pd.Categorical.from_codes(data_type_codes[order], categories=DATA_TYPES)
+          })
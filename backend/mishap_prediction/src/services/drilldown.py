@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.config import DRILLDOWN_ROUNDING
+from src.utils.version_cache import VersionCache
+
+ROUNDING_MODES = ("round", "largest_remainder")
+
+class DistributionCache(VersionCache):
+     """
+     Classification distribution per data version.
+     """
+
+class ShareCache(VersionCache):
+     """
+     Historical share of every entity within its type, per data version.
+     """
+
+def compute_classification_distribution(df_features):
+     cls_df = df_features[
+          df_features["entity_type"] == "MishapClassification"
+     ]
+
+     dist = (
+          cls_df
+          .groupby(["entity_value"], observed=True)["mishap_count"]
+          .sum()
+          .reset_index()
+     )
+
+     dist["ratio"] = dist["mishap_count"] / dist["mishap_count"].sum()
+     return dist[["entity_value", "ratio"]]
+
+def get_classification_distribution(df_features):
+     """
+     Share of historical mishaps per classification, cached per data version.
+     The returned frame is shared between callers and must not be mutated.
+     """
+     return DistributionCache.get_or_compute(df_features, compute_classification_distribution)
+
+def compute_entity_shares(df_features):
+     totals = df_features.groupby(["entity_type", "entity_value"], observed=True)["mishap_count"].sum()
+     return (totals / totals.groupby(level="entity_type", observed=True).transform("sum")).to_dict()
+
+def filter_share(df_features, filters):
+     """
+     Fraction of mishaps the filters keep, taking the filtered types as
+     independent (the same assumption the classification split makes).
+     """
+     shares = ShareCache.get_or_compute(df_features, compute_entity_shares)
+
+     share = 1.0
+     for etype, values in filters.items():
+          share *= sum(shares.get((etype, v), 0.0) for v in dict.fromkeys(values))
+     return share
+
+def allocate_largest_remainder(totals, ratios):
+     """
+     Split each total across the ratios so every row sums exactly to its total:
+     floor every share, then hand the leftover units to the largest fractional
+     remainders (ties go to the earlier classification).
+     """
+     shares = np.outer(totals, ratios)
+     allocated = np.floor(shares)
+     remainder = shares - allocated
+
+     leftover = (np.asarray(totals) - allocated.sum(axis=1)).round().astype(np.int64)
+
+     order = np.argsort(-remainder, axis=1, kind="stable")
+     rank = np.empty_like(order)
+     np.put_along_axis(rank, order, np.arange(shares.shape[1])[None, :], axis=1)
+
+     return (allocated + (rank < leftover[:, None])).astype(np.int64)
+
+def explode_by_classification(predicted_df, cls_dist, rounding=DRILLDOWN_ROUNDING):
+     """
+     Drill predicted counts down into MishapClassification rows: the outer
+     product of the predicted count vector and the classification ratios,
+     one row per (predicted row, classification).
+     """
+     if rounding not in ROUNDING_MODES:
+          raise ValueError(f"Unknown rounding mode: {rounding}. Expected one of {ROUNDING_MODES}")
+
+     totals = predicted_df["mishap_count"].to_numpy(dtype=np.float64)
+     ratios = cls_dist["ratio"].to_numpy(dtype=np.float64)
+     n_classes = len(ratios)
+
+     if rounding == "largest_remainder":
+          counts = allocate_largest_remainder(totals, ratios)
+     else:
+          counts = np.round(np.outer(totals, ratios)).astype(np.int64)
+
+     return pd.DataFrame({
+          "year": np.repeat(predicted_df["year"].to_numpy(), n_classes),
+          "quarter": np.repeat(predicted_df["quarter"].to_numpy(), n_classes),
+          "entity_type": "MishapClassification",
+          "entity_value": np.tile(cls_dist["entity_value"].to_numpy(dtype=object), len(totals)),
+          "mishap_count": counts.ravel(),
+          "data_type": "predicted"
+     })
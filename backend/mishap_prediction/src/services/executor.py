@@ -0,0 +1,126 @@
+import contextvars
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.config import FORECAST_EXECUTOR, FORECAST_WORKERS, FORECAST_MAX_PENDING
+from src.models.ensemble import MishapEnsembler
+from src.utils.helpers import frame_fingerprint
+
+EXECUTORS = ("serial", "thread", "process")
+
+# Feature frame seen by forked worker processes. It is inherited through
+# fork() when the pool starts, so it is never pickled per task.
+_shared_frame = None
+
+class ForecastPool:
+     """
+     Long-lived worker pools for forecast fan-out, one per backend.
+     Process pools use the fork start method so workers inherit the loaded
+     pipelines (ModelRegistry) and the feature frame; a pool is rebuilt when
+     the frame or the model artifacts it was forked with change.
+     """
+     _lock = threading.Lock()
+     _pools: dict = {}
+
+     @classmethod
+     def get(cls, backend, max_workers, df_features):
+          global _shared_frame
+
+          if backend == "thread":
+               generation = (max_workers,)
+          else:
+               generation = (max_workers, frame_fingerprint(df_features), MishapEnsembler.version())
+
+          with cls._lock:
+               entry = cls._pools.get(backend)
+               if entry is not None and entry[0] == generation:
+                    return entry[1]
+
+               if entry is not None:
+                    entry[1].shutdown(wait=False)
+
+               if backend == "thread":
+                    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="forecast")
+               else:
+                    # Workers are forked on first submit, after the frame is published
+                    _shared_frame = df_features
+                    pool = ProcessPoolExecutor(
+                         max_workers=max_workers,
+                         mp_context=multiprocessing.get_context("fork")
+                    )
+
+               cls._pools[backend] = (generation, pool)
+               return pool
+
+     @classmethod
+     def shutdown(cls):
+          with cls._lock:
+               for _, pool in cls._pools.values():
+                    pool.shutdown(wait=True)
+               cls._pools = {}
+
+def split_chunks(items, n_chunks):
+     """
+     Split items into at most n_chunks contiguous, near-equal chunks.
+     Always returns at least one (possibly empty) chunk.
+     """
+     items = list(items)
+     n_chunks = max(1, min(n_chunks, len(items)))
+     size, extra = divmod(len(items), n_chunks)
+
+     chunks = []
+     start = 0
+     for i in range(n_chunks):
+          end = start + size + (1 if i < extra else 0)
+          chunks.append(items[start:end])
+          start = end
+
+     return chunks
+
+def _run_in_worker(fn, chunk, args):
+     return fn(_shared_frame, chunk, *args)
+
+def map_entity_chunks(
+          fn,
+          df_features,
+          chunks,
+          args=(),
+          backend=FORECAST_EXECUTOR,
+          max_workers=FORECAST_WORKERS,
+          max_pending=FORECAST_MAX_PENDING
+):
+     """
+     Run fn(df_features, chunk, *args) for every chunk and return the results
+     in chunk order. At most max_pending chunks are queued on the pool at a
+     time; submission blocks until a slot frees up.
+     For the process backend fn must be a module-level function.
+     """
+     if backend not in EXECUTORS:
+          raise ValueError(f"Unknown forecast executor: {backend}. Expected one of {EXECUTORS}")
+
+     if backend == "serial" or len(chunks) <= 1:
+          return [fn(df_features, chunk, *args) for chunk in chunks]
+
+     pool = ForecastPool.get(backend, max_workers, df_features)
+     slots = threading.BoundedSemaphore(max_pending)
+     futures = []
+
+     for chunk in chunks:
+          slots.acquire()
+
+          if backend == "thread":
+               # Run in the caller's context so the pinned generation follows
+               future = pool.submit(contextvars.copy_context().run, fn, df_features, chunk, *args)
+          else:
+               future = pool.submit(_run_in_worker, fn, chunk, args)
+
+          future.add_done_callback(lambda _: slots.release())
+          futures.append(future)
+
+     return [future.result() for future in futures]
@@ -1,153 +1,120 @@
 import pandas as pd
 
-from src.models.predict import predict_future_quarters
-from src.services.combine_actual_predicted import combine_actual_predicted
-from src.services.aggregation_service import aggregate_volume_by_quarter, aggregate_volume_by_year
-from src.utils.helpers import aggregate_data, aggregate_dynamic, apply_entity_column_filters, apply_entity_filters, apply_filters, build_group_cols, reshape_entities
-
-def get_yearwise_trend(df_features, filters, n_quarters, w_rf, w_gb):
-     actual_df = apply_entity_filters(df_features, filters)[['year', 'quarter', 'entity_type', 'entity_value', 'mishap_count']]
-     combined_df = pd.DataFrame()
-
-     for etype, values in filters.items():
-          for val in values:
-               predicted_df = predict_future_quarters(
+from src.config import FORECAST_EXECUTOR, FORECAST_WORKERS, STREAM_CHUNK_ENTITIES
+from src.models.predict import FORECAST_COLUMNS
+from src.models.weight_sweep import predict_with_weight_sweep
+from src.services.executor import map_entity_chunks, split_chunks
+from src.services.query_planner import plan_query
+from src.services.rollup import get_history_rollup, quarterly_volume_frame, yearly_volume_frame
+from src.utils.metrics import Metrics
+
+def filter_entities(filters):
+     """
+     Distinct (entity_type, entity_value) pairs of a keyed filters dict,
+     in request order.
+     """
+     return list(dict.fromkeys((etype, val) for etype, values in filters.items() for val in values))
+
+def forecast_entities(df_features, entities, n_quarters, w_rf, w_gb, executor=FORECAST_EXECUTOR, workers=FORECAST_WORKERS):
+     """
+     Batched forecast for the filtered entities. With a thread/process
+     executor the entities are split into one contiguous chunk per worker;
+     results always come back in entity order.
+     """
+     n_chunks = 1 if executor == "serial" else workers
+
+     blocks = map_entity_chunks(
+          predict_with_weight_sweep,
+          df_features,
+          split_chunks(entities, n_chunks),
+          args=(n_quarters, w_rf, w_gb),
+          backend=executor,
+          max_workers=workers
+     )
+
+     return pd.concat(blocks, ignore_index=True)
+
+def run_volume_query(df_features, entities, n_quarters, w_rf, w_gb, volume_frame, start_year=None, end_year=None):
+     """
+     Volume frame of the entities for start_year <= year < end_year.
+     The year window is pushed down: the history is sliced from the rollup,
+     and the forecast only runs as far as the window reaches (not at all
+     when the window is purely historical).
+     """
+     with Metrics.span("service.rollup"):
+          rollup = get_history_rollup(df_features)
+
+     with Metrics.span("service.plan"):
+          plan = plan_query(rollup, entities, n_quarters, start_year, end_year)
+
+     if plan.needs_forecast:
+          # One batched forecast for every entity
+          with Metrics.span("service.forecast"):
+               batch_df = forecast_entities(
                     df_features=df_features,
-                    entity_type=etype,
-                    entity_value=val,
-                    n_quarters=n_quarters,
+                    entities=plan.entities,
+                    n_quarters=plan.horizon,
                     w_rf=w_rf,
                     w_gb=w_gb)
-               
-               combined_df = pd.concat(
-                                   [combined_df, combine_actual_predicted(actual_df, predicted_df)],ignore_index=True
-                              )
-
-
-     yearly_trend = aggregate_volume_by_year(combined_df)
-
-     return yearly_trend
-
-def get_quarterly_prediction(df_features, filters, n_quarters, w_rf, w_gb):
-     actual_df = apply_entity_filters(df_features, filters)[['year', 'quarter', 'entity_type', 'entity_value', 'mishap_count']]
-     combined_df = pd.DataFrame()
-     
-     for etype, values in filters.items():
-          for val in values:
-               predicted_df = predict_future_quarters(
-                    df_features=df_features,
-                    entity_type=etype,
-                    entity_value=val,
-                    n_quarters=n_quarters,
-                    w_rf=w_rf, 
-                    w_gb=w_gb)
-               
-               combined_df = pd.concat(
-                                   [combined_df, combine_actual_predicted(actual_df, predicted_df)],ignore_index=True
-                              )
-               
-     quarterly_trend = aggregate_volume_by_quarter(combined_df)
-
-     return quarterly_trend
-
-def get_classification_distribution(df_features):
-    cls_df = df_features[
-        df_features["entity_type"] == "MishapClassification"
-    ]
-
-    dist = (
-        cls_df
-        .groupby(["entity_value"])["mishap_count"]
-        .sum()
-        .reset_index()
-    )
-
-    dist["ratio"] = dist["mishap_count"] / dist["mishap_count"].sum()
-    return dist[["entity_value", "ratio"]]
-
-def explode_by_classification(predicted_df, cls_dist):
-    expanded = []
-
-    for _, row in predicted_df.iterrows():
-        for _, cls in cls_dist.iterrows():
-            expanded.append({
-                "year": row["year"],
-                "quarter": row["quarter"],
-                "entity_type": "MishapClassification",
-                "entity_value": cls["entity_value"],
-                "mishap_count": round(row["mishap_count"] * cls["ratio"]),
-                "data_type": "predicted"
-            })
-
-    return pd.DataFrame(expanded)
-
-def get_dynamic_aggregation(
-    df_features,
-    filters,
-    group_by,
-    drill_by,
-    metrics,
-    n_quarters=8,
-    w_rf=0.3,
-    w_gb=0.7
+     else:
+          batch_df = pd.DataFrame(columns=FORECAST_COLUMNS)
+
+     with Metrics.span("service.volume_frame"):
+          return volume_frame(rollup, batch_df, plan.entities, plan.horizon, start_year, end_year)
+
+def get_yearwise_trend(df_features, filters, n_quarters, w_rf, w_gb, start_year=None, end_year=None):
+     """
+     Year-wise actual + predicted volume per filtered entity, for
+     start_year <= year < end_year. The history comes from the per data
+     version rollup, only the forecast is aggregated per request.
+     """
+     with Metrics.span("service.filter"):
+          entities = filter_entities(filters)
+
+     return run_volume_query(
+          df_features, entities, n_quarters, w_rf, w_gb,
+          yearly_volume_frame, start_year, end_year
+     )
+
+def get_quarterly_prediction(df_features, filters, n_quarters, w_rf, w_gb, start_year=None, end_year=None):
+     """
+     Quarterly actual + predicted volume per filtered entity, for
+     start_year <= year < end_year.
+     """
+     with Metrics.span("service.filter"):
+          entities = filter_entities(filters)
+
+     return run_volume_query(
+          df_features, entities, n_quarters, w_rf, w_gb,
+          quarterly_volume_frame, start_year, end_year
+     )
+
+def iter_entity_trends(
+          df_features,
+          filters,
+          n_quarters,
+          w_rf,
+          w_gb,
+          volume_frame=yearly_volume_frame,
+          start_year=None,
+          end_year=None,
+          chunk_size=STREAM_CHUNK_ENTITIES
 ):
-    raw_df = df_features.copy()
-    combined_df = pd.DataFrame()
-
-    # 1. Predict per filtered entity
-    for f in filters:
-        etype = f["entity_type"]
-        values = f["entity_value"]
-
-        for val in values:
-            actual_df = raw_df[
-                (raw_df["entity_type"] == etype) &
-                (raw_df["entity_value"] == val)
-            ][["year", "quarter", "entity_type", "entity_value", "mishap_count"]]
-
-            predicted_df = predict_future_quarters(
-                df_features=raw_df,
-                entity_type=etype,
-                entity_value=val,
-                n_quarters=n_quarters,
-                w_rf=w_rf,
-                w_gb=w_gb
-            )
-
-            combined_df = pd.concat(
-                [
-                    combined_df,
-                    combine_actual_predicted(actual_df, predicted_df)
-                ],
-                ignore_index=True
-            )
-
-    # 2. Drill down predicted values into MishapClassification
-    cls_dist = get_classification_distribution(raw_df)
-
-    predicted_only = combined_df[
-        combined_df["data_type"] == "predicted"
-    ]
-
-    cls_pred_df = explode_by_classification(predicted_only, cls_dist)
-
-    combined_df = pd.concat(
-        [combined_df, cls_pred_df],
-        ignore_index=True
-    )
-
-    # 3. Reshape AFTER drill-down exists
-    pivot_df = reshape_entities(combined_df)
-
-    # 4. Aggregate
-    aggregated_df = aggregate_dynamic(
-        df=pivot_df,
-        group_by=group_by,
-        drill_by=drill_by,
-        metrics=metrics
-    )
-
-    # 5. Final filters
-    final_df = apply_entity_column_filters(aggregated_df, filters)
-
-    return final_df
+     """
+     Volume frame (yearly_volume_frame or quarterly_volume_frame) of each
+     filtered entity, yielded as soon as the forecast of its chunk
+     finishes. Entities come in (entity_type, entity_value) order,
+     chunk_size at a time.
+     """
+     with Metrics.span("service.filter"):
+          entities = sorted(filter_entities(filters))
+
+     for start in range(0, len(entities), chunk_size):
+          chunk = entities[start:start + chunk_size]
+
+          frame = run_volume_query(df_features, chunk, n_quarters, w_rf, w_gb, volume_frame, start_year, end_year)
+
+          with Metrics.span("service.split"):
+               rows = frame.groupby(['entity_type', 'entity_value'], sort=False, observed=True).indices
+          for entity in chunk:
+               yield frame.iloc[rows.get(entity, [])]
@@ -0,0 +1,315 @@
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.config import DRILLDOWN_ROUNDING
+from src.services.drilldown import explode_by_classification, filter_share, get_classification_distribution
+from src.services.prediction_service import filter_entities, run_volume_query
+from src.services.rollup import get_history_rollup, quarterly_volume_frame
+from src.utils.helpers import normalize_to_list, resolve_columns
+from src.utils.metrics import Metrics
+
+DIMENSIONS = ['year', 'quarter', 'entity_type', 'entity_value', 'data_type']
+TIME_DIMENSIONS = ['year', 'quarter']
+MEASURES = ['mishap_count']
+AGGREGATIONS = ('sum', 'mean', 'max', 'qoq_growth')
+
+# Entity type drill_by splits the forecasts into
+DRILL_TYPE = 'MishapClassification'
+
+# Legacy /aggregate response: one row per entity, year and data type
+DEFAULT_GROUP_BY = ['entity_type', 'entity_value', 'year', 'data_type']
+
+def select_entities(etype, values, available):
+     """
+     The entities of one type: its filter values, or all of them.
+     """
+     if values is None:
+          return [e for e in available if e[0] == etype]
+     return [(etype, v) for v in dict.fromkeys(values)]
+
+def default_filters(current_selection):
+     """
+     Filters /aggregate used to hardcode, still applied when a payload has none.
+     """
+     if current_selection == 'MishapType':
+          return {'MishapClassification': ['A', 'B', 'C', 'D', 'E'], 'Source': ['Mishap Report']}
+     return {'MishapType': ['Aviation', 'Ground'], 'Source': ['Mishap Report']}
+
+def normalize_filters(filters):
+     """
+     Keyed filters dict from either payload form:
+     {"MishapType": ["Aviation"]} or [{"entity_type": "MishapType", "entity_value": ["Aviation"]}].
+     """
+     if isinstance(filters, list):
+          filters = {f['entity_type']: f['entity_value'] for f in filters}
+
+     if not isinstance(filters, dict):
+          raise ValueError("filters must be an object of entity_type: [values] or a list of {entity_type, entity_value}")
+
+     return {etype: normalize_to_list(values) for etype, values in filters.items()}
+
+def parse_metric(metric, col_map):
+     """
+     "mishap_count" (sum) or "mishap_count:<agg>" -> (output name, column, agg).
+     """
+     column, _, agg = str(metric).partition(':')
+     agg = agg.strip().lower() or 'sum'
+
+     if agg not in AGGREGATIONS:
+          raise ValueError(f"Invalid aggregation: {agg}. Expected one of {AGGREGATIONS}")
+
+     column = resolve_columns([column.strip()], col_map)[0]
+     return (column if agg == 'sum' else f"{column}_{agg}", column, agg)
+
+class AggregatePlan:
+     """
+     Compiled shape of an /aggregate query: resolved dimensions and metrics,
+     run as one groupby over the long (one row per entity and quarter)
+     actual + predicted frame.
+     The features hold one marginal series per entity, so at most one entity
+     type can be a dimension. It comes back in the legacy entity_type,
+     entity_value and data_type columns, and selects the entities: its
+     filter values, or every entity of that type without a filter.
+     MishapClassification as a dimension (group_by or drill_by) instead
+     drills down when other types are filtered: the series of the parent
+     type (the other entity dimension, else the first filtered type) are
+     split across the historical classification distribution
+     (explode_by_classification), restricted to the MishapClassification
+     filter values if any. Filters on further types scale the parent series
+     by their historical share. Filters on other types can't be applied to
+     any other breakdown and are rejected.
+     """
+
+     def __init__(self, dimensions, entity_dimension, metrics, drilldown=False):
+          self.dimensions = dimensions
+          self.entity_dimension = entity_dimension
+          self.metrics = metrics
+          self.drilldown = drilldown
+
+     @classmethod
+     def compile(cls, group_by, drill_by, metrics, entity_types):
+          col_map = {c.lower(): c for c in DIMENSIONS + list(entity_types)}
+          drilled = resolve_columns(list(drill_by), col_map)
+          dimensions = resolve_columns(list(group_by), col_map) + drilled or list(DEFAULT_GROUP_BY)
+
+          if len(set(dimensions)) != len(dimensions):
+               raise ValueError(f"Duplicate group_by/drill_by columns: {dimensions}")
+
+          drilldown = DRILL_TYPE in dimensions
+          # drill_by MishapClassification keeps the parent entity columns
+          # and adds a MishapClassification column
+          entity_dimensions = [d for d in dimensions if d in entity_types and not (d == DRILL_TYPE and d in drilled)]
+          if len(entity_dimensions) > 1:
+               raise ValueError(f"Only one entity type can be grouped on at a time, got {entity_dimensions}")
+
+          entity_dimension = entity_dimensions[0] if entity_dimensions else None
+          if entity_dimension is not None:
+               at = dimensions.index(entity_dimension)
+               legacy = [d for d in ('entity_type', 'entity_value') if d not in dimensions]
+               dimensions = dimensions[:at] + legacy + dimensions[at + 1:]
+               if 'data_type' not in dimensions:
+                    dimensions.append('data_type')
+
+          measure_map = {c.lower(): c for c in MEASURES}
+          parsed = [parse_metric(m, measure_map) for m in (metrics or MEASURES)]
+
+          return cls(dimensions, entity_dimension, parsed, drilldown)
+
+     def parent_type(self, filters):
+          """
+          Entity type whose series are split by classification for these
+          filters, None when the plan reads the entities as they are.
+          """
+          if not self.drilldown:
+               return None
+          if self.entity_dimension not in (None, DRILL_TYPE):
+               return self.entity_dimension
+
+          parents = [etype for etype in filters if etype != DRILL_TYPE]
+          if parents:
+               return parents[0]
+          if self.entity_dimension == DRILL_TYPE:
+               return None
+          raise ValueError(f"drill_by {DRILL_TYPE} needs a filter on another entity type to drill into")
+
+     def entities(self, filters, available):
+          """
+          (entities to read, filters on further types that scale them).
+          """
+          parent_type = self.parent_type(filters)
+          if parent_type is not None:
+               scale = {etype: values for etype, values in filters.items() if etype not in (parent_type, DRILL_TYPE)}
+               return select_entities(parent_type, filters.get(parent_type), available), scale
+
+          if self.entity_dimension is None:
+               return filter_entities(filters), {}
+
+          conflicting = [etype for etype in filters if etype != self.entity_dimension]
+          if conflicting:
+               raise ValueError(
+                    f"Filters on {conflicting} can't be applied to a {self.entity_dimension} breakdown: "
+                    f"the features hold one series per entity, only {DRILL_TYPE} can be drilled into"
+               )
+          return select_entities(self.entity_dimension, filters.get(self.entity_dimension), available), {}
+
+     def quarterly_growth(self, frame, column):
+          """
+          Quarter-over-quarter growth of each series (the non-time
+          dimensions) at every (year, quarter), NaN where the previous
+          quarter had no mishaps.
+          """
+          series = [d for d in self.dimensions if d not in TIME_DIMENSIONS]
+
+          totals = frame.groupby(series + TIME_DIMENSIONS, observed=True, dropna=False)[column].sum().reset_index()
+          period = totals['year'] * 4 + totals['quarter']
+
+          if series:
+               by_series = totals.groupby(series, observed=True, sort=False, dropna=False)
+               previous, previous_period = by_series[column].shift(1), by_series['year'].shift(1) * 4 + by_series['quarter'].shift(1)
+          else:
+               previous, previous_period = totals[column].shift(1), totals['year'].shift(1) * 4 + totals['quarter'].shift(1)
+
+          # A quarter missing from the series had no mishaps
+          previous = previous.where((period - previous_period == 1) & (previous > 0))
+
+          totals['growth'] = (totals[column] - previous) / previous
+          return totals
+
+     def drill_down(self, frame, cls_dist, classes=None, rounding=DRILLDOWN_ROUNDING, share=1.0):
+          """
+          The frame with a DRILL_TYPE column: every row scaled by share and
+          split into one row per classification (same entity and data type).
+          """
+          exploded = explode_by_classification(frame.assign(mishap_count=frame['mishap_count'] * share), cls_dist, rounding)
+
+          n_classes = len(cls_dist)
+          exploded = exploded.assign(**{
+               DRILL_TYPE: exploded['entity_value'],
+               'entity_type': np.repeat(frame['entity_type'].to_numpy(dtype=object), n_classes),
+               'entity_value': np.repeat(frame['entity_value'].to_numpy(dtype=object), n_classes),
+               'data_type': np.repeat(frame['data_type'].to_numpy(dtype=object), n_classes)
+          })
+          if classes is not None:
+               exploded = exploded[exploded[DRILL_TYPE].isin(classes)]
+
+          return exploded[list(frame.columns) + [DRILL_TYPE]].reset_index(drop=True)
+
+     @property
+     def lookback_years(self):
+          """
+          Years of history before the window the plan reads: growth in the
+          window's first quarter needs the quarter before it.
+          """
+          return 1 if any(agg == 'qoq_growth' for _, _, agg in self.metrics) else 0
+
+     def execute(self, frame, start_year=None):
+          """
+          Run the plan on a long frame (drilled down already, for a
+          drill-down plan); rows before start_year are only used as growth
+          baselines.
+          """
+          dims = self.dimensions
+
+          if self.entity_dimension == DRILL_TYPE and DRILL_TYPE in frame:
+               frame = frame.assign(entity_type=DRILL_TYPE, entity_value=frame[DRILL_TYPE])
+          elif self.entity_dimension is not None:
+               frame = frame[frame['entity_type'] == self.entity_dimension]
+
+          window = frame if start_year is None else frame[frame['year'] >= start_year]
+
+          named = {name: (column, agg) for name, column, agg in self.metrics if agg != 'qoq_growth'}
+
+          if named:
+               result = window.groupby(dims, as_index=False, observed=True, dropna=False).agg(**named)
+          else:
+               result = window[dims].drop_duplicates()
+
+          for name, column, agg in self.metrics:
+               if agg == 'qoq_growth':
+                    growth = self.quarterly_growth(frame, column)
+                    if start_year is not None:
+                         growth = growth[growth['year'] >= start_year]
+
+                    growth = (
+                         growth
+                         .groupby(dims, as_index=False, observed=True, dropna=False)['growth']
+                         .mean()
+                         .rename(columns={'growth': name})
+                    )
+                    result = result.merge(growth, on=dims, how='left')
+
+          result = result[dims + [name for name, _, _ in self.metrics]].sort_values(dims)
+
+          # NaN is not valid JSON
+          for name, _, agg in self.metrics:
+               if agg in ('mean', 'qoq_growth') and result[name].isna().any():
+                    result[name] = result[name].astype(object).where(result[name].notna(), None)
+
+          return result
+
+@lru_cache(maxsize=256)
+def compile_plan(group_by, drill_by, metrics, entity_types):
+     """
+     AggregatePlan per payload shape (dimensions and metrics, not filter
+     values), so repeated dashboard queries skip validation and planning.
+     """
+     return AggregatePlan.compile(group_by, drill_by, metrics, entity_types)
+
+def run_aggregate_query(
+          df_features,
+          filters,
+          group_by=None,
+          drill_by=None,
+          metrics=None,
+          n_quarters=8,
+          w_rf=0.3,
+          w_gb=0.7,
+          start_year=None,
+          end_year=None,
+          rounding=DRILLDOWN_ROUNDING
+):
+     """
+     Declarative aggregation over actual + predicted volume for
+     start_year <= year < end_year. Raises ValueError for invalid columns,
+     metrics, filters or drill-down rounding mode.
+     """
+     rollup = get_history_rollup(df_features)
+     available = rollup.entities()
+
+     with Metrics.span("query.compile"):
+          plan = compile_plan(
+               tuple(normalize_to_list(group_by) or ()),
+               tuple(normalize_to_list(drill_by) or ()),
+               tuple(normalize_to_list(metrics) or ()),
+               tuple(sorted({e[0] for e in available}))
+          )
+
+          filters = normalize_filters(filters)
+          entities, scale = plan.entities(filters, available)
+
+     unknown = (set(entities) | set(filter_entities(scale))) - set(available)
+     if unknown:
+          raise ValueError(f"No data found for entities: {sorted(unknown)}")
+
+     read_from = start_year - plan.lookback_years if start_year is not None else None
+
+     frame = run_volume_query(df_features, entities, n_quarters, w_rf, w_gb, quarterly_volume_frame, read_from, end_year)
+
+     with Metrics.span("query.execute"):
+          if plan.parent_type(filters) is not None:
+               cls_dist = get_classification_distribution(df_features)
+               classes = filters.get(DRILL_TYPE)
+
+               unknown = set(classes or ()) - set(cls_dist['entity_value'])
+               if unknown:
+                    raise ValueError(f"No data found for entities: {sorted((DRILL_TYPE, v) for v in unknown)}")
+
+               frame = plan.drill_down(frame, cls_dist, classes, rounding, filter_share(df_features, scale))
+
+          return plan.execute(frame, start_year)
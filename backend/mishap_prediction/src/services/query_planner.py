@@ -0,0 +1,61 @@
+class QueryPlan:
+     """
+     How a volume query runs: the year window start_year <= year < end_year
+     pushed down into the history slices, and the forecast horizon the
+     window actually needs.
+     """
+
+     def __init__(self, entities, n_quarters, horizon, start_year=None, end_year=None):
+          self.entities = list(entities)
+          self.n_quarters = n_quarters
+          self.horizon = horizon
+          self.start_year = start_year
+          self.end_year = end_year
+
+     @property
+     def needs_forecast(self):
+          return bool(self.entities) and self.horizon > 0
+
+def quarters_before(year, quarter, end_year):
+     """
+     Forecast quarters from (year, quarter) onwards that fall before end_year.
+     """
+     return max(0, (end_year - year) * 4 - (quarter - 1))
+
+def forecast_horizon(rollup, entities, n_quarters, end_year=None):
+     """
+     Quarters to forecast so every entity reaches end_year (exclusive),
+     capped at n_quarters.
+     A recursive forecast of h quarters is the first h quarters of any
+     longer one (weight-sweep interpolation included), so quarters past
+     end_year can be skipped. Entities without history must still reach
+     the forecast to report their error, so they keep n_quarters.
+     """
+     if end_year is None:
+          return n_quarters
+
+     horizon = 0
+     for entity in entities:
+          last = rollup.last_quarter(entity)
+          if last is None:
+               return n_quarters
+
+          year, quarter = last
+          next_year, next_quarter = (year + 1, 1) if quarter == 4 else (year, quarter + 1)
+          horizon = max(horizon, quarters_before(next_year, next_quarter, end_year))
+
+     return min(n_quarters, horizon)
+
+def plan_query(rollup, entities, n_quarters, start_year=None, end_year=None):
+     """
+     Plan a volume query over the given entities and year window.
+     start_year only trims rows: the recursion has to run through every
+     quarter before it anyway.
+     """
+     return QueryPlan(
+          entities=entities,
+          n_quarters=n_quarters,
+          horizon=forecast_horizon(rollup, entities, n_quarters, end_year),
+          start_year=start_year,
+          end_year=end_year
+     )
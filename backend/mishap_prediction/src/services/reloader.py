@@ -0,0 +1,138 @@
+import threading
+import time
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.config import RELOAD_POLL_SECONDS
+from src.models.ensemble import MishapEnsembler
+from src.models.predict import predict_future_quarters_batch
+from src.services.rollup import get_history_rollup
+from data.data_context import DataContext, artifact_stamps
+
+def warm_up(generation):
+     """
+     Exercise a new generation before it is published: one single-quarter
+     forecast loads every lazy piece (compiled ensemble, encoders, caches
+     keyed by the new versions) off the request path, and the history
+     rollup of the new data version is built.
+     """
+     with DataContext.pinned(generation):
+          MishapEnsembler()
+          get_history_rollup(generation.store.frame)
+
+          entities = generation.store.entities()
+          if entities:
+               predict_future_quarters_batch(generation.store.frame, entities[:1], 1, use_cache=False)
+
+class ArtifactReloader:
+     """
+     Builds, warms and publishes new DataContext generations.
+     Reloads run one at a time, either in the caller's thread (reload), in
+     a background thread (reload_async) or from a polling watcher (watch).
+     A failed reload leaves the current generation serving. Changes are
+     judged against the artifact stamps of the serving generation, so the
+     first load (DataContext.load) counts as well.
+     """
+     _lock = threading.Lock()
+     _start_lock = threading.Lock()
+     _thread: threading.Thread = None
+     _watcher: threading.Thread = None
+     _stop = threading.Event()
+     last_error = None
+     last_reload_at = None
+
+     @classmethod
+     def reload(cls, force=False):
+          """
+          Publish a new generation if the watched artifacts changed since the
+          serving one was loaded (or always, with force). Returns True if one
+          was published.
+          """
+          with cls._lock:
+               if not force and artifact_stamps() == cls.serving_stamps():
+                    return False
+
+               try:
+                    generation = DataContext.build()
+                    warm_up(generation)
+               except Exception as e:
+                    cls.last_error = f"{type(e).__name__}: {e}"
+                    raise
+
+               DataContext.publish(generation)
+
+               cls.last_error = None
+               cls.last_reload_at = time.time()
+               return True
+
+     @classmethod
+     def reload_async(cls, force=False):
+          """
+          Start a reload in a background thread. Returns False if one is
+          already running.
+          """
+          with cls._start_lock:
+               if cls._thread is not None and cls._thread.is_alive():
+                    return False
+
+               cls._thread = threading.Thread(target=cls._reload_quietly, args=(force,), name="artifact-reload", daemon=True)
+               cls._thread.start()
+               return True
+
+     @classmethod
+     def _reload_quietly(cls, force=False):
+          try:
+               cls.reload(force)
+          except Exception:
+               # Recorded in last_error; the old generation keeps serving
+               pass
+
+     @classmethod
+     def watch(cls, interval=RELOAD_POLL_SECONDS):
+          """
+          Poll the watched artifacts and reload when they change. A change is
+          only picked up once the stamps are stable for one interval, so
+          half-written artifacts are not loaded.
+          """
+          if cls._watcher is not None and cls._watcher.is_alive():
+               return
+
+          cls._stop.clear()
+          cls._watcher = threading.Thread(target=cls._watch, args=(interval,), name="artifact-watch", daemon=True)
+          cls._watcher.start()
+
+     @classmethod
+     def _watch(cls, interval):
+          previous = artifact_stamps()
+
+          while not cls._stop.wait(interval):
+               stamps = artifact_stamps()
+
+               if stamps == previous and stamps != cls.serving_stamps():
+                    cls._reload_quietly()
+
+               previous = stamps
+
+     @classmethod
+     def serving_stamps(cls):
+          return DataContext.current().artifact_stamps
+
+     @classmethod
+     def stop(cls):
+          cls._stop.set()
+          if cls._watcher is not None:
+               cls._watcher.join()
+               cls._watcher = None
+
+     @classmethod
+     def status(cls):
+          return {
+               **DataContext.current().describe(),
+               "reloading": cls._thread is not None and cls._thread.is_alive(),
+               "watching": cls._watcher is not None and cls._watcher.is_alive(),
+               "last_reload_at": cls.last_reload_at,
+               "last_error": cls.last_error
+          }
@@ -0,0 +1,191 @@
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.services.combine_actual_predicted import DATA_TYPES, CombinedFrameBuilder
+from src.utils.version_cache import VersionCache
+
+ENTITY_COLUMNS = ['entity_type', 'entity_value']
+
+YEARLY_COLUMNS = ['entity_type', 'entity_value', 'year', 'data_type', 'mishap_count']
+QUARTERLY_COLUMNS = ['year', 'quarter', 'entity_type', 'entity_value', 'data_type', 'mishap_count']
+
+def entity_offsets(df):
+     """
+     {(entity_type, entity_value): (start, stop)} of a frame sorted by entity.
+     """
+     rows = df.groupby(ENTITY_COLUMNS, sort=False, observed=True).indices
+     return {entity: (int(idx[0]), int(idx[-1]) + 1) for entity, idx in rows.items()}
+
+class HistoryRollup:
+     """
+     Actual mishap history of one data version, aggregated once into a
+     quarterly and a yearly table. Both are sorted by entity, then time, and
+     indexed by entity, so a request only slices the rows of its entities
+     and years instead of grouping the history again.
+     """
+
+     def __init__(self, df_features):
+          quarterly = (
+               df_features
+               .groupby(ENTITY_COLUMNS + ['year', 'quarter'], observed=True)['mishap_count']
+               .sum()
+               .reset_index()
+          )
+          yearly = (
+               quarterly
+               .groupby(ENTITY_COLUMNS + ['year'], observed=True)['mishap_count']
+               .sum()
+               .reset_index()
+          )
+
+          self.quarter_offsets = entity_offsets(quarterly)
+          self.quarter_years = quarterly['year'].to_numpy(dtype=np.int64)
+          self.quarter_quarters = quarterly['quarter'].to_numpy(dtype=np.int64)
+          self.quarter_counts = quarterly['mishap_count'].to_numpy(dtype=np.int64)
+
+          self.year_offsets = entity_offsets(yearly)
+          self.year_years = yearly['year'].to_numpy(dtype=np.int64)
+          self.year_counts = yearly['mishap_count'].to_numpy(dtype=np.int64)
+
+     @staticmethod
+     def _span(offsets, years, entity, start_year, end_year):
+          start, stop = offsets.get(entity, (0, 0))
+          block = years[start:stop]
+
+          lo = start if start_year is None else start + int(np.searchsorted(block, start_year, 'left'))
+          hi = stop if end_year is None else start + int(np.searchsorted(block, end_year, 'left'))
+          return slice(lo, max(lo, hi))
+
+     def quarterly(self, entity, start_year=None, end_year=None):
+          """
+          (years, quarters, counts) of an entity for start_year <= year < end_year.
+          """
+          span = self._span(self.quarter_offsets, self.quarter_years, entity, start_year, end_year)
+          return self.quarter_years[span], self.quarter_quarters[span], self.quarter_counts[span]
+
+     def entities(self):
+          """
+          Every (entity_type, entity_value) with history, sorted.
+          """
+          return sorted(self.quarter_offsets)
+
+     def last_quarter(self, entity):
+          """
+          (year, quarter) of an entity's latest history row, None without history.
+          """
+          start, stop = self.quarter_offsets.get(entity, (0, 0))
+          if start == stop:
+               return None
+          return int(self.quarter_years[stop - 1]), int(self.quarter_quarters[stop - 1])
+
+     def yearly(self, entity, start_year=None, end_year=None):
+          """
+          (years, counts) of an entity for start_year <= year < end_year.
+          """
+          span = self._span(self.year_offsets, self.year_years, entity, start_year, end_year)
+          return self.year_years[span], self.year_counts[span]
+
+class RollupCache(VersionCache):
+     """
+     HistoryRollup per data version.
+     """
+
+def get_history_rollup(df_features):
+     """
+     Rollup of the actual history, built once per data version and shared
+     between requests.
+     """
+     return RollupCache.get_or_compute(df_features, HistoryRollup)
+
+def in_years(years, start_year=None, end_year=None):
+     mask = np.ones(len(years), dtype=bool)
+     if start_year is not None:
+          mask &= years >= start_year
+     if end_year is not None:
+          mask &= years < end_year
+     return mask
+
+def forecast_blocks(forecast_df, n_entities, n_quarters):
+     """
+     (years, quarters, counts) views of a batched forecast, one row per entity.
+     """
+     def column(name):
+          return forecast_df[name].to_numpy(dtype=np.int64).reshape(n_entities, n_quarters)
+
+     return column('year'), column('quarter'), column('mishap_count')
+
+def yearly_volume_frame(rollup, forecast_df, entities, n_quarters, start_year=None, end_year=None):
+     """
+     Year-wise actual + predicted volume of the given entities, restricted
+     to start_year <= year < end_year. Same columns and row order as
+     aggregate_volume_by_year_and_classification over the combined frame:
+     entity, then year, actual before predicted.
+     """
+     years, _, counts = forecast_blocks(forecast_df, len(entities), n_quarters)
+
+     out_years, out_counts, out_types, out_entities, lengths = [], [], [], [], []
+
+     for i in sorted(range(len(entities)), key=lambda i: entities[i]):
+          entity = entities[i]
+          actual_years, actual_counts = rollup.yearly(entity, start_year, end_year)
+
+          # A forecast block is in quarter order: sum consecutive equal years
+          mask = in_years(years[i], start_year, end_year)
+          predicted_years, predicted_counts = years[i][mask], counts[i][mask]
+
+          if len(predicted_years):
+               starts = np.flatnonzero(np.r_[True, predicted_years[1:] != predicted_years[:-1]])
+               predicted_years = predicted_years[starts]
+               predicted_counts = np.add.reduceat(predicted_counts, starts)
+
+          for block_years, block_counts, data_type in (
+               (actual_years, actual_counts, 0),
+               (predicted_years, predicted_counts, 1)
+          ):
+               if len(block_years):
+                    out_years.append(block_years)
+                    out_counts.append(block_counts)
+                    out_types.append(data_type)
+                    out_entities.append(entity)
+                    lengths.append(len(block_years))
+
+     type_cats = sorted({e[0] for e in out_entities})
+     value_cats = sorted({e[1] for e in out_entities})
+     type_index = {c: i for i, c in enumerate(type_cats)}
+     value_index = {c: i for i, c in enumerate(value_cats)}
+
+     return pd.DataFrame({
+          "entity_type": pd.Categorical.from_codes(
+               np.repeat([type_index[e[0]] for e in out_entities], lengths).astype(np.int64), categories=type_cats
+          ),
+          "entity_value": pd.Categorical.from_codes(
+               np.repeat([value_index[e[1]] for e in out_entities], lengths).astype(np.int64), categories=value_cats
+          ),
+          "year": np.concatenate(out_years) if out_years else np.empty(0, dtype=np.int64),
+          "data_type": pd.Categorical.from_codes(
+               np.repeat(out_types, lengths).astype(np.int64), categories=DATA_TYPES
+          ),
+          "mishap_count": np.concatenate(out_counts) if out_counts else np.empty(0, dtype=np.int64)
+     }, columns=YEARLY_COLUMNS)
+
+def quarterly_volume_frame(rollup, forecast_df, entities, n_quarters, start_year=None, end_year=None):
+     """
+     Quarterly actual + predicted volume of the given entities, restricted
+     to start_year <= year < end_year. Same columns and row order as
+     aggregate_volume_by_quarter over the combined frame.
+     """
+     years, quarters, counts = forecast_blocks(forecast_df, len(entities), n_quarters)
+     builder = CombinedFrameBuilder()
+
+     for i, (entity_type, entity_value) in enumerate(entities):
+          builder.add(entity_type, entity_value, *rollup.quarterly(entities[i], start_year, end_year), 'actual')
+
+          mask = in_years(years[i], start_year, end_year)
+          builder.add(entity_type, entity_value, years[i][mask], quarters[i][mask], counts[i][mask], 'predicted')
+
+     return builder.build()[QUARTERLY_COLUMNS]
@@ -0,0 +1,63 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+RESPONSE_FORMATS = ("records", "columnar", "ndjson")
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def response_format(payload, accept=None):
+    """
+    Response encoding asked for by a request: the payload's "format" key,
+    else NDJSON when the Accept header asks for it, else plain records.
+    """
+    fmt = (payload or {}).get("format")
+
+    if fmt is None:
+        fmt = "ndjson" if accept and NDJSON_MIMETYPE in accept else "records"
+
+    if fmt not in RESPONSE_FORMATS:
+        raise ValueError(f"Unknown response format: {fmt}. Expected one of {RESPONSE_FORMATS}")
+
+    return fmt
+
+
+def column_values(series: pd.Series):
+    """
+    Plain Python list of a column, converted straight from its NumPy buffer.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        values = np.asarray(series.cat.categories, dtype=object)[codes]
+        values[codes < 0] = None
+        return values.tolist()
+
+    return series.to_numpy().tolist()
+
+
+def to_columnar(df: pd.DataFrame):
+    """
+    {"columns": [...], "data": {column: [values]}}: one array per column
+    instead of one object per row.
+    """
+    return {
+        "columns": [str(c) for c in df.columns],
+        "data": {str(c): column_values(df[c]) for c in df.columns}
+    }
+
+
+def ndjson_line(obj):
+    return json.dumps(obj, separators=(",", ":")) + "\n"
+
+
+def iter_ndjson(df: pd.DataFrame):
+    """
+    One NDJSON line per row of the frame.
+    """
+    names = [str(c) for c in df.columns]
+    columns = [column_values(df[c]) for c in df.columns]
+
+    for row in zip(*columns):
+        yield ndjson_line(dict(zip(names, row)))
@@ -0,0 +1,91 @@
+import weakref
+import numpy as np
+import pandas as pd
+
+ENTITY_COLUMNS = ['entity_type', 'entity_value']
+SORT_COLUMNS = ['entity_type', 'entity_value', 'year', 'quarter']
+
+class FeatureStore:
+     """
+     Columnar, read-only view of the feature history.
+     Entity columns are categorical, rows are sorted by
+     (entity_type, entity_value, year, quarter) and every entity maps to one
+     contiguous [start, stop) slice, so per-entity lookups are O(1) slices
+     instead of full-column string comparisons.
+     """
+     _by_frame = weakref.WeakValueDictionary()
+
+     def __init__(self, df_features):
+          frame = df_features
+
+          # Frames that are already categorical and sorted (e.g. a memory-mapped
+          # snapshot) are used as-is, without copying their columns
+          to_encode = [col for col in ENTITY_COLUMNS if frame[col].dtype != "category"]
+          if to_encode:
+               frame = frame.astype({col: str for col in to_encode}).astype({col: "category" for col in to_encode})
+
+          type_codes = frame['entity_type'].cat.codes.to_numpy()
+          value_codes = frame['entity_value'].cat.codes.to_numpy()
+
+          order = np.lexsort((frame['quarter'].to_numpy(), frame['year'].to_numpy(), value_codes, type_codes))
+          if (order != np.arange(len(order))).any() or not isinstance(frame.index, pd.RangeIndex):
+               frame = frame.iloc[order].reset_index(drop=True)
+               type_codes, value_codes = type_codes[order], value_codes[order]
+
+          # Sorted rows: an entity starts wherever either code changes
+          starts = np.flatnonzero(np.r_[True, (type_codes[1:] != type_codes[:-1]) | (value_codes[1:] != value_codes[:-1])])
+          stops = np.r_[starts[1:], len(frame)].astype(np.int64)
+
+          type_cats = frame['entity_type'].cat.categories
+          value_cats = frame['entity_value'].cat.categories
+
+          self.frame = frame
+          self.offsets = {
+               (type_cats[type_codes[s]], value_cats[value_codes[s]]): (int(s), int(e))
+               for s, e in zip(starts, stops)
+          }
+
+     @classmethod
+     def build(cls, df_features):
+          """
+          Build a store and make it discoverable from its frame (see `of`).
+          """
+          store = cls(df_features)
+          cls._by_frame[id(store.frame)] = store
+          return store
+
+     @classmethod
+     def of(cls, df):
+          """
+          The store backing `df`, or None when `df` is any other frame
+          (a filtered copy, a frame read straight from CSV, ...).
+          """
+          store = cls._by_frame.get(id(df))
+          if store is not None and store.frame is df:
+               return store
+          return None
+
+     def entities(self):
+          return list(self.offsets)
+
+     def slice(self, entity_type, entity_value):
+          """
+          History of one entity in (year, quarter) order, or None if unknown.
+          """
+          bounds = self.offsets.get((entity_type, entity_value))
+          if bounds is None:
+               return None
+          return self.frame.iloc[bounds[0]:bounds[1]]
+
+     def rows(self, entities):
+          """
+          Rows of the given (entity_type, entity_value) pairs, in store order.
+          Unknown entities are ignored.
+          """
+          bounds = sorted({self.offsets[e] for e in entities if e in self.offsets})
+
+          if not bounds:
+               return self.frame.iloc[:0]
+
+          index = np.concatenate([np.arange(s, e) for s, e in bounds])
+          return self.frame.iloc[index]
@@ -1,5 +1,10 @@
+import hashlib
+import weakref
+
 import pandas as pd
 
+from src.utils.feature_store import FeatureStore
+
 
 def normalize_to_list(value):
     if value is None:
@@ -10,6 +15,10 @@ def normalize_to_list(value):
 
 
 def apply_entity_filters(df, filters: dict):
+    store = FeatureStore.of(df)
+    if store is not None:
+        return store.rows((etype, val) for etype, values in filters.items() for val in values)
+
     mask = False
 
     for entity_type, values in filters.items():
@@ -21,6 +30,10 @@ def apply_entity_filters(df, filters: dict):
     return df[mask]
 
 def apply_filters(df: pd.DataFrame, filters: list):
+    store = FeatureStore.of(df)
+    if store is not None:
+        return store.rows((f['entity_type'], val) for f in filters for val in f['entity_value'])
+
     mask = False
 
     for f in filters:
@@ -71,38 +84,25 @@ def resolve_columns(cols, col_map):
     return resolved
 
 
-def aggregate_dynamic(df, group_by, drill_by, metrics):
-    col_map = {c.lower(): c for c in df.columns}
-    
-    group_by_resolved  = resolve_columns(group_by, col_map)
-    drill_by_resolved  = resolve_columns(drill_by, col_map)
-    metric_resolved    = resolve_columns(metrics, col_map)
+_fingerprints = {}
 
-    group_cols = group_by_resolved + drill_by_resolved
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Content hash of a DataFrame, used as its data version.
+    Memoized per frame object, so frames are treated as immutable once
+    fingerprinted (DataContext never mutates its features frame).
+    """
+    key = id(df)
+    entry = _fingerprints.get(key)
 
-    agg_dict = {}
-    for metric in metric_resolved:
-        if metric == "mishap_count":
-            agg_dict[metric] = "sum"
+    if entry is not None and entry[0]() is df:
+        return entry[1]
 
-    result = (
-        df
-            .groupby(group_cols, as_index=False)
-            .agg(agg_dict)
-            .sort_values(group_cols)
-    )
+    row_hashes = pd.util.hash_pandas_object(df, index=False).values
+    digest = hashlib.sha1(row_hashes.tobytes())
+    digest.update(",".join(map(str, df.columns)).encode())
+    fingerprint = digest.hexdigest()[:16]
 
-    return result
-
-def reshape_entities(df):
-    return (
-        df
-        .pivot_table(
-            index=["year", "quarter", "mishap_count"],
-            columns="entity_type",
-            values="entity_value",
-            aggfunc="first"
-        )
-        .reset_index()
-    )
+    _fingerprints[key] = (weakref.ref(df, lambda _, key=key: _fingerprints.pop(key, None)), fingerprint)
 
+    return fingerprint
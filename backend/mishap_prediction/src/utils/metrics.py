@@ -0,0 +1,179 @@
+import bisect
+import contextvars
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.config import METRICS_ENABLED, METRICS_BUCKETS, DEBUG_TIMING
+from src.utils.timing import StageTimer
+
+PROMETHEUS_MIMETYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Every metric with its Prometheus type and help text
+METRICS = {
+     "mishap_requests_total": ("counter", "HTTP requests by route, method and status."),
+     "mishap_request_duration_seconds": ("histogram", "Time to produce the HTTP response, by route (streamed bodies excluded)."),
+     "mishap_stage_duration_seconds": ("histogram", "Wall time of instrumented stages."),
+     "mishap_forecast_lookups_total": ("counter", "Entity forecasts by source: materialized table, cache or live recursion."),
+     "mishap_forecast_rows_total": ("counter", "Quarters forecast by the live recursion (entities x horizon)."),
+     "mishap_model_calls_total": ("counter", "Ensemble predict calls, by backend."),
+     "mishap_model_rows_total": ("counter", "Rows predicted by the ensemble, by backend."),
+     "mishap_model_loads_total": ("counter", "Pipelines loaded from disk.")
+}
+
+def escape_label(value):
+     return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def format_labels(labels, extra=()):
+     pairs = list(labels) + list(extra)
+     if not pairs:
+          return ""
+     return "{" + ",".join(f'{k}="{escape_label(v)}"' for k, v in pairs) + "}"
+
+class Metrics:
+     """
+     Process-wide counters and histograms, rendered in the Prometheus text
+     format. Series are keyed by metric name and sorted label pairs.
+     Spans time a stage into mishap_stage_duration_seconds and, while a
+     request trace is active in the current context, into its StageTimer
+     (the debug timing breakdown of that request).
+     """
+     _lock = threading.Lock()
+     _counters = {}
+     _histograms = {}
+     _trace = contextvars.ContextVar("stage_trace", default=None)
+     enabled = METRICS_ENABLED
+     debug_timing = DEBUG_TIMING
+     buckets = tuple(METRICS_BUCKETS)
+
+     @classmethod
+     def inc(cls, name, amount=1, **labels):
+          if not cls.enabled:
+               return
+          key = (name, tuple(sorted(labels.items())))
+          with cls._lock:
+               cls._counters[key] = cls._counters.get(key, 0) + amount
+
+     @classmethod
+     def observe(cls, name, value, **labels):
+          if not cls.enabled:
+               return
+          key = (name, tuple(sorted(labels.items())))
+          # Per-bucket (not cumulative) counts, the last one is +Inf
+          bucket = bisect.bisect_left(cls.buckets, value)
+          with cls._lock:
+               series = cls._histograms.get(key)
+               if series is None:
+                    series = cls._histograms[key] = [[0] * (len(cls.buckets) + 1), 0.0, 0]
+               series[0][bucket] += 1
+               series[1] += value
+               series[2] += 1
+
+     @classmethod
+     @contextmanager
+     def span(cls, stage):
+          if not cls.enabled:
+               yield
+               return
+
+          start = time.perf_counter()
+          try:
+               yield
+          finally:
+               elapsed = time.perf_counter() - start
+               cls.observe("mishap_stage_duration_seconds", elapsed, stage=stage)
+
+               trace = cls._trace.get()
+               if trace is not None:
+                    trace.add(stage, elapsed)
+
+     @classmethod
+     def timed(cls, stage):
+          """
+          Decorator: run the function inside a span.
+          """
+          def decorator(fn):
+               @functools.wraps(fn)
+               def wrapper(*args, **kwargs):
+                    with cls.span(stage):
+                         return fn(*args, **kwargs)
+               return wrapper
+          return decorator
+
+     @classmethod
+     def start_trace(cls):
+          """
+          Collect the spans of this context into a new StageTimer.
+          Returns the timer and a token for end_trace.
+          """
+          timer = StageTimer()
+          return timer, cls._trace.set(timer)
+
+     @classmethod
+     def end_trace(cls, token):
+          cls._trace.reset(token)
+
+     @classmethod
+     def render(cls):
+          with cls._lock:
+               counters = dict(cls._counters)
+               histograms = {key: (list(series[0]), series[1], series[2]) for key, series in cls._histograms.items()}
+
+          series_by_name = {}
+          for name, labels in list(counters) + list(histograms):
+               series_by_name.setdefault(name, []).append(labels)
+
+          lines = []
+          for name in sorted(series_by_name):
+               kind, help_text = METRICS.get(name, ("untyped", ""))
+               lines.append(f"# HELP {name} {help_text}")
+               lines.append(f"# TYPE {name} {kind}")
+
+               for labels in sorted(series_by_name[name]):
+                    if (name, labels) in counters:
+                         lines.append(f"{name}{format_labels(labels)} {counters[(name, labels)]}")
+                         continue
+
+                    counts, total, count = histograms[(name, labels)]
+                    cumulative = 0
+                    for bound, bucket_count in zip(list(cls.buckets) + ["+Inf"], counts):
+                         cumulative += bucket_count
+                         le = bound if bound == "+Inf" else repr(float(bound))
+                         lines.append(f"{name}_bucket{format_labels(labels, [('le', le)])} {cumulative}")
+                    lines.append(f"{name}_sum{format_labels(labels)} {total!r}")
+                    lines.append(f"{name}_count{format_labels(labels)} {count}")
+
+          return "\n".join(lines) + "\n"
+
+     @classmethod
+     def server_timing(cls, timer):
+          """
+          Server-Timing header value of a request's stage breakdown (ms).
+          """
+          return ", ".join(
+               f"{name};dur={seconds * 1000:.2f}"
+               for name, seconds in timer.stages.items()
+          )
+
+     @classmethod
+     def reset(cls):
+          with cls._lock:
+               cls._counters = {}
+               cls._histograms = {}
+
+     @classmethod
+     def _after_fork(cls):
+          cls._lock = threading.Lock()
+          cls._counters = {}
+          cls._histograms = {}
+
+# A forked forecast worker must not inherit a lock held by another thread
+# (its metrics are dropped, only the serving process is scraped)
+os.register_at_fork(after_in_child=Metrics._after_fork)
@@ -0,0 +1,29 @@
+import time
+from contextlib import contextmanager
+
+class StageTimer:
+     """
+     Wall-time of named stages, in the order they ran.
+     """
+
+     def __init__(self):
+          self.stages = {}
+
+     @contextmanager
+     def stage(self, name):
+          start = time.perf_counter()
+          try:
+               yield
+          finally:
+               self.add(name, time.perf_counter() - start)
+
+     def add(self, name, seconds):
+          self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+     def report(self):
+          total = sum(self.stages.values())
+          width = max((len(name) for name in self.stages), default=0)
+
+          lines = [f"{name:<{width}}  {seconds:8.3f}s" for name, seconds in self.stages.items()]
+          lines.append(f"{'total':<{width}}  {total:8.3f}s")
+          return "\n".join(lines)
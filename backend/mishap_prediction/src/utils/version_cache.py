@@ -0,0 +1,48 @@
+import threading
+from collections import OrderedDict
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.utils.helpers import frame_fingerprint
+
+class VersionCache:
+     """
+     Value derived from the features, cached per data version (features
+     fingerprint). Only a handful of versions are ever live, so a small LRU
+     is enough. Each subclass is its own cache.
+     """
+     _lock = threading.Lock()
+     _entries: OrderedDict = OrderedDict()
+     max_entries = 8
+
+     def __init_subclass__(cls, **kwargs):
+          super().__init_subclass__(**kwargs)
+          cls._lock = threading.Lock()
+          cls._entries = OrderedDict()
+
+     @classmethod
+     def get_or_compute(cls, df_features, compute):
+          version = frame_fingerprint(df_features)
+
+          with cls._lock:
+               value = cls._entries.get(version)
+               if value is not None:
+                    cls._entries.move_to_end(version)
+                    return value
+
+          value = compute(df_features)
+
+          with cls._lock:
+               cls._entries[version] = value
+               while len(cls._entries) > cls.max_entries:
+                    cls._entries.popitem(last=False)
+
+          return value
+
+     @classmethod
+     def clear(cls):
+          with cls._lock:
+               cls._entries.clear()
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+sys.path.append(str(PROJECT_ROOT / "src" / "api"))
+
+from app import app as flask_app
+from asgi import AsgiApp
+
+PAYLOAD = {"filters": {"MishapType": ["Aviation", "Ground"]}, "n_quarters": 4}
+URL = '/api/mishaps/quarterly-prediction'
+
+async def call(asgi_app, path, payload, headers=()):
+     """
+     Minimal in-process ASGI client: (status, headers, body chunks).
+     """
+     messages = [{"type": "http.request", "body": json.dumps(payload).encode(), "more_body": False}]
+
+     async def receive():
+          return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+     sent = []
+
+     async def send(message):
+          sent.append(message)
+
+     scope = {
+          "type": "http",
+          "method": "POST",
+          "path": path,
+          "query_string": b"",
+          "headers": [(b"content-type", b"application/json"), *headers]
+     }
+     await asgi_app(scope, receive, send)
+
+     start = sent[0]
+     chunks = [m["body"] for m in sent[1:] if m["body"]]
+     return start["status"], dict(start["headers"]), chunks
+
+def run_concurrently(asgi_app, requests):
+     async def main():
+          return await asyncio.gather(*[call(asgi_app, *r) for r in requests])
+     return asyncio.run(main())
+
+def test_response_matches_flask():
+     expected = flask_app.test_client().post(URL, json=PAYLOAD)
+
+     [(status, headers, chunks)] = run_concurrently(AsgiApp(flask_app), [(URL, PAYLOAD)])
+
+     assert status == 200
+     assert b"".join(chunks) == expected.data
+
+def test_identical_requests_share_one_execution():
+     asgi_app = AsgiApp(flask_app)
+
+     responses = run_concurrently(asgi_app, [(URL, PAYLOAD)] * 5)
+
+     assert asgi_app.stats["executed"] == 1
+     assert asgi_app.stats["coalesced"] == 4
+     assert len({b"".join(chunks) for _, _, chunks in responses}) == 1
+
+def test_requests_over_capacity_get_503():
+     asgi_app = AsgiApp(flask_app, max_pending=1)
+
+     responses = run_concurrently(asgi_app, [(URL, PAYLOAD), (URL, {**PAYLOAD, "n_quarters": 2})])
+
+     assert [status for status, _, _ in responses] == [200, 503]
+     assert responses[1][1][b"retry-after"] == b"1"
+     assert asgi_app.pending == 0
+
+def test_ndjson_is_streamed_in_chunks():
+     asgi_app = AsgiApp(flask_app)
+
+     [(status, headers, chunks)] = run_concurrently(asgi_app, [(URL, {**PAYLOAD, "format": "ndjson"})])
+
+     assert status == 200
+     assert headers[b"content-type"] == b"application/x-ndjson"
+     assert len(chunks) > 1
+     assert asgi_app.stats["coalesced"] == 0
+
+def test_failure_mid_stream_ends_with_an_error_record():
+     def failing_app(environ, start_response):
+          start_response("200 OK", [("Content-Type", "application/x-ndjson")])
+          yield b'{"year":2025}\n'
+          raise RuntimeError("forecast failed")
+
+     [(status, headers, chunks)] = run_concurrently(
+          AsgiApp(failing_app), [(URL, PAYLOAD, [(b"accept", b"application/x-ndjson")])]
+     )
+
+     lines = [json.loads(line) for line in b"".join(chunks).splitlines()]
+     assert status == 200
+     assert lines == [{"year": 2025}, {"error": "forecast failed"}]
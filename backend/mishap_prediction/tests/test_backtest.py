@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.models.backtest import backtest_report, run_backtest, summarize_backtest
+from src.models.forecast_state import EntityForecastState
+from src.models.predict import predict_future_quarters_batch
+from src.config import PROCESSED_DATA_DIR
+
+df = pd.read_csv(PROCESSED_DATA_DIR / "features.csv")
+
+HORIZON = 4
+
+
+@pytest.fixture(scope="module")
+def errors():
+     return run_backtest(df, horizon=HORIZON, start_year=2023)
+
+
+def test_from_windows_matches_constructor():
+     recent = [[3.0], [1.0, 2.0, 5.0], [4.0, 0.0, 7.0, 9.0]]
+     windows = np.zeros((3, 4))
+     for i, counts in enumerate(recent):
+          windows[i, :len(counts)] = counts
+
+     expected = EntityForecastState(["t"] * 3, ["a", "b", "c"], [2020] * 3, [4, 1, 2], recent)
+     state = EntityForecastState.from_windows(["t"] * 3, ["a", "b", "c"], [2020] * 3, [4, 1, 2], windows, [1, 3, 4])
+
+     for attr in ['last_count', 'window', 'window_len', 'window_pos', 'next_year', 'next_quarter']:
+          np.testing.assert_array_equal(getattr(state, attr), getattr(expected, attr))
+
+
+def test_batched_backtest_matches_forecasts_from_truncated_history(errors):
+     origins = errors[["entity_type", "entity_value", "origin_year", "origin_quarter"]].drop_duplicates()
+
+     for entity_type, entity_value, year, quarter in origins.sample(6, random_state=0).itertuples(index=False):
+          period = df['year'] * 4 + df['quarter']
+          history = df[
+               (df['entity_type'] == entity_type) & (df['entity_value'] == entity_value) &
+               (period <= year * 4 + quarter)
+          ]
+          forecast = predict_future_quarters_batch(history, [(entity_type, entity_value)], HORIZON, use_cache=False)
+
+          scored = errors[
+               (errors['entity_type'] == entity_type) & (errors['entity_value'] == entity_value) &
+               (errors['origin_year'] == year) & (errors['origin_quarter'] == quarter)
+          ]
+          expected = forecast.iloc[scored['horizon'].to_numpy() - 1]
+
+          assert list(scored['year']) == list(expected['year'])
+          assert list(scored['quarter']) == list(expected['quarter'])
+          assert list(scored['predicted']) == list(expected['mishap_count'])
+
+
+def test_actuals_cover_observed_quarters_only(errors):
+     observed = df.set_index(['entity_type', 'entity_value', 'year', 'quarter'])['mishap_count']
+     last = df.groupby(['entity_type', 'entity_value'])[['year', 'quarter']].max()
+
+     for row in errors.sample(200, random_state=0).itertuples(index=False):
+          key = (row.entity_type, row.entity_value, row.year, row.quarter)
+          assert row.actual == observed.get(key, 0)
+
+     target = errors['year'] * 4 + errors['quarter']
+     entity_last = last.reindex(pd.MultiIndex.from_frame(errors[['entity_type', 'entity_value']]))
+     assert (target.to_numpy() <= (entity_last['year'] * 4 + entity_last['quarter']).to_numpy()).all()
+
+
+def test_summaries(errors):
+     by_horizon = summarize_backtest(errors, ["horizon"])
+
+     assert list(by_horizon['horizon']) == list(range(1, HORIZON + 1))
+     assert by_horizon['n'].sum() == len(errors)
+
+     one_step = errors[errors['horizon'] == 1]
+     assert by_horizon['mae'].iloc[0] == pytest.approx((one_step['predicted'] - one_step['actual']).abs().mean())
+
+     nonzero = one_step[one_step['actual'] > 0]
+     mape = ((nonzero['predicted'] - nonzero['actual']).abs() / nonzero['actual']).mean() * 100
+     assert by_horizon['mape'].iloc[0] == pytest.approx(mape)
+
+     report = backtest_report(errors)
+     assert report['overall']['n'] == len(errors)
+     assert len(report['by_entity']) == errors[['entity_type', 'entity_value']].drop_duplicates().shape[0]
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.models.compiled_ensemble import CompiledEnsemble
+from src.models.ensemble import MishapEnsembler
+from src.config import PROCESSED_DATA_DIR
+
+df = pd.read_csv(PROCESSED_DATA_DIR / "features.csv")
+
+FEATURE_COLS = ['entity_type', 'entity_value', 'year', 'quarter', 'prev_qtr_count', 'qoq_change', 'rolling_4q_avg']
+
+
+def test_compiled_backend_matches_sklearn_pipelines():
+     sklearn = MishapEnsembler(backend="sklearn")
+     compiled = MishapEnsembler(backend="compiled")
+
+     X = df[FEATURE_COLS]
+
+     np.testing.assert_allclose(
+          compiled.predict(X, w_rf=0.4, w_gb=0.6),
+          sklearn.predict(X, w_rf=0.4, w_gb=0.6),
+          rtol=0, atol=1e-9
+     )
+
+
+def test_compiled_encoding_handles_unknown_categories():
+     compiled = CompiledEnsemble.current()
+     sklearn = MishapEnsembler(backend="sklearn")
+
+     X = df[FEATURE_COLS].head(3).copy()
+     X['entity_value'] = "Space"
+
+     np.testing.assert_array_equal(compiled.encode(X), sklearn.encode(X))
+
+
+def test_exported_artifact_round_trips(tmp_path):
+     compiled = CompiledEnsemble.current()
+     path = tmp_path / "compiled.npz"
+
+     compiled.save(path)
+     loaded = CompiledEnsemble.load(path)
+
+     X = compiled.encode(df[FEATURE_COLS])
+     assert loaded.source == compiled.source
+     np.testing.assert_array_equal(loaded.predict_encoded(X, 0.3, 0.7), compiled.predict_encoded(X, 0.3, 0.7))
+
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.services.drilldown import (
+     DistributionCache,
+     allocate_largest_remainder,
+     compute_classification_distribution,
+     explode_by_classification,
+     get_classification_distribution
+)
+from src.config import PROCESSED_DATA_DIR
+
+df = pd.read_csv(PROCESSED_DATA_DIR / "features.csv")
+
+PREDICTED = pd.DataFrame({
+     "year": [2025, 2026, 2026],
+     "quarter": [4, 1, 2],
+     "entity_type": "MishapType",
+     "entity_value": "Aviation",
+     "mishap_count": [18, 25, 0],
+     "data_type": "predicted"
+})
+
+
+def iterrows_explode(predicted_df, cls_dist):
+     """
+     The original row-by-row drill-down, kept as the reference.
+     """
+     expanded = []
+
+     for _, row in predicted_df.iterrows():
+          for _, cls in cls_dist.iterrows():
+               expanded.append({
+                    "year": row["year"],
+                    "quarter": row["quarter"],
+                    "entity_type": "MishapClassification",
+                    "entity_value": cls["entity_value"],
+                    "mishap_count": round(row["mishap_count"] * cls["ratio"]),
+                    "data_type": "predicted"
+               })
+
+     return pd.DataFrame(expanded)
+
+
+def test_vectorized_drilldown_matches_row_loop():
+     cls_dist = get_classification_distribution(df)
+
+     pd.testing.assert_frame_equal(
+          explode_by_classification(PREDICTED, cls_dist, rounding="round"),
+          iterrows_explode(PREDICTED, cls_dist),
+          check_dtype=False
+     )
+
+
+def test_largest_remainder_adds_up_to_parent_forecast():
+     cls_dist = get_classification_distribution(df)
+     exploded = explode_by_classification(PREDICTED, cls_dist, rounding="largest_remainder")
+
+     totals = exploded.groupby(["year", "quarter"])["mishap_count"].sum().to_numpy()
+     np.testing.assert_array_equal(totals, PREDICTED["mishap_count"].to_numpy())
+
+
+def test_largest_remainder_allocation():
+     allocated = allocate_largest_remainder(np.array([10, 7, 1]), np.array([0.5, 0.3, 0.2]))
+
+     np.testing.assert_array_equal(allocated, [[5, 3, 2], [4, 2, 1], [1, 0, 0]])
+
+
+def test_distribution_is_cached_per_data_version():
+     DistributionCache.clear()
+
+     first = get_classification_distribution(df)
+     assert get_classification_distribution(df) is first
+     assert get_classification_distribution(df.copy()) is first
+
+     changed = df.copy()
+     changed.loc[changed['entity_value'] == "A", 'mishap_count'] += 100
+     pd.testing.assert_frame_equal(get_classification_distribution(changed), compute_classification_distribution(changed))
+
+
+def test_unknown_rounding_mode_is_rejected():
+     with pytest.raises(ValueError, match="rounding"):
+          explode_by_classification(PREDICTED, get_classification_distribution(df), rounding="ceil")
@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.services.executor import ForecastPool, map_entity_chunks, split_chunks
+from src.services.prediction_service import forecast_entities
+from src.config import PROCESSED_DATA_DIR
+
+df = pd.read_csv(PROCESSED_DATA_DIR / "features.csv")
+
+ENTITIES = list(
+     df[['entity_type', 'entity_value']].drop_duplicates().itertuples(index=False, name=None)
+)
+
+
+def chunk_size(df_features, chunk, offset):
+     return len(chunk) + offset
+
+
+def test_split_chunks_is_contiguous_and_balanced():
+     chunks = split_chunks(range(10), 4)
+
+     assert chunks == [[0, 1, 2], [3, 4, 5], [6, 7], [8, 9]]
+     assert split_chunks([], 4) == [[]]
+     assert split_chunks([1, 2], 8) == [[1], [2]]
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_parallel_fanout_matches_serial_order(executor):
+     serial = forecast_entities(df, ENTITIES, 4, 0.3, 0.7, executor="serial")
+
+     try:
+          parallel = forecast_entities(df, ENTITIES, 4, 0.3, 0.7, executor=executor, workers=3)
+     finally:
+          ForecastPool.shutdown()
+
+     pd.testing.assert_frame_equal(parallel, serial)
+
+
+def test_bounded_submission_keeps_chunk_order():
+     chunks = split_chunks(range(20), 10)
+
+     try:
+          results = map_entity_chunks(chunk_size, df, chunks, args=(100,), backend="thread", max_workers=2, max_pending=2)
+     finally:
+          ForecastPool.shutdown()
+
+     assert results == [len(c) + 100 for c in chunks]
+
+
+def test_unknown_executor_is_rejected():
+     with pytest.raises(ValueError, match="executor"):
+          map_entity_chunks(chunk_size, df, [[1], [2]], args=(0,), backend="cluster")
@@ -0,0 +1,71 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.preprocessing.feature_snapshot import SCHEMA_FILE, load_features, read_snapshot, write_snapshot
+from src.utils.feature_store import FeatureStore
+from src.config import FEATURES_CSV_PATH
+
+df = pd.read_csv(FEATURES_CSV_PATH)
+
+def test_snapshot_round_trip(tmp_path):
+     write_snapshot(df, tmp_path / "snapshot")
+
+     pd.testing.assert_frame_equal(read_snapshot(tmp_path / "snapshot", categorical=False), df)
+
+     snapshot = read_snapshot(tmp_path / "snapshot")
+     assert snapshot['entity_value'].dtype == "category"
+     assert not snapshot['year'].to_numpy().flags.writeable
+
+def test_store_reuses_mapped_columns(tmp_path):
+     write_snapshot(df, tmp_path / "snapshot")
+     snapshot = read_snapshot(tmp_path / "snapshot")
+
+     store = FeatureStore.build(snapshot)
+
+     assert store.frame is snapshot
+     assert np.shares_memory(store.frame['mishap_count'].to_numpy(), snapshot['mishap_count'].to_numpy())
+
+def test_falls_back_to_csv(tmp_path):
+     pd.testing.assert_frame_equal(load_features(FEATURES_CSV_PATH, tmp_path / "missing"), df)
+
+     write_snapshot(df, tmp_path / "snapshot")
+     schema_path = tmp_path / "snapshot" / SCHEMA_FILE
+     schema = json.loads(schema_path.read_text())
+     schema["schema_version"] = -1
+     schema_path.write_text(json.dumps(schema))
+
+     loaded = load_features(FEATURES_CSV_PATH, tmp_path / "snapshot")
+     assert loaded['entity_type'].dtype == object
+     pd.testing.assert_frame_equal(loaded, df)
+
+def test_snapshot_is_checked_against_its_csv(tmp_path):
+     csv_path = tmp_path / "features.csv"
+     df.to_csv(csv_path, index=False)
+     write_snapshot(df, tmp_path / "snapshot", source=csv_path)
+
+     assert load_features(csv_path, tmp_path / "snapshot")['entity_type'].dtype == "category"
+
+     # Same bytes, new mtime (e.g. a fresh checkout): the digest still matches
+     os.utime(csv_path, ns=(0, 0))
+     assert load_features(csv_path, tmp_path / "snapshot")['entity_type'].dtype == "category"
+
+     changed = df.assign(mishap_count=df['mishap_count'] + 1)
+     changed.to_csv(csv_path, index=False)
+     os.utime(csv_path, ns=(0, 0))
+
+     loaded = load_features(csv_path, tmp_path / "snapshot")
+     assert loaded['entity_type'].dtype == object
+     pd.testing.assert_frame_equal(loaded, changed)
+
+def test_snapshot_without_source_is_not_trusted(tmp_path):
+     write_snapshot(df, tmp_path / "snapshot")
+
+     assert load_features(FEATURES_CSV_PATH, tmp_path / "snapshot")['entity_type'].dtype == object
+     assert load_features(tmp_path / "missing.csv", tmp_path / "snapshot")['entity_type'].dtype == "category"
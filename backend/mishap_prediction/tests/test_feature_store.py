@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.utils.feature_store import FeatureStore
+from src.utils.helpers import apply_entity_filters, apply_filters
+from src.models.forecast_state import EntityForecastState
+from src.models.predict import predict_future_quarters_batch
+from src.config import PROCESSED_DATA_DIR
+
+df = pd.read_csv(PROCESSED_DATA_DIR / "features.csv")
+store = FeatureStore.build(df)
+
+FILTERS = {"MishapType": ["Aviation", "Ground"], "Source": ["Mishap Report", "Unknown"]}
+
+def as_plain(frame):
+     return (
+          frame
+          .astype({"entity_type": str, "entity_value": str})
+          .sort_values(by=['entity_type', 'entity_value', 'year', 'quarter'])
+          .reset_index(drop=True)
+     )
+
+def test_store_is_sorted_with_contiguous_entity_slices():
+     assert len(store.offsets) == df.groupby(['entity_type', 'entity_value']).ngroups
+     assert store.frame['entity_type'].dtype == "category"
+
+     for (etype, val), (start, stop) in store.offsets.items():
+          entity_df = store.frame.iloc[start:stop]
+          assert (entity_df['entity_type'] == etype).all()
+          assert (entity_df['entity_value'] == val).all()
+          assert (np.diff(entity_df['year'] * 4 + entity_df['quarter']) > 0).all()
+
+def test_store_lookup_is_only_for_its_own_frame():
+     assert FeatureStore.of(store.frame) is store
+     assert FeatureStore.of(df) is None
+     assert FeatureStore.of(store.frame.copy()) is None
+
+def test_filters_match_full_scan():
+     expected = as_plain(apply_entity_filters(df, FILTERS))
+
+     pd.testing.assert_frame_equal(as_plain(apply_entity_filters(store.frame, FILTERS)), expected)
+
+     list_filters = [{"entity_type": k, "entity_value": v} for k, v in FILTERS.items()]
+     pd.testing.assert_frame_equal(as_plain(apply_filters(store.frame, list_filters)), expected)
+
+def test_forecasts_match_plain_frame():
+     entities = [("MishapType", "Aviation"), ("MishapClassification", "A")]
+
+     pd.testing.assert_frame_equal(
+          predict_future_quarters_batch(store.frame, entities, 4, use_cache=False),
+          predict_future_quarters_batch(df, entities, 4, use_cache=False)
+     )
+
+def test_unknown_entity_still_raises():
+     with pytest.raises(ValueError, match="No data found"):
+          EntityForecastState.from_history(store.frame, [("MishapType", "Space")])
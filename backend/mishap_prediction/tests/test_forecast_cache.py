@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.models.forecast_cache import ForecastCache
+from src.models.forecast_table import ForecastTable
+from src.models.predict import predict_future_quarters, predict_future_quarters_batch
+from src.config import PROCESSED_DATA_DIR
+
+df = pd.read_csv(PROCESSED_DATA_DIR / "features.csv")
+
+@pytest.fixture(autouse=True)
+def live_forecasts(monkeypatch):
+     # These tests exercise the cache, not the materialized table
+     monkeypatch.setattr(ForecastTable, "current", classmethod(lambda cls, path=None: None))
+
+
+def test_repeated_forecast_is_served_from_cache():
+     ForecastCache.clear()
+
+     first = predict_future_quarters(df, "MishapType", "Aviation", n_quarters=4)
+     assert ForecastCache.stats()["misses"] == 1
+
+     second = predict_future_quarters(df, "MishapType", "Aviation", n_quarters=4)
+     assert ForecastCache.stats()["hits"] == 1
+
+     pd.testing.assert_frame_equal(first, second)
+
+     # Different weights are a different forecast
+     predict_future_quarters(df, "MishapType", "Aviation", n_quarters=4, w_rf=0.5, w_gb=0.5)
+     assert ForecastCache.stats()["misses"] == 2
+
+
+def test_changed_features_invalidate_cached_forecasts():
+     ForecastCache.clear()
+     predict_future_quarters(df, "MishapType", "Ground", n_quarters=3)
+
+     changed = df.copy()
+     changed.loc[changed['entity_value'] == "Ground", 'mishap_count'] += 10
+
+     uncached = predict_future_quarters_batch(changed, [("MishapType", "Ground")], n_quarters=3, use_cache=False)
+     cached = predict_future_quarters(changed, "MishapType", "Ground", n_quarters=3)
+
+     assert ForecastCache.stats()["hits"] == 0
+     pd.testing.assert_frame_equal(cached, uncached)
+
+
+def test_cache_evicts_least_recently_used():
+     ForecastCache.clear()
+     max_entries = ForecastCache.max_entries
+     ForecastCache.max_entries = 2
+
+     try:
+          ForecastCache.put("a", 1)
+          ForecastCache.put("b", 2)
+          ForecastCache.get("a")
+          ForecastCache.put("c", 3)
+
+          assert ForecastCache.get("b") is None
+          assert ForecastCache.get("a") == 1
+          assert ForecastCache.get("c") == 3
+          assert ForecastCache.stats()["size"] == 2
+     finally:
+          ForecastCache.max_entries = max_entries
+          ForecastCache.clear()
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.models.forecast_cache import ForecastCache
+from src.models.forecast_table import ForecastTable
+from src.models.predict import predict_future_quarters_batch
+from src.config import PROCESSED_DATA_DIR
+
+df = pd.read_csv(PROCESSED_DATA_DIR / "features.csv")
+
+ENTITIES = [("MishapType", "Aviation"), ("MishapType", "Ground"), ("MishapClassification", "D")]
+GRID = [0.0, 0.3, 1.0]
+
+
+@pytest.fixture
+def table(tmp_path, monkeypatch):
+     path = tmp_path / "forecast_table.npz"
+     ForecastTable.materialize(df, ENTITIES, horizon=6, grid=GRID).save(path)
+
+     loaded = ForecastTable.load(path)
+     monkeypatch.setattr(ForecastTable, "current", classmethod(lambda cls, path=None: loaded))
+     return loaded
+
+
+def test_table_rows_match_live_forecasts(table):
+     for n_quarters in (1, 6):
+          for w_rf in GRID:
+               w_gb = round(1 - w_rf, 10)
+               live = predict_future_quarters_batch(df, ENTITIES, n_quarters, w_rf, w_gb, use_cache=False)
+
+               for i, entity in enumerate(ENTITIES):
+                    years, quarters, counts = table.lookup(entity, n_quarters, w_rf, w_gb)
+                    rows = live.iloc[i * n_quarters:(i + 1) * n_quarters]
+
+                    np.testing.assert_array_equal(years, rows['year'])
+                    np.testing.assert_array_equal(quarters, rows['quarter'])
+                    np.testing.assert_array_equal(counts, rows['mishap_count'])
+
+
+def test_requests_outside_the_table_are_not_served_from_it(table):
+     assert table.lookup(ENTITIES[0], 7, 0.3, 0.7) is None
+     assert table.lookup(ENTITIES[0], 4, 0.5, 0.5) is None
+     assert table.lookup(("MishapType", "Unknown"), 4, 0.3, 0.7) is None
+
+
+def test_api_serves_from_matching_table_only(table):
+     ForecastCache.clear()
+     served = predict_future_quarters_batch(df, ENTITIES, 4, 0.3, 0.7)
+     assert ForecastCache.stats()["misses"] == 0
+
+     # Changed features are a different data version: forecast live
+     changed = df.copy()
+     changed.loc[changed['entity_value'] == "Ground", 'mishap_count'] += 10
+
+     live = predict_future_quarters_batch(changed, ENTITIES, 4, 0.3, 0.7)
+     assert ForecastCache.stats()["misses"] == len(ENTITIES)
+     assert not served.equals(live)
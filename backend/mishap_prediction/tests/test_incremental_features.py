@@ -0,0 +1,97 @@
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.preprocessing.build_features import INPUT_FILE, compute_feature_values
+from src.preprocessing import feature_snapshot, incremental_features
+from src.preprocessing.feature_snapshot import read_snapshot, write_snapshot
+from src.preprocessing.incremental_features import FeatureTailState, append_features
+
+raw = pd.read_csv(INPUT_FILE)
+period = raw['year'] * 4 + raw['quarter']
+
+SORT = ['entity_type', 'entity_value', 'year', 'quarter']
+
+def full_build(raw_df):
+     df = raw_df.sort_values(by=SORT)
+     return compute_feature_values(df).reset_index(drop=True)
+
+@pytest.fixture
+def store(tmp_path):
+     """
+     Processed store built from all quarters before 2025.
+     """
+     paths = {
+          "csv_path": tmp_path / "features.csv",
+          "snapshot_dir": tmp_path / "features_snapshot",
+          "tail_path": tmp_path / "features_tail.json"
+     }
+
+     history = full_build(raw[raw['year'] < 2025])
+     history.to_csv(paths["csv_path"], index=False)
+     write_snapshot(history, paths["snapshot_dir"])
+     FeatureTailState.from_features(history).save(paths["tail_path"])
+
+     return paths
+
+def test_quarter_by_quarter_refresh_matches_full_build(store):
+     for quarter in range(1, 5):
+          append_features(raw[(raw['year'] == 2025) & (raw['quarter'] == quarter)], **store)
+
+     expected = full_build(raw)
+
+     from_csv = pd.read_csv(store["csv_path"]).sort_values(by=SORT).reset_index(drop=True)
+     pd.testing.assert_frame_equal(from_csv, expected)
+
+     from_snapshot = read_snapshot(store["snapshot_dir"], categorical=False).sort_values(by=SORT).reset_index(drop=True)
+     pd.testing.assert_frame_equal(from_snapshot, expected)
+
+def test_refresh_without_saved_tail(store):
+     store["tail_path"].unlink()
+
+     appended = append_features(raw[(raw['year'] == 2025) & (raw['quarter'] == 1)], **store)
+
+     expected = full_build(raw[period <= 2025 * 4 + 1])
+     expected = expected[(expected['year'] == 2025)].reset_index(drop=True)
+     pd.testing.assert_frame_equal(appended.sort_values(by=SORT).reset_index(drop=True), expected)
+
+@pytest.mark.parametrize("rows, message", [
+     (raw[(raw['year'] == 2024) & (raw['quarter'] == 4)], "not after"),
+     (raw[(raw['year'] == 2025) & (raw['quarter'] == 2)], "not contiguous"),
+     (pd.concat([raw[(raw['year'] == 2025) & (raw['quarter'] == 1)]] * 2), "duplicate"),
+])
+def test_rejects_rows_that_do_not_extend_history(store, rows, message):
+     before = store["csv_path"].read_bytes()
+
+     with pytest.raises(ValueError, match=message):
+          append_features(rows, **store)
+
+     assert store["csv_path"].read_bytes() == before
+
+def fail(*args, **kwargs):
+     raise OSError("disk full")
+
+@pytest.mark.parametrize("target, name", [
+     (incremental_features, "append_snapshot"),
+     (feature_snapshot, "write_schema")
+])
+def test_failed_snapshot_append_leaves_the_store_unchanged(store, monkeypatch, target, name):
+     files = [store["csv_path"], store["tail_path"], *sorted(store["snapshot_dir"].iterdir())]
+     before = [path.read_bytes() for path in files]
+
+     with monkeypatch.context() as m:
+          m.setattr(target, name, fail)
+          with pytest.raises(OSError):
+               append_features(raw[(raw['year'] == 2025) & (raw['quarter'] == 1)], **store)
+
+     assert [path.read_bytes() for path in files] == before
+
+     # The same rows go in once the failure is gone
+     append_features(raw[(raw['year'] == 2025) & (raw['quarter'] == 1)], **store)
+     expected = full_build(raw[period <= 2025 * 4 + 1])
+     pd.testing.assert_frame_equal(read_snapshot(store["snapshot_dir"], categorical=False).sort_values(by=SORT).reset_index(drop=True), expected)
+     pd.testing.assert_frame_equal(pd.read_csv(store["csv_path"]).sort_values(by=SORT).reset_index(drop=True), expected)
@@ -0,0 +1,96 @@
+import pytest
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+sys.path.append(str(PROJECT_ROOT / "src" / "api"))
+
+from app import app as flask_app
+from src.utils.metrics import Metrics
+
+PAYLOAD = {"filters": {"MishapType": ["Aviation", "Ground"]}, "n_quarters": 4}
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics(monkeypatch):
+     monkeypatch.setattr(Metrics, "buckets", (0.1, 1.0))
+     Metrics.reset()
+     yield
+     Metrics.reset()
+
+
+def test_prometheus_text_format():
+     Metrics.inc("mishap_requests_total", route="/a", status=200)
+     Metrics.inc("mishap_requests_total", 2, route="/a", status=200)
+     Metrics.inc("mishap_forecast_rows_total", 8)
+     for value in [0.05, 0.5, 0.7, 3.0]:
+          Metrics.observe("mishap_stage_duration_seconds", value, stage='say "hi"')
+
+     lines = Metrics.render().splitlines()
+
+     assert "# TYPE mishap_requests_total counter" in lines
+     assert 'mishap_requests_total{route="/a",status="200"} 3' in lines
+     assert "mishap_forecast_rows_total 8" in lines
+
+     assert "# TYPE mishap_stage_duration_seconds histogram" in lines
+     assert 'mishap_stage_duration_seconds_bucket{stage="say \\"hi\\"",le="0.1"} 1' in lines
+     assert 'mishap_stage_duration_seconds_bucket{stage="say \\"hi\\"",le="1.0"} 3' in lines
+     assert 'mishap_stage_duration_seconds_bucket{stage="say \\"hi\\"",le="+Inf"} 4' in lines
+     assert 'mishap_stage_duration_seconds_sum{stage="say \\"hi\\""} 4.25' in lines
+     assert 'mishap_stage_duration_seconds_count{stage="say \\"hi\\""} 4' in lines
+
+
+def test_spans_feed_the_histogram_and_the_active_trace():
+     @Metrics.timed("outer")
+     def work():
+          with Metrics.span("inner"):
+               pass
+
+     work()
+     timer, token = Metrics.start_trace()
+     try:
+          work()
+     finally:
+          Metrics.end_trace(token)
+     work()
+
+     assert list(timer.stages) == ["inner", "outer"]
+     assert 'mishap_stage_duration_seconds_count{stage="outer"} 3' in Metrics.render().splitlines()
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+     monkeypatch.setattr(Metrics, "enabled", False)
+
+     with Metrics.span("stage"):
+          Metrics.inc("mishap_forecast_rows_total")
+
+     assert Metrics.render() == "\n"
+
+
+def test_metrics_endpoint_counts_requests_and_forecast_stages():
+     client = flask_app.test_client()
+     assert client.post('/api/mishaps/yearly-trend', json=PAYLOAD).status_code == 200
+
+     response = client.get('/metrics')
+     text = response.get_data(as_text=True)
+
+     assert response.content_type.startswith("text/plain; version=0.0.4")
+     assert 'mishap_requests_total{method="POST",route="/api/mishaps/yearly-trend",status="200"} 1' in text
+     assert 'mishap_request_duration_seconds_count{route="/api/mishaps/yearly-trend"} 1' in text
+     for stage in ["service.rollup", "service.volume_frame", "insight.text", "route.encode"]:
+          assert f'mishap_stage_duration_seconds_count{{stage="{stage}"}}' in text
+     assert "mishap_forecast_lookups_total" in text
+
+
+def test_server_timing_header_only_with_debug_timing(monkeypatch):
+     client = flask_app.test_client()
+
+     assert 'Server-Timing' not in client.post('/api/mishaps/yearly-trend', json=PAYLOAD).headers
+
+     monkeypatch.setattr(Metrics, "debug_timing", True)
+     header = client.post('/api/mishaps/yearly-trend', json=PAYLOAD).headers['Server-Timing']
+
+     stages = dict(entry.split(";dur=") for entry in header.split(", "))
+     assert {"service.rollup", "service.volume_frame", "insight.text", "route.encode"} <= set(stages)
+     assert all(float(ms) >= 0 for ms in stages.values())
@@ -0,0 +1,76 @@
+import threading
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.models.micro_batch import InferenceBatcher
+from src.models.predict import predict_future_quarters_batch
+from src.config import PROCESSED_DATA_DIR
+
+df = pd.read_csv(PROCESSED_DATA_DIR / "features.csv")
+entities = list(df[['entity_type', 'entity_value']].drop_duplicates().itertuples(index=False, name=None))
+
+def forecast(entity, w_rf):
+     return predict_future_quarters_batch(df, [entity], 6, w_rf, 1 - w_rf, use_cache=False)
+
+def test_concurrent_forecasts_are_batched_with_identical_results():
+     weights = [0.1 * (i % 10) for i in range(len(entities))]
+
+     InferenceBatcher.enabled = False
+     expected = [forecast(e, w) for e, w in zip(entities, weights)]
+
+     InferenceBatcher.enabled = True
+     InferenceBatcher.reset()
+     InferenceBatcher.max_wait = 0.05
+
+     results = [None] * len(entities)
+     barrier = threading.Barrier(len(entities))
+
+     def run(i):
+          barrier.wait()
+          results[i] = forecast(entities[i], weights[i])
+
+     threads = [threading.Thread(target=run, args=(i,)) for i in range(len(entities))]
+     try:
+          for t in threads:
+               t.start()
+          for t in threads:
+               t.join()
+     finally:
+          InferenceBatcher.max_wait = 0.002
+
+     for got, want in zip(results, expected):
+          pd.testing.assert_frame_equal(got, want)
+
+     stats = InferenceBatcher.stats()
+     assert stats["submissions"] == len(entities) * 6
+     assert stats["batches"] < stats["submissions"]
+     assert stats["active"] == 0
+
+def test_lone_forecast_runs_one_batch_per_step():
+     InferenceBatcher.reset()
+
+     forecast(entities[0], 0.3)
+
+     assert InferenceBatcher.stats() == {"batches": 6, "submissions": 6, "active": 0}
+
+
+def test_lone_forecast_never_waits():
+     class CountingCondition(threading.Condition):
+          waits = 0
+
+          def wait(self, timeout=None):
+               CountingCondition.waits += 1
+               return super().wait(timeout)
+
+     InferenceBatcher.reset()
+     InferenceBatcher._cond = CountingCondition()
+
+     forecast(entities[0], 0.3)
+
+     assert CountingCondition.waits == 0
+     InferenceBatcher.reset()
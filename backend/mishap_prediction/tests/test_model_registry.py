@@ -0,0 +1,37 @@
+import joblib
+import os
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.config import RF_PIPELINE_PATH, GB_PIPELINE_PATH
+from src.models.ensemble import MishapEnsembler
+from src.models.registry import ModelRegistry
+
+
+def test_pipelines_are_shared_between_ensemblers():
+     ModelRegistry.warm_up()
+
+     first = MishapEnsembler()
+     second = MishapEnsembler(0.5, 0.5)
+
+     assert first.rf_pipeline is second.rf_pipeline
+     assert first.gb_pipeline is second.gb_pipeline
+     assert first.rf_pipeline is ModelRegistry.get(RF_PIPELINE_PATH)
+     assert first.gb_pipeline is ModelRegistry.get(GB_PIPELINE_PATH)
+
+
+def test_artifact_is_reloaded_when_mtime_changes(tmp_path):
+     path = tmp_path / "pipeline.joblib"
+     joblib.dump({"version": 1}, path)
+
+     loaded = ModelRegistry.get(path)
+     assert ModelRegistry.get(path) is loaded
+
+     joblib.dump({"version": 2}, path)
+     stat = os.stat(path)
+     os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+     assert ModelRegistry.get(path)["version"] == 2
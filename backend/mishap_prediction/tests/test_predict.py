@@ -1,28 +1,40 @@
+import numpy as np
 import pandas as pd
-import joblib
 import sys
 from pathlib import Path
 
 PROJECT_ROOT = Path().resolve()
 sys.path.append(str(PROJECT_ROOT))
 
-from src.models.predict import predict_future_quarters
-from src.config import PROCESSED_DATA_DIR, MODEL_DIR
+from src.models.predict import FORECAST_COLUMNS, predict_future_quarters, predict_future_quarters_batch
+from src.config import PROCESSED_DATA_DIR
 
 # Load historical aggregated data
 df = pd.read_csv(PROCESSED_DATA_DIR / "features.csv")
 
-# Load trained model
-model = joblib.load(MODEL_DIR / "rf_mishap_model.pkl")
 
-preds = predict_future_quarters(
-    df_features=df,
-    entity_type="MishapType",
-    entity_value="Aviation",
-    n_quarters=4,
-    w_rf=0.4,
-    w_gb=0.6
-)
+def test_predict_future_quarters():
+     preds = predict_future_quarters(
+          df_features=df,
+          entity_type="MishapType",
+          entity_value="Aviation",
+          n_quarters=4,
+          w_rf=0.4,
+          w_gb=0.6
+     )
 
-print(preds)
+     assert list(preds.columns) == FORECAST_COLUMNS
+     assert len(preds) == 4
+     assert (preds['entity_type'] == "MishapType").all()
+     assert (preds['entity_value'] == "Aviation").all()
+     assert (preds['mishap_count'] >= 0).all()
 
+     # Consecutive quarters right after the last observed one (2025 Q3)
+     assert list(zip(preds['year'], preds['quarter'])) == [(2025, 4), (2026, 1), (2026, 2), (2026, 3)]
+
+
+def test_predict_future_quarters_matches_batch():
+     single = predict_future_quarters(df, "Source", "Mishap Report", n_quarters=6)
+     batch = predict_future_quarters_batch(df, [("MishapType", "Ground"), ("Source", "Mishap Report")], n_quarters=6)
+
+     np.testing.assert_array_equal(single['mishap_count'], batch['mishap_count'].iloc[6:])
@@ -0,0 +1,74 @@
+import pstats
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+sys.path.append(str(PROJECT_ROOT / "src" / "api"))
+
+from app import app as flask_app, create_app
+from profiling import ProfileStore, RequestProfiler, summarize_samples
+
+URL = '/api/mishaps/quarterly-prediction'
+PAYLOAD = {"filters": {"MishapType": ["Aviation", "Ground"]}, "n_quarters": 4}
+
+
+def profiled_client(tmp_path, max_profiles=10, slow_ms=None):
+     store = ProfileStore(tmp_path, max_profiles)
+     app = create_app()
+     RequestProfiler(store, slow_ms=slow_ms).install(app)
+     return app.test_client(), store
+
+
+def test_profiling_is_off_by_default():
+     response = flask_app.test_client().post(URL, json=PAYLOAD, headers={"X-Profile": "1"})
+
+     assert response.status_code == 200
+     assert 'X-Profile-Id' not in response.headers
+
+
+def test_header_triggers_a_cprofile_with_the_payload(tmp_path):
+     client, store = profiled_client(tmp_path)
+
+     response = client.post(URL, json=PAYLOAD, headers={"X-Profile": "1"})
+     profile_id = response.headers['X-Profile-Id']
+     record = store.load(profile_id)
+
+     assert store.ids() == [profile_id]
+     assert record["mode"] == "cprofile" and record["trigger"] == "header"
+     assert record["route"] == URL and record["status"] == 200
+     assert record["payload"] == PAYLOAD
+
+     functions = {func for _, _, func in pstats.Stats(str(store.stats_path(profile_id))).stats}
+     assert "get_quarterly_prediction" in functions
+
+
+def test_latency_threshold_keeps_only_slow_requests(tmp_path):
+     client, store = profiled_client(tmp_path, slow_ms=60_000)
+     assert 'X-Profile-Id' not in client.post(URL, json=PAYLOAD).headers
+     assert store.ids() == []
+
+     client, store = profiled_client(tmp_path, slow_ms=0)
+     profile_id = client.post(URL, json=PAYLOAD).headers['X-Profile-Id']
+     record = store.load(profile_id)
+
+     assert record["mode"] == "sampling" and record["trigger"] == "threshold"
+     assert record["interval_ms"] > 0 and isinstance(record["stacks"], list)
+
+
+def test_profile_ring_is_bounded(tmp_path):
+     client, store = profiled_client(tmp_path, max_profiles=2)
+
+     ids = [client.post(URL, json=PAYLOAD, headers={"X-Profile": "1"}).headers['X-Profile-Id'] for _ in range(3)]
+
+     assert store.ids() == ids[1:]
+     assert not store.stats_path(ids[0]).exists()
+
+
+def test_summarize_samples_counts_self_and_total():
+     stacks = [["main;forecast;predict", 6], ["main;forecast;encode", 3], ["main;render", 1]]
+
+     summary = summarize_samples(stacks, limit=2)
+
+     assert summary == [("predict", 6, 6), ("encode", 3, 3)]
+     assert dict((f, t) for f, _, t in summarize_samples(stacks))["main"] == 10
@@ -0,0 +1,172 @@
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+sys.path.append(str(PROJECT_ROOT / "src" / "api"))
+
+from app import app
+from src.services.drilldown import filter_share
+from src.services.prediction_service import get_quarterly_prediction, get_yearwise_trend
+from src.services.query_engine import compile_plan, default_filters, run_aggregate_query
+from src.config import PROCESSED_DATA_DIR
+
+df = pd.read_csv(PROCESSED_DATA_DIR / "features.csv")
+
+FILTERS = {"MishapType": ["Aviation", "Ground"]}
+
+
+def test_default_query_is_the_legacy_yearly_view():
+     filters = default_filters("MishapType")
+
+     result = run_aggregate_query(df, filters, n_quarters=8, start_year=2025, end_year=2026)
+     expected = get_yearwise_trend(df, filters, 8, 0.3, 0.7, start_year=2025, end_year=2026)
+
+     pd.testing.assert_frame_equal(result.reset_index(drop=True), expected.reset_index(drop=True))
+
+
+def test_metrics_are_computed_in_one_plan():
+     result = run_aggregate_query(
+          df, FILTERS,
+          group_by=["year"],
+          drill_by=["data_type"],
+          metrics=["mishap_count", "mishap_count:mean", "mishap_count:max"],
+          n_quarters=4
+     )
+
+     quarterly = get_quarterly_prediction(df, FILTERS, 4, 0.3, 0.7)
+     expected = (
+          quarterly.groupby(["year", "data_type"], as_index=False, observed=True)["mishap_count"]
+          .agg(["sum", "mean", "max"])
+          .rename(columns={"sum": "mishap_count", "mean": "mishap_count_mean", "max": "mishap_count_max"})
+     )
+
+     pd.testing.assert_frame_equal(result.reset_index(drop=True), expected.reset_index(drop=True), check_dtype=False)
+
+
+def test_qoq_growth_uses_the_quarter_before_the_window():
+     result = run_aggregate_query(
+          df, FILTERS,
+          group_by=["year", "quarter"],
+          metrics=["mishap_count", "mishap_count:qoq_growth"],
+          n_quarters=4,
+          start_year=2025,
+          end_year=2026
+     )
+
+     totals = (
+          get_quarterly_prediction(df, FILTERS, 4, 0.3, 0.7)
+          .groupby(["year", "quarter"])["mishap_count"].sum()
+     )
+
+     assert list(result["year"]) == [2025] * 4
+     for _, row in result.iterrows():
+          previous = totals[(2024, 4)] if row["quarter"] == 1 else totals[(2025, row["quarter"] - 1)]
+          assert row["mishap_count_qoq_growth"] == pytest.approx((row["mishap_count"] - previous) / previous)
+
+
+def test_entity_type_dimension_selects_that_type():
+     result = run_aggregate_query(df, {"MishapClassification": ["A", "B"]}, group_by=["mishapclassification"], n_quarters=2)
+
+     assert list(result.columns) == ["entity_type", "entity_value", "data_type", "mishap_count"]
+     assert set(result["entity_type"]) == {"MishapClassification"}
+     assert list(result["entity_value"].unique()) == ["A", "B"]
+
+
+def test_dashboard_drill_payload_breaks_down_the_clicked_type():
+     # ml-dashboard.page.ts onDrill after clicking the Aviation series
+     payload = {
+          "filters": {"MishapType": ["Aviation"], "Source": ["Mishap Report"]},
+          "group_by": ["year", "mishapclassification"],
+          "metrics": ["mishap_count"],
+          "current_selection": "MishapType",
+          "start_year": 2025,
+          "end_year": 2025,
+          "selected_year": 2025,
+          "w_rf": 0.3,
+          "w_gb": 0.7
+     }
+
+     response = app.test_client().post('/api/mishaps/aggregate', json=payload)
+     assert response.status_code == 200
+     rows = response.get_json()["predictions"]
+
+     assert {r["entity_type"] for r in rows} == {"MishapClassification"}
+     assert all({"entity_value", "data_type", "year", "mishap_count"} <= set(r) for r in rows)
+     assert {r["year"] for r in rows} == {2025}
+
+     # Aviation's 2025 volume, scaled to the Mishap Report share
+     aviation = get_quarterly_prediction(df, {"MishapType": ["Aviation"]}, 8, 0.3, 0.7)
+     expected = aviation.loc[aviation["year"] == 2025, "mishap_count"].sum() * filter_share(df, {"Source": ["Mishap Report"]})
+     assert sum(r["mishap_count"] for r in rows) == pytest.approx(expected, abs=len(rows))
+
+
+def test_filters_that_cannot_apply_are_rejected():
+     # ml-dashboard.page.ts onDrill after clicking a classification bar
+     payload = {
+          "filters": {"MishapClassification": ["A"], "Source": ["Mishap Report"]},
+          "group_by": ["year", "mishaptype"],
+          "current_selection": "MishapClassification"
+     }
+
+     response = app.test_client().post('/api/mishaps/aggregate', json=payload)
+     assert response.status_code == 400
+     assert "MishapClassification" in response.get_json()["error"]
+
+
+def test_drill_by_classification_splits_the_forecasts():
+     result = run_aggregate_query(
+          df, FILTERS,
+          group_by=["mishaptype", "data_type"],
+          drill_by=["mishapclassification"],
+          n_quarters=4,
+          rounding="largest_remainder"
+     )
+
+     quarterly = get_quarterly_prediction(df, FILTERS, 4, 0.3, 0.7)
+     totals = quarterly.groupby(["entity_value", "data_type"], observed=True)["mishap_count"].sum()
+
+     actual = result[result["data_type"] == "actual"]
+     predicted = result[result["data_type"] == "predicted"]
+
+     # Largest remainder: the classifications add up to each series exactly
+     for data_type, rows in (("actual", actual), ("predicted", predicted)):
+          assert set(rows["MishapClassification"]) >= {"A", "B", "C", "D", "E"}
+          assert rows.groupby("entity_value")["mishap_count"].sum().to_dict() == {v: totals[(v, data_type)] for v in ["Aviation", "Ground"]}
+
+
+def test_drill_by_classification_filter_keeps_those_classes():
+     filters = {"MishapType": ["Aviation"], "MishapClassification": ["A", "B"]}
+     everything = run_aggregate_query(df, {"MishapType": ["Aviation"]}, group_by=["year"], drill_by=["mishapclassification"], n_quarters=4)
+     result = run_aggregate_query(df, filters, group_by=["year"], drill_by=["mishapclassification"], n_quarters=4)
+
+     expected = everything[everything["MishapClassification"].isin(["A", "B"])]
+     assert set(result["MishapClassification"]) == {"A", "B"}
+     pd.testing.assert_frame_equal(result.reset_index(drop=True), expected.reset_index(drop=True))
+
+
+@pytest.mark.parametrize("query", [
+     {"group_by": ["year"], "drill_by": ["mishapclassification"], "filters": {"MishapClassification": ["A"]}},
+     {"group_by": ["year"], "drill_by": ["mishapclassification"], "rounding": "ceil"},
+     {"group_by": ["bogus"]},
+     {"group_by": ["mishaptype", "mishapclassification"]},
+     {"group_by": ["mishaptype"], "filters": {"MishapType": ["Aviation"], "Source": ["Mishap Report"]}},
+     {"group_by": ["mishapclassification"], "filters": {"MishapType": ["Aviation"], "Source": ["Bogus"]}},
+     {"metrics": ["mishap_count:median"]},
+     {"filters": {"MishapType": ["Submarine"]}}
+])
+def test_invalid_queries_raise_value_error(query):
+     with pytest.raises(ValueError):
+          run_aggregate_query(df, query.pop("filters", FILTERS), n_quarters=2, **query)
+
+
+def test_plans_are_cached_by_payload_shape():
+     compile_plan.cache_clear()
+
+     run_aggregate_query(df, {"MishapType": ["Aviation"]}, group_by=["year"], n_quarters=2)
+     run_aggregate_query(df, {"MishapType": ["Ground"]}, group_by=["year"], n_quarters=2)
+
+     assert compile_plan.cache_info().hits == 1
+     assert compile_plan.cache_info().misses == 1
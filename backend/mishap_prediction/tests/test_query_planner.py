@@ -0,0 +1,93 @@
+import pandas as pd
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.services import prediction_service
+from src.services.prediction_service import get_quarterly_prediction, get_yearwise_trend, iter_entity_trends
+from src.services.query_planner import plan_query
+from src.services.rollup import get_history_rollup, quarterly_volume_frame
+from src.config import PROCESSED_DATA_DIR, STREAM_CHUNK_ENTITIES
+
+df = pd.read_csv(PROCESSED_DATA_DIR / "features.csv")
+
+# Aviation history ends in 2025 Q3, Ground in 2025 Q4
+FILTERS = {"MishapType": ["Aviation", "Ground"]}
+ENTITIES = [("MishapType", "Aviation"), ("MishapType", "Ground")]
+
+
+def test_end_year_caps_the_forecast_horizon():
+     rollup = get_history_rollup(df)
+
+     assert plan_query(rollup, ENTITIES, 8).horizon == 8
+     assert plan_query(rollup, ENTITIES, 8, end_year=2027).horizon == 5
+     assert plan_query(rollup, ENTITIES, 8, end_year=2030).horizon == 8
+     assert plan_query(rollup, ENTITIES, 8, end_year=2026).horizon == 1
+     assert not plan_query(rollup, ENTITIES, 8, start_year=2010, end_year=2025).needs_forecast
+
+
+def test_historical_window_skips_forecasting(monkeypatch):
+     def no_forecast(*args, **kwargs):
+          raise AssertionError("forecast should have been skipped")
+
+     monkeypatch.setattr(prediction_service, "forecast_entities", no_forecast)
+
+     result = get_yearwise_trend(df, FILTERS, 8, 0.3, 0.7, start_year=2020, end_year=2025)
+
+     assert set(result['data_type']) == {'actual'}
+     assert result['year'].between(2020, 2024).all()
+
+
+def test_pushed_down_window_matches_filtering_the_full_result():
+     full = get_quarterly_prediction(df, FILTERS, 8, 0.3, 0.7)
+
+     for start_year, end_year in [(None, 2027), (2024, 2027), (2026, None), (2027, 2028)]:
+          windowed = get_quarterly_prediction(df, FILTERS, 8, 0.3, 0.7, start_year, end_year)
+
+          expected = full
+          if start_year is not None:
+               expected = expected[expected['year'] >= start_year]
+          if end_year is not None:
+               expected = expected[expected['year'] < end_year]
+
+          pd.testing.assert_frame_equal(windowed.reset_index(drop=True), expected.reset_index(drop=True))
+
+
+def test_streamed_chunks_match_the_full_result():
+     filters = {"MishapClassification": ["A", "B", "C", "D", "E"]}
+     full = get_quarterly_prediction(df, filters, 6, 0.3, 0.7, end_year=2027)
+
+     streamed = list(iter_entity_trends(
+          df, filters, 6, 0.3, 0.7,
+          volume_frame=quarterly_volume_frame,
+          end_year=2027,
+          chunk_size=2
+     ))
+
+     assert len(streamed) == 5
+     for frame, value in zip(streamed, ["A", "B", "C", "D", "E"]):
+          expected = full[full['entity_value'] == value]
+          pd.testing.assert_frame_equal(
+               frame.reset_index(drop=True).astype({'entity_value': str}),
+               expected.reset_index(drop=True).astype({'entity_value': str})
+          )
+
+
+def test_streamed_entities_are_forecast_in_batches(monkeypatch):
+     calls = []
+     run_volume_query = prediction_service.run_volume_query
+
+     def counting(df_features, entities, *args):
+          calls.append(len(entities))
+          return run_volume_query(df_features, entities, *args)
+
+     monkeypatch.setattr(prediction_service, "run_volume_query", counting)
+
+     classes = sorted(df.loc[df['entity_type'] == "MishapClassification", 'entity_value'].unique())
+     streamed = list(iter_entity_trends(df, {"MishapClassification": classes}, 4, 0.3, 0.7))
+
+     assert len(streamed) == len(classes)
+     assert calls[0] == STREAM_CHUNK_ENTITIES > 1
+     assert sum(calls) == len(classes)
@@ -0,0 +1,75 @@
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+sys.path.append(str(PROJECT_ROOT / "src" / "api"))
+
+from src.config import RF_PIPELINE_PATH
+from src.models.registry import ModelRegistry
+from src.services.reloader import ArtifactReloader
+from data.data_context import DataContext
+import routes.admin_routes
+from app import app
+
+def test_in_flight_request_keeps_its_generation():
+     DataContext.load()
+
+     with DataContext.pinned() as old:
+          ArtifactReloader.reload(force=True)
+          new = DataContext.current()
+
+          assert new.number > old.number
+          assert DataContext.features() is old.store.frame
+          assert ModelRegistry.get(RF_PIPELINE_PATH) is old.pipelines[RF_PIPELINE_PATH][1]
+
+     assert DataContext.features() is new.store.frame
+     assert ModelRegistry.get(RF_PIPELINE_PATH) is new.pipelines[RF_PIPELINE_PATH][1]
+     assert new.pipelines[RF_PIPELINE_PATH][1] is not old.pipelines[RF_PIPELINE_PATH][1]
+
+     # Same artifacts on disk, same versions
+     assert (new.data_version, new.model_version) == (old.data_version, old.model_version)
+
+def test_reload_is_skipped_when_artifacts_are_unchanged():
+     ArtifactReloader.reload(force=True)
+
+     assert ArtifactReloader.reload() is False
+
+def test_first_reload_compares_against_the_initial_load():
+     # A generation built by DataContext (as by the first load), no reload
+     # or watcher since
+     DataContext.publish(DataContext.build())
+
+     assert ArtifactReloader.reload() is False
+
+def test_admin_reload_endpoint():
+     client = app.test_client()
+
+     before = client.get('/admin/generation').get_json()
+     response = client.post('/admin/reload', json={"force": True, "wait": True})
+
+     assert response.status_code == 200
+     assert response.get_json()["generation"] > before["generation"]
+     assert response.headers['X-Serving-Generation'] == before["stamp"]
+
+     after = client.post('/predict', json={"entity_type": "MishapType", "entity_value": "Ground", "n_quarters": 1})
+     assert after.headers['X-Serving-Generation'] == response.get_json()["stamp"]
+
+def test_admin_is_loopback_only_without_a_token():
+     client = app.test_client()
+
+     remote = client.post('/admin/reload', json={"wait": True}, environ_base={"REMOTE_ADDR": "10.0.0.7"})
+     assert remote.status_code == 403
+
+     preflight = client.options('/admin/reload', headers={"Origin": "http://dashboard.example", "Access-Control-Request-Method": "POST"})
+     assert 'Access-Control-Allow-Origin' not in preflight.headers
+
+def test_admin_token_is_required_when_set(monkeypatch):
+     monkeypatch.setattr(routes.admin_routes, "ADMIN_TOKEN", "s3cret")
+     client = app.test_client()
+
+     assert client.get('/admin/generation').status_code == 401
+     assert client.get('/admin/generation', headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+     response = client.get('/admin/generation', headers={"Authorization": "Bearer s3cret"}, environ_base={"REMOTE_ADDR": "10.0.0.7"})
+     assert response.status_code == 200
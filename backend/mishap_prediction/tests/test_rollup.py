@@ -0,0 +1,82 @@
+import pandas as pd
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.models.predict import predict_future_quarters_batch
+from src.services.aggregation_service import aggregate_volume_by_quarter, aggregate_volume_by_year, aggregate_volume_by_year_and_classification
+from src.services.combine_actual_predicted import combine_actual_predicted
+from src.services.rollup import RollupCache, get_history_rollup, quarterly_volume_frame, yearly_volume_frame
+from src.utils.helpers import apply_entity_filters
+from src.config import PROCESSED_DATA_DIR
+
+df = pd.read_csv(PROCESSED_DATA_DIR / "features.csv")
+
+FILTERS = {"MishapType": ["Ground", "Aviation"], "MishapClassification": ["D"]}
+ENTITIES = [("MishapType", "Ground"), ("MishapType", "Aviation"), ("MishapClassification", "D")]
+N_QUARTERS = 6
+
+
+def combined():
+     """
+     The per-entity actual + predicted concat the rollup views replace,
+     kept as the reference.
+     """
+     actual_df = apply_entity_filters(df, FILTERS)[['year', 'quarter', 'entity_type', 'entity_value', 'mishap_count']]
+     forecast_df = predict_future_quarters_batch(df, ENTITIES, N_QUARTERS)
+
+     combined_df = pd.concat(
+          [
+               combine_actual_predicted(
+                    actual_df[(actual_df['entity_type'] == etype) & (actual_df['entity_value'] == val)],
+                    forecast_df.iloc[i * N_QUARTERS:(i + 1) * N_QUARTERS]
+               )
+               for i, (etype, val) in enumerate(ENTITIES)
+          ],
+          ignore_index=True
+     ).sort_values(by=['year', 'quarter', 'entity_type', 'entity_value'], kind='stable', ignore_index=True)
+
+     return combined_df, forecast_df
+
+
+def in_window(frame, start_year, end_year):
+     if start_year is not None:
+          frame = frame[frame['year'] >= start_year]
+     if end_year is not None:
+          frame = frame[frame['year'] < end_year]
+     return frame
+
+
+def assert_same_rows(got, expected):
+     pd.testing.assert_frame_equal(
+          got.reset_index(drop=True).astype({'entity_type': str, 'entity_value': str, 'data_type': str}),
+          expected.reset_index(drop=True).astype({'entity_type': str, 'entity_value': str, 'data_type': str})
+     )
+
+
+def test_rollup_views_match_per_request_aggregation():
+     combined_df, forecast_df = combined()
+     rollup = get_history_rollup(df)
+
+     for start_year, end_year in [(None, None), (2020, None), (2024, 2026), (2026, 2027), (2040, None)]:
+          yearly = yearly_volume_frame(rollup, forecast_df, ENTITIES, N_QUARTERS, start_year, end_year)
+          expected = aggregate_volume_by_year_and_classification(
+               in_window(aggregate_volume_by_year(combined_df), start_year, end_year)
+          )
+          assert_same_rows(yearly, expected)
+
+          quarterly = quarterly_volume_frame(rollup, forecast_df, ENTITIES, N_QUARTERS, start_year, end_year)
+          expected = aggregate_volume_by_quarter(in_window(combined_df, start_year, end_year))
+          assert_same_rows(quarterly, expected)
+
+
+def test_rollup_is_built_once_per_data_version():
+     RollupCache.clear()
+
+     assert get_history_rollup(df) is get_history_rollup(df)
+
+     changed = df.copy()
+     changed['mishap_count'] += 1
+     assert get_history_rollup(changed) is not get_history_rollup(df)
@@ -0,0 +1,76 @@
+import json
+import pytest
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+sys.path.append(str(PROJECT_ROOT / "src" / "api"))
+
+from app import app
+
+client = app.test_client()
+
+REQUESTS = [
+     ('/api/mishaps/yearly-trend', {"filters": {"MishapType": ["Aviation", "Ground"], "Source": ["Mishap Report"]}, "n_quarters": 8, "start_year": 2015}),
+     ('/api/mishaps/quarterly-prediction', {"filters": {"MishapClassification": ["A", "B"]}, "n_quarters": 4, "start_year": 2020, "end_year": 2026}),
+     ('/api/mishaps/aggregate', {"current_selection": "MishapType", "selected_year": 2025})
+]
+
+def records_of(url, body):
+     if url.endswith('yearly-trend'):
+          return body["data"]
+     if url.endswith('aggregate'):
+          return body["predictions"]
+     return body
+
+def sort_key(record):
+     return json.dumps(record, sort_keys=True)
+
+@pytest.mark.parametrize("url, payload", REQUESTS)
+def test_ndjson_stream_has_the_same_rows(url, payload):
+     expected = client.post(url, json=payload).get_json()
+
+     response = client.post(url, json={**payload, "format": "ndjson"})
+     assert response.mimetype == "application/x-ndjson"
+
+     lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+     if url.endswith('yearly-trend'):
+          assert lines[-1] == {"summary_insight": expected["summary_insight"]}
+          lines = lines[:-1]
+
+     assert sorted(lines, key=sort_key) == sorted(records_of(url, expected), key=sort_key)
+
+@pytest.mark.parametrize("url, payload", REQUESTS)
+def test_columnar_encoding_has_the_same_rows(url, payload):
+     expected = records_of(url, client.post(url, json=payload).get_json())
+
+     columnar = records_of(url, client.post(url, json={**payload, "format": "columnar"}).get_json())
+     rows = [dict(zip(columnar["columns"], values)) for values in zip(*(columnar["data"][c] for c in columnar["columns"]))]
+
+     assert rows == expected
+
+def test_accept_header_selects_ndjson():
+     url, payload = REQUESTS[1]
+     response = client.post(url, json=payload, headers={"Accept": "application/x-ndjson"})
+
+     assert response.mimetype == "application/x-ndjson"
+
+def test_unknown_format_is_rejected():
+     url, payload = REQUESTS[0]
+     response = client.post(url, json={**payload, "format": "xml"})
+
+     assert response.status_code == 400
+
+@pytest.mark.parametrize("selected_year", ["last year", [2025]])
+def test_invalid_selected_year_is_rejected(selected_year):
+     response = client.post('/api/mishaps/aggregate', json={"current_selection": "MishapType", "selected_year": selected_year})
+
+     assert response.status_code == 400
+     assert "selected_year" in response.get_json()["error"]
+
+def test_selected_year_string_is_coerced():
+     url, payload = REQUESTS[2]
+
+     assert client.post(url, json={**payload, "selected_year": "2025"}).get_json() == client.post(url, json=payload).get_json()
@@ -0,0 +1,64 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.models import train_pipeline
+from src.models.train_pipeline import CAT_COLS, NUM_COLS, TARGET, add_target, evaluate, fit_models, train_test_mask
+from src.config import ENSEMBLE_W_GB, ENSEMBLE_W_RF, PROCESSED_DATA_DIR, RF_PIPELINE_PATH, GB_PIPELINE_PATH
+
+df = add_target(pd.read_csv(PROCESSED_DATA_DIR / "features.csv"))
+
+
+def test_vectorized_split_matches_per_group_loop():
+     train_idx, test_idx = [], []
+     for _, group in df.groupby(['entity_type', 'entity_value']):
+          split_point = int(len(group) * 0.8)
+          train_idx.extend(group.index[:split_point])
+          test_idx.extend(group.index[split_point:])
+
+     train = train_test_mask(df)
+
+     assert list(df.index[train]) == train_idx
+     assert list(df.index[~train]) == test_idx
+
+
+def test_concurrent_fit_on_shared_design_matrix_reproduces_saved_pipelines():
+     train = train_test_mask(df)
+     X, y = df[CAT_COLS + NUM_COLS], df[TARGET]
+
+     rf_pipeline = joblib.load(RF_PIPELINE_PATH)
+     preprocess = rf_pipeline.named_steps['preprocess']
+
+     rf_model, gb_model = fit_models(preprocess.transform(X[train]), y[train], n_jobs=2)
+
+     X_all = preprocess.transform(X)
+     np.testing.assert_array_equal(rf_model.predict(X_all), rf_pipeline.named_steps['model'].predict(X_all))
+     np.testing.assert_array_equal(gb_model.predict(X_all), joblib.load(GB_PIPELINE_PATH).named_steps['model'].predict(X_all))
+
+
+def test_single_core_fit_is_sequential(monkeypatch):
+     def no_pool(*args, **kwargs):
+          raise AssertionError("n_jobs=1 must not fit the models concurrently")
+
+     monkeypatch.setattr(train_pipeline, "ThreadPoolExecutor", no_pool)
+
+     X = joblib.load(RF_PIPELINE_PATH).named_steps['preprocess'].transform(df[CAT_COLS + NUM_COLS][:200])
+     rf_model, gb_model = fit_models(X, df[TARGET][:200], n_jobs=1)
+
+     assert rf_model.n_jobs == 1
+     assert gb_model.n_estimators_ == 200
+
+
+def test_ensemble_is_scored_with_the_configured_weights():
+     y = np.array([1.0, 2.0, 3.0])
+     rf, gb = np.array([1.0, 2.0, 4.0]), np.array([1.0, 2.0, 2.0])
+
+     metrics = evaluate(y, rf, gb)
+
+     assert metrics["ensemble"]["mae"] == pytest.approx(abs(ENSEMBLE_W_RF * 4.0 + ENSEMBLE_W_GB * 2.0 - 3.0) / 3)
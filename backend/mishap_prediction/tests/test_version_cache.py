@@ -0,0 +1,33 @@
+import pandas as pd
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.utils.version_cache import VersionCache
+
+df = pd.DataFrame({"entity_value": ["A", "B"], "mishap_count": [1, 2]})
+
+
+class TotalCache(VersionCache):
+     max_entries = 2
+
+
+class CountCache(VersionCache):
+     pass
+
+
+def test_each_subclass_is_its_own_lru():
+     TotalCache.clear()
+     CountCache.clear()
+
+     total = TotalCache.get_or_compute(df, lambda d: [d['mishap_count'].sum()])
+     assert CountCache.get_or_compute(df, lambda d: [len(d)]) == [2]
+     assert TotalCache.get_or_compute(df.copy(), lambda d: None) is total
+
+     for extra in (10, 20):
+          TotalCache.get_or_compute(df.assign(mishap_count=df['mishap_count'] + extra), lambda d: [0])
+
+     assert TotalCache.get_or_compute(df, lambda d: [-1]) == [-1]
+     assert len(TotalCache._entries) == 2
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path().resolve()
+sys.path.append(str(PROJECT_ROOT))
+
+from src.models.forecast_cache import ForecastCache
+from src.models.forecast_table import ForecastTable
+from src.models.predict import predict_future_quarters_batch
+from src.models.weight_sweep import forecast_weight_grid, grid_weights, predict_with_weight_sweep
+from src.utils.metrics import Metrics
+from src.config import PROCESSED_DATA_DIR, WEIGHT_SWEEP_TOLERANCE
+
+df = pd.read_csv(PROCESSED_DATA_DIR / "features.csv")
+
+ENTITIES = [("MishapType", "Aviation"), ("MishapType", "Ground"), ("MishapClassification", "D")]
+
+@pytest.fixture(autouse=True)
+def live_forecasts(monkeypatch):
+     # These tests exercise the cache, not the materialized table
+     monkeypatch.setattr(ForecastTable, "current", classmethod(lambda cls, path=None: None))
+
+
+def test_grid_pass_matches_exact_forecasts():
+     ForecastCache.clear()
+     years, quarters, counts = forecast_weight_grid(df, ENTITIES, n_quarters=5)
+
+     for j, (w_rf, w_gb) in enumerate(zip(*grid_weights())):
+          exact = predict_future_quarters_batch(df, ENTITIES, 5, w_rf, w_gb, use_cache=False)
+
+          np.testing.assert_array_equal(counts[:, j].ravel(), exact['mishap_count'])
+          np.testing.assert_array_equal(years.ravel(), exact['year'])
+          np.testing.assert_array_equal(quarters.ravel(), exact['quarter'])
+
+
+def test_grid_points_become_cache_hits():
+     ForecastCache.clear()
+     forecast_weight_grid(df, ENTITIES, n_quarters=4)
+     hits = ForecastCache.stats()["hits"]
+
+     predict_future_quarters_batch(df, ENTITIES, 4, 0.3, 0.7)
+
+     assert ForecastCache.stats()["hits"] == hits + len(ENTITIES)
+
+
+def test_zero_tolerance_matches_exact_forecast_off_grid():
+     for w_rf in [0.05, 0.37, 0.81]:
+          w_gb = round(1 - w_rf, 2)
+
+          swept = predict_with_weight_sweep(df, ENTITIES, 6, w_rf, w_gb, tolerance=0)
+          exact = predict_future_quarters_batch(df, ENTITIES, 6, w_rf, w_gb, use_cache=False)
+
+          pd.testing.assert_frame_equal(swept, exact, check_dtype=False)
+
+
+def test_interpolation_stays_between_grid_neighbours():
+     _, _, counts = forecast_weight_grid(df, ENTITIES, n_quarters=6)
+
+     swept = predict_with_weight_sweep(df, ENTITIES, 6, 0.35, 0.65, tolerance=1e9)
+     served = swept['mishap_count'].to_numpy().reshape(len(ENTITIES), 6)
+
+     lower = np.minimum(counts[:, 3], counts[:, 4])
+     upper = np.maximum(counts[:, 3], counts[:, 4])
+
+     assert ((served >= lower) & (served <= upper)).all()
+
+
+def model_calls():
+     lines = Metrics.render().splitlines()
+     return sum(float(line.rsplit(" ", 1)[1]) for line in lines if line.startswith("mishap_model_calls_total"))
+
+
+def test_default_tolerance_is_exact():
+     assert not WEIGHT_SWEEP_TOLERANCE
+
+     ForecastCache.clear()
+     swept = predict_with_weight_sweep(df, ENTITIES, 4, 0.37, 0.63)
+     exact = predict_future_quarters_batch(df, ENTITIES, 4, 0.37, 0.63, use_cache=False)
+
+     pd.testing.assert_frame_equal(swept, exact, check_dtype=False)
+
+
+@pytest.mark.parametrize("tolerance", [0, 1e9])
+def test_off_grid_weight_runs_one_recursion_on_a_cold_cache(tolerance):
+     # One ensemble call per horizon step, whether the brackets come from
+     # a grid pass (interpolated) or the weight is forecast exactly
+     ForecastCache.clear()
+     Metrics.reset()
+
+     predict_with_weight_sweep(df, ENTITIES, 5, 0.37, 0.63, tolerance=tolerance)
+
+     assert model_calls() == 5
+
+
+def test_opt_in_tolerance_interpolation_error():
+     entities = list(df[['entity_type', 'entity_value']].drop_duplicates().itertuples(index=False, name=None))
+
+     errors = []
+     for w_rf in [0.05, 0.25, 0.33, 0.55, 0.67, 0.85]:
+          w_gb = round(1 - w_rf, 2)
+
+          swept = predict_with_weight_sweep(df, entities, 8, w_rf, w_gb, tolerance=2)
+          exact = predict_future_quarters_batch(df, entities, 8, w_rf, w_gb, use_cache=False)
+
+          errors.append(np.abs(swept['mishap_count'].to_numpy() - exact['mishap_count'].to_numpy()))
+
+     errors = np.concatenate(errors)
+
+     assert (errors <= 3).mean() >= 0.99
+     assert errors.mean() < 0.5
+
+
+def test_shorter_horizon_serves_the_same_leading_quarters():
+     entities = list(df[['entity_type', 'entity_value']].drop_duplicates().itertuples(index=False, name=None))
+
+     full = predict_with_weight_sweep(df, entities, 8, 0.45, 0.55, tolerance=2)
+     short = predict_with_weight_sweep(df, entities, 3, 0.45, 0.55, tolerance=2)
+
+     leading = full['mishap_count'].to_numpy().reshape(len(entities), 8)[:, :3]
+     np.testing.assert_array_equal(short['mishap_count'].to_numpy(), leading.ravel())
+
+
+def test_disabled_or_off_slider_weights_forecast_exactly():
+     exact = predict_future_quarters_batch(df, ENTITIES, 3, 0.5, 0.8, use_cache=False)
+
+     pd.testing.assert_frame_equal(
+          predict_with_weight_sweep(df, ENTITIES, 3, 0.5, 0.8, tolerance=1e9), exact, check_dtype=False
+     )
+     pd.testing.assert_frame_equal(
+          predict_with_weight_sweep(df, ENTITIES, 3, 0.5, 0.8, tolerance=None), exact, check_dtype=False
+     )